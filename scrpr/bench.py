@@ -0,0 +1,371 @@
+"""
+Times one browser scraping tables off a scrpr.replay server, for comparing
+changes to the scrape path against the same page and data every time.
+
+    python -m scrpr.bench --synthetic-rows 400 --regions us-east-1,us-west-2 --latency-ms 100
+    python -m scrpr.bench ./payloads --row-extraction js --json after.json
+
+Reports rows scraped per second, WebDriver commands per row, and how long
+each phase of the scrape took and how many commands it sent. Nothing is
+stored; every table is checked against the payload it was made from.
+
+With --storage, times storing the same tables in Postgres instead, without
+a browser:
+
+    python -m scrpr.bench --synthetic-rows 500 --regions us-east-1,us-west-2 --storage --env-file .env
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.errors import UniqueViolation
+
+from scrpr import scrpr
+from scrpr.instance import PGInstance
+from scrpr.replay import DEFAULT_PAGE_SIZE, ReplayServer, payload_dir_of
+
+logger = logging.getLogger(__name__)
+
+
+class Phases:
+    """
+    How many times each phase of a scrape ran, how long each run took, and
+    how many WebDriver commands were sent during it, for one browser.
+    Commands sent outside of any phase count towards 'other'.
+    """
+    def __init__(self) -> None:
+        self._stack: List[str] = []
+        # name -> seconds, one per run
+        self.samples: Dict[str, List[float]] = {}
+        self.commands: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        self._stack.append(name)
+        t_start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(name, []).append(time.monotonic() - t_start)
+            self._stack.pop()
+
+    def timed(self, name: str, f):
+        """f, run as phase name"""
+        def wrapper(*args, **kwargs):
+            with self.phase(name):
+                return f(*args, **kwargs)
+        return wrapper
+
+    def watch(self, driver) -> None:
+        """Count every command driver sends, including the ones its WebElements send through it."""
+        execute = driver.execute
+
+        def counted(driver_command, params=None):
+            name = self._stack[-1] if self._stack else 'other'
+            self.commands[name] = self.commands.get(name, 0) + 1
+            return execute(driver_command, params)
+        driver.execute = counted
+
+    def total_commands(self) -> int:
+        return sum(self.commands.values())
+
+
+class Instrumented:
+    """
+    Mixed into an EC2DataCollector class by instrumented(), to charge what it
+    does to Phases.
+    """
+    def __init__(self, _id, config: scrpr.EC2DataCollectorConfig, phases: Phases):
+        self.phases = phases
+        super().__init__(_id, config)
+        self.table.navto_first_page = phases.timed('first_page', self.table.navto_first_page)
+        self.table.navto_next_page_and_wait = phases.timed('next_page', self.table.navto_next_page_and_wait)
+
+    def get_driver(self, **kwargs):
+        with self.phases.phase('get_driver'):
+            super().get_driver(**kwargs)
+        self.phases.watch(self.driver)
+
+    def prep_driver(self, reload: bool = False):
+        with self.phases.phase('page_load'):
+            return super().prep_driver(reload)
+
+    def get_dropdown_menus(self) -> None:
+        with self.phases.phase('dropdowns'):
+            return super().get_dropdown_menus()
+
+    def filter_table(self, _os: str, region: str, vcpu: Optional[str] = None):
+        with self.phases.phase('filter'):
+            return super().filter_table(_os, region, vcpu)
+
+    def read_displayed_rows(self) -> List[List[str]]:
+        with self.phases.phase('read_rows'):
+            return super().read_displayed_rows()
+
+
+def instrumented(collector_class: type) -> type:
+    return type('Instrumented' + collector_class.__name__, (Instrumented, collector_class), {})
+
+
+def run_bench(server: ReplayServer, config: scrpr.EC2DataCollectorConfig, collector_class: type = scrpr.EC2DataCollector, repeat: int = 1) -> Dict[str, Any]:
+    """Scrape every table server has, repeat times, with one collector. Returns the numbers for format_report()."""
+    phases = Phases()
+    t_start = time.monotonic()
+    dc = instrumented(collector_class)('bench', config, phases)
+    t_startup = time.monotonic() - t_start
+    rows = 0
+    mismatched = []
+    try:
+        for task in server.tasks() * repeat:
+            with phases.phase('task'):
+                scraped = [row for page in dc.collect_ec2_data(*task) for row in page]
+            rows += len(scraped)
+            if scrpr.diff_rows(server.rows(*task), scraped):
+                mismatched.append(task)
+    finally:
+        dc.driver.quit()
+    t_scrape = sum(phases.samples.get('task', []))
+    return {
+        'collector': collector_class.__name__,
+        'row_extraction': config.row_extraction,
+        'tasks': len(server.tasks()) * repeat,
+        'rows': rows,
+        'mismatched_tasks': [list(task) for task in mismatched],
+        'startup_seconds': t_startup,
+        'scrape_seconds': t_scrape,
+        'rows_per_second': rows / t_scrape if t_scrape else 0.0,
+        'commands': phases.total_commands(),
+        'commands_per_row': phases.total_commands() / rows if rows else 0.0,
+        'phases': {
+            name: {
+                'runs': len(samples),
+                'seconds': sum(samples),
+                'mean_ms': 1000 * sum(samples) / len(samples),
+                'max_ms': 1000 * max(samples),
+                'commands': phases.commands.get(name, 0),
+            }
+            for name, samples in phases.samples.items()
+        },
+        'other_commands': phases.commands.get('other', 0),
+    }
+
+
+def store_row(conn, instance: PGInstance, table: str) -> bool:
+    """
+    How a row was stored before ON CONFLICT: a plain INSERT in a transaction
+    of its own, and a UniqueViolation if the row was already there.
+    Returns False for those.
+    """
+    curr = conn.cursor()
+    ins = sql.SQL("INSERT INTO {table} ({columns}) VALUES ({values})").format(
+        table=sql.Identifier(table),
+        columns=sql.SQL(', ').join(map(sql.Identifier, PGInstance.columns)),
+        values=sql.SQL(', ').join(sql.Placeholder() * len(PGInstance.columns)),
+    )
+    try:
+        curr.execute(ins, (instance.pk, *instance.prep_data()))
+    except UniqueViolation:
+        conn.rollback()
+        return False
+    finally:
+        curr.close()
+    conn.commit()
+    return True
+
+
+def store_rows(conn, page: List[PGInstance], table: str) -> Tuple[int, int]:
+    """How pages were stored before PGInstance.store_many(), a row and a transaction at a time"""
+    stored = sum(store_row(conn, instance, table) for instance in page)
+    return stored, len(page) - stored
+
+
+# the ways of storing a page of rows run_store_bench() compares, -> (stored, already existed)
+STORE_METHODS = {
+    'row': store_rows,
+    'page': lambda conn, page, table: PGInstance.store_many(conn, page, table=table),
+}
+
+
+def run_store_bench(conn, tables: Dict[tuple, List[list]], page_size: int = DEFAULT_PAGE_SIZE, human_date: str = '1999-12-31', table: str = 'ec2_instance_pricing_bench') -> Dict[str, Dict[str, Any]]:
+    """
+    Store tables ((os, region) -> rows) page_size rows at a time into a
+    scratch copy of ec2_instance_pricing, by each of STORE_METHODS: first
+    into the empty table, then again once every row already exists, like a
+    re-run would.
+    """
+    results = {}
+    curr = conn.cursor()
+    for method, store in STORE_METHODS.items():
+        curr.execute(sql.SQL("CREATE TABLE {} (LIKE ec2_instance_pricing INCLUDING ALL)").format(sql.Identifier(table)))
+        conn.commit()
+        try:
+            for run in ('new', 'existing'):
+                counts = [0, 0]
+                t_start = time.monotonic()
+                for (_os, region), rows in tables.items():
+                    instances = [PGInstance(human_date, region, _os, *row) for row in rows]
+                    for start in range(0, len(instances), page_size):
+                        stored, already_existed = store(conn, instances[start:start + page_size], table)
+                        counts[0] += stored
+                        counts[1] += already_existed
+                seconds = time.monotonic() - t_start
+                results["{} {}".format(method, run)] = {
+                    'rows': sum(counts),
+                    'stored': counts[0],
+                    'already_existed': counts[1],
+                    'seconds': seconds,
+                    'rows_per_second': sum(counts) / seconds if seconds else 0.0,
+                }
+        finally:
+            curr.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(table)))
+            conn.commit()
+    curr.close()
+    return results
+
+
+def format_store_report(results: Dict[str, Dict[str, Any]]) -> List[str]:
+    return [
+        "{:<14} {:>6} rows {:>6} stored {:>6} already existed {:>8.2f}s {:>9.1f} rows/s".format(
+            name, r['rows'], r['stored'], r['already_existed'], r['seconds'], r['rows_per_second']
+        )
+        for name, r in results.items()
+    ]
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+    lines = [
+        "{} ({} rows): {} rows of {} tables in {:.2f}s (+{:.2f}s startup)".format(
+            report['collector'], report['row_extraction'], report['rows'], report['tasks'], report['scrape_seconds'], report['startup_seconds']
+        ),
+        "{:.1f} rows/s, {} WebDriver commands, {:.2f} per row".format(report['rows_per_second'], report['commands'], report['commands_per_row']),
+    ]
+    # a task's phases are counted in it too
+    for name, p in sorted(report['phases'].items(), key=lambda item: -item[1]['seconds']):
+        lines.append("  {:<11} {:>5} runs {:>8.2f}s total {:>8.1f}ms mean {:>8.1f}ms max {:>6} commands".format(
+            name, p['runs'], p['seconds'], p['mean_ms'], p['max_ms'], p['commands']
+        ))
+    lines.append("  {:<11} {:>64} commands".format('other', report['other_commands']))
+    if report['mismatched_tasks']:
+        lines.append("tables which didn't match their payload: {}".format(report['mismatched_tasks']))
+    return lines
+
+
+def do_args(sys_args):
+    parser = argparse.ArgumentParser(description="Time scraping a scrpr.replay stand-in of the EC2 pricing page.")
+    parser.add_argument("payload_dir",
+        nargs='?',
+        default=None,
+        help="directory of <operating system>/<region>.json payloads, as saved by --record-payloads")
+    parser.add_argument("--synthetic-rows",
+        type=int,
+        default=None,
+        metavar='N',
+        help="instead of payload_dir, scrape made up tables of N rows (up to 999) for --operating-systems and --regions")
+    parser.add_argument("--operating-systems",
+        default='Linux',
+        help="comma separated, with --synthetic-rows")
+    parser.add_argument("--regions",
+        default='us-east-1',
+        help="comma separated, with --synthetic-rows")
+    parser.add_argument("--page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help="rows per page of the table")
+    parser.add_argument("--latency-ms",
+        type=int,
+        default=0,
+        help="how long the table takes to re-render after a filter or page change")
+    parser.add_argument("--repeat",
+        type=int,
+        default=1,
+        help="scrape every table this many times")
+    parser.add_argument("--collector",
+        choices=('selenium', 'devtools'),
+        default='selenium',
+        help="see python -m scrpr --help")
+    parser.add_argument("--row-extraction",
+        choices=('cells', 'js'),
+        default='cells',
+        help="see python -m scrpr --help")
+    parser.add_argument("--storage",
+        action='store_true',
+        help="time storing the tables in a scratch table, row by row and --page-size rows at a time, instead of scraping them")
+    parser.add_argument("--env-file",
+        default='.env',
+        help="with --storage, the database to use")
+    parser.add_argument("--windowed",
+        action='store_true',
+        help="watch the browser do it")
+    parser.add_argument("--json",
+        default=None,
+        metavar='FILE',
+        help="also save the numbers to FILE")
+    parser.add_argument("-v",
+        action='count',
+        default=0,
+        help="increase verbosity")
+    parser.add_argument("--log-file",
+        default=os.path.join(scrpr.SCRPR_HOME, "logs", "bench.log"),
+        help="path to the log file")
+    args = parser.parse_args(sys_args)
+    if (args.payload_dir is None) == (args.synthetic_rows is None):
+        parser.error("one of payload_dir or --synthetic-rows is required")
+    return args
+
+
+def storage_main(args, server: ReplayServer) -> int:
+    db_config = scrpr.DatabaseConfig()
+    db_config.load(args.env_file)
+    conn = psycopg2.connect(db_config.get_dsl())
+    try:
+        results = run_store_bench(conn, {task: server.rows(*task) for task in server.tasks()}, page_size=args.page_size)
+    finally:
+        conn.close()
+    for line in format_store_report(results):
+        print(line)
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+def main(args) -> int:
+    Path(args.log_file).parent.mkdir(parents=True, exist_ok=True)
+    scrpr.init_logging(verbosity=args.v, follow=True, log_file=args.log_file)
+    server = ReplayServer(('127.0.0.1', 0), payload_dir_of(args), page_size=args.page_size, latency_ms=args.latency_ms)
+    if args.storage:
+        server.server_close()
+        return storage_main(args, server)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config = scrpr.EC2DataCollectorConfig(
+        human_date=scrpr.get_date().strftime("%Y-%m-%d"),
+        url=server.page_url,
+        headless=not args.windowed,
+        row_extraction=args.row_extraction,
+        # found on the page every time, the same as the first run of the day
+        dropdown_cache=None,
+    )
+    try:
+        report = run_bench(server, config, scrpr.COLLECTORS[args.collector], repeat=args.repeat)
+    finally:
+        server.shutdown()
+        server.server_close()
+    for line in format_report(report) + scrpr.WAITS.summary():
+        print(line)
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['mismatched_tasks'] else 0
+
+
+if __name__ == '__main__':
+    import sys
+    raise SystemExit(main(do_args(sys.argv[1:])))
@@ -1,13 +1,52 @@
 from psycopg2 import sql
-from psycopg2.errors import UniqueViolation
+from psycopg2.extras import execute_values
 from collections import OrderedDict
-from typing import Tuple
+from typing import Iterable, List, Tuple
+import io
 import logging
 
 import sqlalchemy
 
 logger = logging.getLogger(__name__)
 
+# what storing a row whose pk is already stored does, see PGInstance.on_conflict_clause()
+ON_CONFLICT = ('skip', 'upsert')
+
+
+def copy_line(values: tuple) -> str:
+    """A row in COPY's text format"""
+    fields = []
+    for v in values:
+        if v is None:
+            fields.append('\\N')
+        else:
+            fields.append(str(v).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r'))
+    return '\t'.join(fields) + '\n'
+
+
+class CopyStream(io.TextIOBase):
+    """
+    A file for cursor.copy_expert() to read rows from as they're made, instead
+    of writing them all out first.
+    """
+    def __init__(self, rows: Iterable[tuple]) -> None:
+        self._lines = (copy_line(row) for row in rows)
+        self._buffer = ''
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size is None or size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size is None or size < 0:
+            size = len(self._buffer)
+        read, self._buffer = self._buffer[:size], self._buffer[size:]
+        return read
+
 
 # @@@ What is the point of having an 'Instance' type ?
 # Introducing SQLAlchemy!
@@ -60,35 +99,153 @@ class PGInstance(Instance):
     """
     Allow instance data to be stored in a Postgres database
     """
+    columns = ("pk", "date", "instance_type", "operating_system", "region", "cost_per_hr", "cpu_ct", "ram_size_gb", "storage_type", "network_throughput")
+    # what on_conflict='upsert' overwrites, the rest make up the pk
+    value_columns = ("cost_per_hr", "cpu_ct", "ram_size_gb", "storage_type", "network_throughput")
 
     def __init__(self, datestamp: str, region: str, operating_system: str, instance_type: str, cost_per_hr: str, cpu_ct: str, ram_size: str, storage_type: str, network_throughput: str) -> None:
         super().__init__(datestamp, region, operating_system, instance_type, cost_per_hr, cpu_ct, ram_size, storage_type, network_throughput)
 
-    def store(self, conn, table='ec2_instance_pricing') -> bool:
+    @property
+    def pk(self) -> str:
+        return '-'.join([self.datestamp, self.region, self.operating_system, self.instance_type])
+
+    def store(self, conn, table='ec2_instance_pricing', on_conflict='skip') -> bool:
         """
-        Throws UniqueViolation, caught in scrpr.DataCollector.store_postgres()
+        Store one row, in its own transaction. See store_many() for more than one.
+        Returns False if a row with the same pk was already there.
         """
-        curr = conn.cursor()
+        stored, _ = self.store_many(conn, [self], table=table, on_conflict=on_conflict)
+        return stored == 1
+
+    @classmethod
+    def on_conflict_clause(cls, table: str, on_conflict: str = 'skip') -> sql.Composable:
+        """
+        What inserting a row whose pk is already in table does: 'skip' leaves
+        the stored row be, 'upsert' overwrites its value_columns, if any changed.
+        """
+        if on_conflict == 'skip':
+            return sql.SQL("ON CONFLICT (pk) DO NOTHING")
+        if on_conflict == 'upsert':
+            return sql.SQL("ON CONFLICT (pk) DO UPDATE SET ({columns}) = ({excluded}) WHERE ({stored}) IS DISTINCT FROM ({excluded})").format(
+                columns=sql.SQL(', ').join(sql.Identifier(c) for c in cls.value_columns),
+                excluded=sql.SQL(', ').join(sql.Identifier('excluded', c) for c in cls.value_columns),
+                stored=sql.SQL(', ').join(sql.Identifier(table, c) for c in cls.value_columns),
+            )
+        raise ValueError("on_conflict should be one of {}, not '{}'".format(ON_CONFLICT, on_conflict))
+
+    @classmethod
+    def store_many(cls, conn, instances: List['PGInstance'], table='ec2_instance_pricing', on_conflict='skip') -> Tuple[int, int]:
+        """
+        Store e.g. a page of the pricing table in one INSERT and one
+        transaction, instead of one of each per row like store().
+        Returns (stored, already existed): rows whose pk is already in table,
+        or earlier in instances, aren't stored again, but with
+        on_conflict='upsert' the stored row takes their values.
+        """
+        new = {}
+        for instance in instances:
+            new.setdefault(instance.pk, instance)
+        if not new:
+            return 0, len(instances)
         ins = sql.SQL("""
-            INSERT INTO {table} (pk, date, instance_type, operating_system, region, cost_per_hr, cpu_ct, ram_size_gb, storage_type, network_throughput)
-            VALUES (%s, %s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """.format(table=table))
+            INSERT INTO {table} ({columns})
+            VALUES %s
+            {on_conflict}
+            RETURNING (xmax = 0)
+            """).format(
+            table=sql.Identifier(table),
+            columns=sql.SQL(', ').join(map(sql.Identifier, cls.columns)),
+            on_conflict=cls.on_conflict_clause(table, on_conflict),
+        )
+        rows = [(pk, *instance.prep_data()) for pk, instance in new.items()]
+        curr = conn.cursor()
         try:
-            curr.execute(ins, ('-'.join([self.datestamp, self.region, self.operating_system, self.instance_type]), *self.prep_data()))
-        except UniqueViolation:
-            # "a finally clause is always executed before leaving the try statement"
-            return False
+            # a row back for each row inserted or updated, xmax is 0 for the inserted ones
+            returned = execute_values(curr, ins.as_string(conn), rows, page_size=len(rows), fetch=True)
+            conn.commit()
         finally:
+            curr.close()
+        stored = sum(1 for (inserted,) in returned if inserted)
+        if len(returned) > stored:
+            logger.debug("updated {} rows of '{}' whose values had changed".format(len(returned) - stored, table))
+        return stored, len(instances) - stored
+
+    @classmethod
+    def copy_many(cls, conn, instances: List['PGInstance'], table: str) -> int:
+        """
+        Stream instances into table with COPY FROM STDIN, e.g. into a staging
+        table for merge_staged(). Doesn't commit. Returns how many were copied.
+        """
+        copy = sql.SQL("COPY {table} ({columns}) FROM STDIN").format(
+            table=sql.Identifier(table),
+            columns=sql.SQL(', ').join(map(sql.Identifier, cls.columns)),
+        )
+        curr = conn.cursor()
+        try:
+            curr.copy_expert(copy.as_string(conn), CopyStream((instance.pk, *instance.prep_data()) for instance in instances))
+        finally:
+            curr.close()
+        return len(instances)
+
+    @classmethod
+    def create_staging_table(cls, conn, staging: str, table='ec2_instance_pricing') -> None:
+        """A table like table for copy_many() to fill, without its primary key, so that it takes anything"""
+        curr = conn.cursor()
+        try:
+            curr.execute(sql.SQL("CREATE UNLOGGED TABLE IF NOT EXISTS {staging} (LIKE {table} INCLUDING DEFAULTS)").format(
+                staging=sql.Identifier(staging), table=sql.Identifier(table)
+            ))
             conn.commit()
+        finally:
             curr.close()
-        return True
+
+    @classmethod
+    def merge_staged(cls, conn, staging: str, table='ec2_instance_pricing', on_conflict='skip') -> Tuple[int, int]:
+        """
+        Insert the rows copied into staging into table, in one statement, and
+        drop staging. Rows whose pk is already in table, or in staging more
+        than once, aren't stored twice, see store_many() for on_conflict.
+        Returns (stored, already existed), as counted across staging's rows.
+        """
+        columns = sql.SQL(', ').join(map(sql.Identifier, cls.columns))
+        merge = sql.SQL("""
+            WITH staged AS (
+                SELECT DISTINCT ON (pk) {columns} FROM {staging} ORDER BY pk
+            ), stored AS (
+                INSERT INTO {table} ({columns})
+                SELECT {columns} FROM staged
+                {on_conflict}
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT (SELECT count(*) FROM {staging}), (SELECT count(*) FROM stored WHERE inserted)
+            """).format(
+            columns=columns, staging=sql.Identifier(staging), table=sql.Identifier(table),
+            on_conflict=cls.on_conflict_clause(table, on_conflict),
+        )
+        curr = conn.cursor()
+        try:
+            curr.execute(merge)
+            staged, stored = curr.fetchone()
+            curr.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(staging)))
+            conn.commit()
+        finally:
+            curr.close()
+        return stored, staged - stored
 
     # @@ might could move to Instance
     def prep_data(self) -> Tuple[str, str, str, str, float, int, float, str, str]:
         ready_data = self.as_dict()
-        ready_data['cost_per_hr'] = float(self.cost_per_hr.replace('$', ''))
+        # scraped from the page as '$0.0255' and '2 GiB', but numbers already when read from a pricing payload
+        if isinstance(self.cost_per_hr, str):
+            ready_data['cost_per_hr'] = float(self.cost_per_hr.replace('$', ''))
+        else:
+            ready_data['cost_per_hr'] = float(self.cost_per_hr)
         ready_data['cpu_ct'] = int(self.cpu_ct)
-        ready_data['ram_size_gb'] = float(self.ram_size.split(' ')[0])
+        if isinstance(self.ram_size, str):
+            ready_data['ram_size_gb'] = float(self.ram_size.split(' ')[0].replace(',', ''))
+        else:
+            ready_data['ram_size_gb'] = float(self.ram_size)
         return (
             ready_data["date"],
             ready_data["instance_type"],
@@ -0,0 +1,126 @@
+"""
+Serves pricing payloads recorded with --record-payloads from the same paths
+the pricing page downloads them from, so that --collector http can run
+without AWS, e.g. to test it, or to load the same data again.
+
+    python -m scrpr --collector devtools --record-payloads ./payloads --regions us-east-1,us-west-2
+    python -m scrpr.payload_server ./payloads --port 8000 &
+    python -m scrpr --collector http --pricing-url http://localhost:8000 --regions us-east-1,us-west-2
+
+The region codes of the recorded payloads are served as the locations list.
+"""
+import argparse
+import json
+import logging
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Tuple
+from urllib.parse import unquote, urlsplit
+
+from scrpr import scrpr
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_PREFIX, PAYLOAD_SUFFIX = scrpr.PRICING_PAYLOAD_PATH.split('{location}/{os}')
+
+
+def index_payloads(payload_dir: str | Path) -> Tuple[Dict[str, str], Dict[Tuple[str, str], Path]]:
+    """
+    Read the <os>/<region>.json files under payload_dir.
+    Returns (region code -> location, (location, os) -> file).
+    """
+    locations = {}
+    payloads = {}
+    for path in sorted(Path(payload_dir).glob('*/*.json')):
+        with open(path, 'r') as f:
+            payload = json.load(f)
+        for location in payload['regions']:
+            locations[path.stem] = location
+            payloads[(location, path.parent.name)] = path
+    return locations, payloads
+
+
+class PayloadRequestHandler(BaseHTTPRequestHandler):
+    server: 'PayloadServer'
+
+    def do_GET(self) -> None:
+        path = unquote(urlsplit(self.path).path)
+        if path == scrpr.LOCATIONS_PATH:
+            body = json.dumps({
+                location: {'name': location, 'code': code, 'type': 'AWS Region'}
+                for code, location in self.server.locations.items()
+            }).encode()
+        elif path.startswith(PAYLOAD_PREFIX) and path.endswith(PAYLOAD_SUFFIX):
+            location, _, _os = path[len(PAYLOAD_PREFIX):-len(PAYLOAD_SUFFIX)].partition('/')
+            payload_file = self.server.payloads.get((location, _os))
+            if payload_file is None:
+                return self.send_error(404)
+            body = payload_file.read_bytes()
+        else:
+            return self.send_error(404)
+        self.send_body(body, 'application/json')
+
+    def send_body(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        logger.debug(format, *args)
+
+
+class PayloadServer(ThreadingHTTPServer):
+    daemon_threads = True
+    handler_class = PayloadRequestHandler
+
+    def __init__(self, address: Tuple[str, int], payload_dir: str | Path) -> None:
+        self.locations, self.payloads = index_payloads(payload_dir)
+        super().__init__(address, self.handler_class)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+
+def do_args(sys_args):
+    parser = argparse.ArgumentParser(description="Serve recorded pricing payloads to scrpr --collector http.")
+    parser.add_argument("payload_dir",
+        help="directory of <operating system>/<region>.json payloads, as saved by --record-payloads")
+    parser.add_argument("--host",
+        default='127.0.0.1',
+        help="address to listen on")
+    parser.add_argument("--port",
+        type=int,
+        default=8000,
+        help="port to listen on")
+    parser.add_argument("-v",
+        action='count',
+        default=0,
+        help="increase verbosity")
+    parser.add_argument("--log-file",
+        default=os.path.join(scrpr.SCRPR_HOME, "logs", "payload_server.log"),
+        help="path to the log file")
+    return parser.parse_args(sys_args)
+
+
+def main(args) -> int:
+    Path(args.log_file).parent.mkdir(parents=True, exist_ok=True)
+    scrpr.init_logging(verbosity=args.v, follow=True, log_file=args.log_file)
+    server = PayloadServer((args.host, args.port), args.payload_dir)
+    logger.info("serving {} payloads for {} regions at {}".format(len(server.payloads), len(server.locations), server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+    raise SystemExit(main(do_args(sys.argv[1:])))
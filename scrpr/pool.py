@@ -0,0 +1,295 @@
+"""
+A long-running pool of browsers which sit on the EC2 pricing page, ready to
+be borrowed by scrpr runs. Saves each run from launching its own browsers and
+loading the page, which for a run of a few regions takes longer than the
+scraping does.
+
+    python -m scrpr.pool -n 4 &
+    python -m scrpr --pool --regions us-east-1,us-west-2
+
+Runs talk to the pool over a unix socket, one json message per line:
+
+    -> {"op": "lease"}
+    <- {"ok": true, "executor_url": "http://localhost:40123", "session_id": "...", "rss": 212336640}
+    -> {"op": "release"}
+    <- {"ok": true}
+
+A browser stays leased for as long as the connection it was leased over is
+open. Once it is released (or the run dies), the pool reloads the page and
+checks that the browser still works before lending it out again. Idle
+browsers are health checked, and their page reloaded, every so often.
+"""
+import argparse
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from scrpr import scrpr
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolSlot:
+    """One of the pool's browsers."""
+    slot_id: int
+    collector: Optional[scrpr.EC2DataCollector] = None
+    # idle, leased, or busy (starting, reloading, being checked)
+    state: str = 'busy'
+    t_loaded: float = 0.0
+    leases: int = 0
+
+
+class BrowserPool:
+    """
+    Keeps size EC2DataCollectors on the pricing page and lends their browser
+    sessions out. A browser which fails a health check, or has been lent out
+    max_leases times, is replaced by a fresh one.
+    """
+    def __init__(self, size: int, config: scrpr.EC2DataCollectorConfig, health_interval: float = 60.0, reload_interval: float = 600.0, max_leases: int = 0) -> None:
+        self.config = config
+        self.health_interval = health_interval
+        self.reload_interval = reload_interval
+        self.max_leases = max_leases
+        self.slots: List[PoolSlot] = [PoolSlot(n) for n in range(size)]
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start every browser in the background, and the health checks."""
+        for slot in self.slots:
+            self._in_background(self._replace, slot)
+        self._health_thread = threading.Thread(name='health', target=self._health_loop, daemon=True)
+        self._health_thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        with self._lock:
+            for slot in self.slots:
+                if slot.collector is not None:
+                    self._quit(slot)
+
+    def _in_background(self, target, slot: PoolSlot) -> None:
+        threading.Thread(name="slot-{}".format(slot.slot_id), target=target, args=(slot,), daemon=True).start()
+
+    def _set_state(self, slot: PoolSlot, state: str) -> None:
+        with self._lock:
+            slot.state = state
+
+    def _quit(self, slot: PoolSlot) -> None:
+        try:
+            slot.collector.driver.quit()
+        except Exception as e:
+            logger.warning("slot {}: error while quitting browser: {}".format(slot.slot_id, e))
+        slot.collector = None
+
+    def _replace(self, slot: PoolSlot) -> None:
+        """Runs with the slot busy. Swap in a fresh browser, then lend it out."""
+        if slot.collector is not None:
+            self._quit(slot)
+        slot.leases = 0
+        while not self._stopped.is_set():
+            try:
+                slot.collector = scrpr.EC2DataCollector(_id="pool-{}".format(slot.slot_id), config=self.config)
+                # EC2DataCollector leaves the dropdown menus it looked at opened
+                slot.collector.prep_driver(reload=True)
+                if self.is_healthy(slot):
+                    break
+            except Exception as e:
+                logger.error("slot {}: could not start a browser: {}".format(slot.slot_id, e), exc_info=True)
+            if slot.collector is not None:
+                self._quit(slot)
+            self._stopped.wait(self.health_interval)
+        if slot.collector is None:
+            return
+        slot.t_loaded = time.time()
+        self._set_state(slot, 'idle')
+        logger.info("slot {}: browser ready".format(slot.slot_id))
+
+    def _reload(self, slot: PoolSlot) -> None:
+        """Runs with the slot busy. Put the browser back on a freshly loaded pricing page."""
+        if self.max_leases and slot.leases >= self.max_leases:
+            logger.info("slot {}: replacing browser after {} leases".format(slot.slot_id, slot.leases))
+            return self._replace(slot)
+        try:
+            slot.collector.prep_driver(reload=True)
+        except Exception as e:
+            logger.warning("slot {}: reload failed: {}".format(slot.slot_id, e))
+        if not self.is_healthy(slot):
+            logger.warning("slot {}: browser is unhealthy, replacing it".format(slot.slot_id))
+            return self._replace(slot)
+        slot.t_loaded = time.time()
+        self._set_state(slot, 'idle')
+
+    def is_healthy(self, slot: PoolSlot) -> bool:
+        """The browser responds, and its page has the pricing iframe."""
+        try:
+            driver = slot.collector.driver
+            if driver.execute_script("return document.readyState") != 'complete':
+                return False
+            return len(driver.find_elements('id', "iFrameResizer0")) == 1
+        except Exception as e:
+            logger.debug("slot {}: health check failed: {}".format(slot.slot_id, e))
+            return False
+
+    def check_idle(self) -> None:
+        """Health check idle browsers, reloading any whose page is older than reload_interval."""
+        now = time.time()
+        for slot in self.slots:
+            with self._lock:
+                if slot.state != 'idle':
+                    continue
+                slot.state = 'busy'
+            if now - slot.t_loaded > self.reload_interval or not self.is_healthy(slot):
+                self._reload(slot)
+            else:
+                self._set_state(slot, 'idle')
+
+    def _health_loop(self) -> None:
+        while not self._stopped.wait(self.health_interval):
+            self.check_idle()
+
+    def lease(self) -> Optional[PoolSlot]:
+        """An idle slot, now leased, or None."""
+        with self._lock:
+            for slot in self.slots:
+                if slot.state == 'idle':
+                    slot.state = 'leased'
+                    slot.leases += 1
+                    return slot
+        return None
+
+    def release(self, slot: PoolSlot) -> None:
+        """Take a slot back. It becomes idle again once its page has been reloaded."""
+        self._set_state(slot, 'busy')
+        self._in_background(self._reload, slot)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            states = [slot.state for slot in self.slots]
+        return {state: states.count(state) for state in ('idle', 'leased', 'busy')}
+
+
+class PoolRequestHandler(socketserver.StreamRequestHandler):
+    """Serves one connection. At most one browser is leased over it at a time."""
+    server: 'PoolServer'
+
+    def handle(self) -> None:
+        pool = self.server.pool
+        slot: Optional[PoolSlot] = None
+        try:
+            for line in self.rfile:
+                try:
+                    op = json.loads(line).get('op')
+                except (ValueError, AttributeError):
+                    self._reply({'ok': False, 'error': 'bad request'})
+                    continue
+                if op == 'lease' and slot is None:
+                    slot = pool.lease()
+                    if slot is None:
+                        self._reply({'ok': False, 'error': 'no idle browsers'})
+                        continue
+                    driver = slot.collector.driver
+                    self._reply({
+                        'ok': True,
+                        'executor_url': driver.service.service_url,
+                        'session_id': driver.session_id,
+                        'rss': slot.collector.get_driver_rss(),
+                    })
+                elif op == 'release' and slot is not None:
+                    pool.release(slot)
+                    slot = None
+                    self._reply({'ok': True})
+                elif op == 'status':
+                    self._reply({'ok': True, **pool.status()})
+                else:
+                    self._reply({'ok': False, 'error': "can't {} now".format(op)})
+        finally:
+            # the run went away without releasing its browser
+            if slot is not None:
+                logger.warning("slot {}: connection closed while leased, taking browser back".format(slot.slot_id))
+                pool.release(slot)
+
+    def _reply(self, msg: Dict[str, Any]) -> None:
+        self.wfile.write((json.dumps(msg) + '\n').encode())
+        self.wfile.flush()
+
+
+class PoolServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, pool: BrowserPool) -> None:
+        self.pool = pool
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, PoolRequestHandler)
+
+
+def do_args(sys_args):
+    parser = argparse.ArgumentParser(description="Keep browsers warm on the EC2 pricing page for scrpr runs to borrow.")
+    parser.add_argument("-n", "--size",
+        type=int,
+        default=2,
+        help="number of browsers to keep")
+    parser.add_argument("--socket",
+        default=scrpr.DEFAULT_POOL_SOCKET,
+        help="unix socket to listen on")
+    parser.add_argument("--health-interval",
+        type=float,
+        default=60.0,
+        help="seconds between health checks of idle browsers")
+    parser.add_argument("--reload-interval",
+        type=float,
+        default=600.0,
+        help="reload an idle browser's page once it is this many seconds old")
+    parser.add_argument("--max-leases",
+        type=int,
+        default=0,
+        help="replace a browser after it has been lent out this many times (0 to never)")
+    parser.add_argument("-v",
+        action='count',
+        default=0,
+        help="increase verbosity")
+    parser.add_argument("--log-file",
+        default=os.path.join(scrpr.SCRPR_HOME, "logs", "pool.log"),
+        help="path to the log file")
+    return parser.parse_args(sys_args)
+
+
+def main(args) -> int:
+    Path(args.log_file).parent.mkdir(parents=True, exist_ok=True)
+    scrpr.init_logging(verbosity=args.v, follow=True, log_file=args.log_file)
+    if not scrpr.DataCollector.version_check():
+        return 1
+    config = scrpr.EC2DataCollectorConfig(human_date=scrpr.get_date().strftime("%Y-%m-%d"))
+    pool = BrowserPool(
+        args.size,
+        config,
+        health_interval=args.health_interval,
+        reload_interval=args.reload_interval,
+        max_leases=args.max_leases,
+    )
+    pool.start()
+    server = PoolServer(args.socket, pool)
+    logger.info("browser pool of {} listening on '{}'".format(args.size, args.socket))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+        pool.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+    raise SystemExit(main(do_args(sys.argv[1:])))
@@ -0,0 +1,339 @@
+"""
+A stand-in for the EC2 pricing page and its pricing table iframe, filled
+with recorded pricing payloads, so that EC2DataCollector, EC2Table and
+EC2Dropdown can be run (and timed, see scrpr.bench) without AWS.
+
+    python -m scrpr.replay ./payloads --port 8000 --page-size 50 --latency-ms 200 &
+    python -m scrpr --page-url http://localhost:8000/ec2/pricing/on-demand/ --regions us-east-1
+
+It isn't a copy of the real page, only of the parts scrpr finds its way
+around by: the iframe, the data analytics labelled dropdown menus and their
+listboxes, the row count heading, the table and its pagination. Picking an
+operating system or region downloads the payload the way the real page does
+(so --collector devtools works too), and the table re-renders latency_ms
+after any filter or page change. Serves the payloads themselves as well,
+like scrpr.payload_server.
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from scrpr import scrpr
+from scrpr.payload_server import PayloadRequestHandler, PayloadServer
+
+logger = logging.getLogger(__name__)
+
+REPLAY_PAGE_PATH = '/ec2/pricing/on-demand/'
+REPLAY_IFRAME_PATH = REPLAY_PAGE_PATH + 'table.html'
+DEFAULT_PAGE_SIZE = 50
+ALL_VCPUS = 'All vCPUs'
+
+PAGE_HTML = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Amazon EC2 On-Demand Pricing (scrpr replay)</title></head>
+<body>
+<h1>Amazon EC2 On-Demand Pricing</h1>
+<iframe id="iFrameResizer0" src="table.html" style="width: 100%; height: 3000px; border: 0;"></iframe>
+</body>
+</html>
+"""
+
+IFRAME_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<style>
+  .filter { display: inline-block; position: relative; margin: 0 1em 1em 0; vertical-align: top; }
+  .filter ul { position: absolute; z-index: 1; margin: 0; padding: 0; list-style: none; background: white; border: 1px solid grey; }
+  .filter li { padding: 0.25em 1em; cursor: pointer; }
+  .pagination li { display: inline-block; }
+</style>
+</head>
+<body>
+<div id="filters"></div>
+<div data-selection-root>
+  <h2>Instances <span></span></h2>
+  <table>
+    <thead><tr><th>Instance name</th><th>On-Demand hourly rate</th><th>vCPU</th><th>Memory</th><th>Storage</th><th>Network performance</th></tr></thead>
+    <tbody></tbody>
+  </table>
+  <ul class="pagination"></ul>
+</div>
+<script>
+var REPLAY = __REPLAY__;
+var state = {locationType: 'AWS Region', os: REPLAY.os, region: REPLAY.region, vcpu: REPLAY.allVcpus, rows: toRows(REPLAY.initialPayload), page: 1};
+var loads = 0;
+
+function toRows(payload) {
+  var rows = [];
+  Object.values(payload.regions).forEach(function (items) {
+    Object.values(items).forEach(function (item) {
+      rows.push([item['Instance Type'], '$' + parseFloat(item.price), item.vCPU, item.Memory, item.Storage, item['Network Performance']]);
+    });
+  });
+  return rows;
+}
+
+function el(tag, attrs, children) {
+  var e = document.createElement(tag);
+  Object.keys(attrs).forEach(function (name) { e.setAttribute(name, attrs[name]); });
+  (children || []).forEach(function (c) { e.append(c); });
+  return e;
+}
+
+function lines(option) {
+  return option.map(function (line) { return el('div', {}, [line]); });
+}
+
+function visibleRows() {
+  return state.rows.filter(function (row) { return state.vcpu === REPLAY.allVcpus || row[2] === state.vcpu; });
+}
+
+function render() {
+  var rows = visibleRows(), pages = Math.max(1, Math.ceil(rows.length / REPLAY.pageSize));
+  state.page = Math.min(state.page, pages);
+  var start = (state.page - 1) * REPLAY.pageSize;
+  document.querySelector('tbody').replaceChildren.apply(document.querySelector('tbody'), rows.slice(start, start + REPLAY.pageSize).map(function (row) {
+    return el('tr', {}, row.map(function (v) { return el('td', {}, [v]); }));
+  }));
+  document.querySelector('h2 > span').textContent = rows.length + ' available instances';
+  var items = [el('li', {'data-page': 'previous'}, [el('button', {'aria-label': 'Previous page'}, ['<'])])];
+  for (var p = 1; p <= pages; p++) {
+    items.push(el('li', {'data-page': p}, [el('button', p === state.page ? {'aria-current': 'true'} : {}, [String(p)])]));
+  }
+  items.push(el('li', {'data-page': 'next'}, [el('button', {'aria-label': 'Next page'}, ['>'])]));
+  var pagination = document.querySelector('.pagination');
+  pagination.replaceChildren.apply(pagination, items);
+}
+
+function later(f) {
+  var mine = ++loads;
+  setTimeout(function () { if (mine === loads) { f(); render(); } }, REPLAY.latencyMs);
+}
+
+function load() {
+  var url = REPLAY.payloadPath.replace('{location}', encodeURIComponent(REPLAY.locations[state.region])).replace('{os}', encodeURIComponent(state.os));
+  var mine = ++loads;
+  fetch(url).then(function (r) { return r.ok ? r.json() : {regions: {}}; }).then(function (payload) {
+    if (mine !== loads) { return; }
+    later(function () { state.rows = toRows(payload); state.page = 1; });
+  });
+}
+
+function dropdown(d) {
+  var button = el('button', {id: d.id, type: 'button'}, lines(d.options.find(function (o) { return o[o.length - 1] === state[d.key]; }) || d.options[0]));
+  var listbox = el('ul', {role: 'listbox', hidden: ''}, d.options.map(function (option) {
+    var value = option[option.length - 1];
+    var li = el('li', {role: 'option', 'aria-selected': String(value === state[d.key])}, lines(option));
+    li.addEventListener('click', function () {
+      listbox.hidden = true;
+      if (value === state[d.key]) { return; }
+      listbox.querySelectorAll('li').forEach(function (other) { other.setAttribute('aria-selected', String(other === li)); });
+      button.replaceChildren.apply(button, lines(option));
+      state[d.key] = value;
+      if (d.key === 'vcpu') { later(function () { state.page = 1; }); } else if (d.key !== 'locationType') { load(); }
+    });
+    return li;
+  }));
+  button.addEventListener('click', function () {
+    var hidden = listbox.hidden;
+    document.querySelectorAll('[role=listbox]').forEach(function (other) { other.hidden = true; });
+    listbox.hidden = !hidden;
+  });
+  var label = el('label', {id: d.id + '-label'}, [d.label]);
+  return el('div', {'class': 'filter', 'data-analytics-field-label': 'id="' + d.id + '-label"'}, [label, button, listbox]);
+}
+
+[
+  {id: 'filter-location-type', label: 'Location Type', key: 'locationType', options: [['AWS Region']]},
+  {id: 'filter-operating-system', label: 'Operating system', key: 'os', options: REPLAY.oses.map(function (o) { return [o]; })},
+  {id: 'filter-region', label: 'Region', key: 'region', options: REPLAY.regions},
+  {id: 'filter-vcpu', label: 'vCPU', key: 'vcpu', options: [[REPLAY.allVcpus]].concat(REPLAY.vcpus.map(function (v) { return [v]; }))}
+].forEach(function (d) { document.getElementById('filters').append(dropdown(d)); });
+
+document.querySelector('.pagination').addEventListener('click', function (event) {
+  var li = event.target.closest('li'), pages = Math.max(1, Math.ceil(visibleRows().length / REPLAY.pageSize));
+  if (!li) { return; }
+  var page = li.dataset.page === 'previous' ? state.page - 1 : li.dataset.page === 'next' ? state.page + 1 : Number(li.dataset.page);
+  if (page < 1 || page > pages || page === state.page) { return; }
+  later(function () { state.page = page; });
+});
+
+render();
+</script>
+</body>
+</html>
+"""
+
+
+def synthesize_payloads(payload_dir: str | Path, oses: List[str], regions: List[str], rows: int) -> None:
+    """
+    Save made up payloads of rows instance types for each operating system
+    and region under payload_dir, for tables of whatever size is wanted.
+    The same arguments always make the same payloads.
+    """
+    vcpus = [1, 2, 4, 8, 16, 32, 48, 64, 96, 128]
+    for _os in oses:
+        for region in regions:
+            location = "Replay {}".format(region)
+            items = {}
+            for n in range(rows):
+                vcpu = vcpus[n % len(vcpus)]
+                instance_type = "r{}.{}xlarge".format(n // len(vcpus), vcpu)
+                items["{} {}".format(instance_type, _os)] = {
+                    'price': "{:.10f}".format(0.0125 * vcpu * (1 + n % 3)),
+                    'Location': location,
+                    'vCPU': str(vcpu),
+                    'Instance Type': instance_type,
+                    'Memory': "{} GiB".format(vcpu * 4),
+                    'Storage': 'EBS Only',
+                    'Network Performance': 'Up to 10 Gigabit',
+                    'Operating System': _os,
+                }
+            scrpr.save_payload(payload_dir, _os, region, {'manifest': {'serviceId': 'ec2', 'currencyCode': 'USD'}, 'sets': {}, 'regions': {location: items}})
+
+
+class ReplayRequestHandler(PayloadRequestHandler):
+    server: 'ReplayServer'
+
+    def do_GET(self) -> None:
+        path = urlsplit(self.path).path
+        if path == REPLAY_PAGE_PATH:
+            return self.send_body(PAGE_HTML.encode(), 'text/html; charset=utf-8')
+        if path == REPLAY_IFRAME_PATH:
+            return self.send_body(self.server.iframe_html().encode(), 'text/html; charset=utf-8')
+        super().do_GET()
+
+
+class ReplayServer(PayloadServer):
+    handler_class = ReplayRequestHandler
+
+    def __init__(self, address: Tuple[str, int], payload_dir: str | Path, page_size: int = DEFAULT_PAGE_SIZE, latency_ms: int = 0) -> None:
+        self.page_size = page_size
+        self.latency_ms = latency_ms
+        super().__init__(address, payload_dir)
+
+    @property
+    def page_url(self) -> str:
+        """For EC2DataCollectorConfig.url"""
+        return self.url + REPLAY_PAGE_PATH
+
+    def tasks(self) -> List[Tuple[str, str]]:
+        """(operating system, region) of every recorded payload"""
+        codes = {location: code for code, location in self.locations.items()}
+        return [(_os, codes[location]) for location, _os in self.payloads]
+
+    def payload(self, _os: str, region: str) -> Dict[str, Any]:
+        """The recorded payload for _os and region, or one without any rows"""
+        payload_file = self.payloads.get((self.locations.get(region), _os))
+        if payload_file is None:
+            return {'regions': {}}
+        with open(payload_file, 'r') as f:
+            return json.load(f)
+
+    def rows(self, _os: str, region: str) -> List[list]:
+        """What the table should show for _os and region"""
+        return scrpr.parse_pricing_payload(self.payload(_os, region))
+
+    def replay_config(self) -> Dict[str, Any]:
+        """What the iframe's script needs to know about the recorded payloads"""
+        oses = sorted({_os for _, _os in self.payloads})
+        codes = sorted(self.locations)
+        vcpus = sorted({row[2] for task in self.tasks() for row in self.rows(*task)})
+        _os = 'Linux' if 'Linux' in oses else next(iter(oses), None)
+        region = 'us-east-1' if 'us-east-1' in codes else next(iter(codes), None)
+        return {
+            'oses': oses,
+            'regions': [[self.locations[code], code] for code in codes],
+            'locations': self.locations,
+            'vcpus': [str(v) for v in vcpus],
+            'allVcpus': ALL_VCPUS,
+            # what the page shows before anything is picked, without waiting for a download
+            'os': _os,
+            'region': region,
+            'initialPayload': self.payload(_os, region),
+            'payloadPath': scrpr.PRICING_PAYLOAD_PATH,
+            'pageSize': self.page_size,
+            'latencyMs': self.latency_ms,
+        }
+
+    def iframe_html(self) -> str:
+        return IFRAME_HTML.replace('__REPLAY__', json.dumps(self.replay_config()).replace('</', '<\\/'))
+
+
+def do_args(sys_args):
+    parser = argparse.ArgumentParser(description="Serve a stand-in EC2 pricing page, filled with recorded pricing payloads.")
+    parser.add_argument("payload_dir",
+        nargs='?',
+        default=None,
+        help="directory of <operating system>/<region>.json payloads, as saved by --record-payloads")
+    parser.add_argument("--synthetic-rows",
+        type=int,
+        default=None,
+        metavar='N',
+        help="instead of payload_dir, serve made up tables of N rows for --operating-systems and --regions")
+    parser.add_argument("--operating-systems",
+        default='Linux',
+        help="comma separated, with --synthetic-rows")
+    parser.add_argument("--regions",
+        default='us-east-1',
+        help="comma separated, with --synthetic-rows")
+    parser.add_argument("--page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help="rows per page of the table")
+    parser.add_argument("--latency-ms",
+        type=int,
+        default=0,
+        help="how long the table takes to re-render after a filter or page change")
+    parser.add_argument("--host",
+        default='127.0.0.1',
+        help="address to listen on")
+    parser.add_argument("--port",
+        type=int,
+        default=8000,
+        help="port to listen on")
+    parser.add_argument("-v",
+        action='count',
+        default=0,
+        help="increase verbosity")
+    parser.add_argument("--log-file",
+        default=os.path.join(scrpr.SCRPR_HOME, "logs", "replay.log"),
+        help="path to the log file")
+    args = parser.parse_args(sys_args)
+    if (args.payload_dir is None) == (args.synthetic_rows is None):
+        parser.error("one of payload_dir or --synthetic-rows is required")
+    return args
+
+
+def payload_dir_of(args) -> str:
+    """args.payload_dir, or a temporary directory of synthetic payloads"""
+    if args.payload_dir is not None:
+        return args.payload_dir
+    payload_dir = tempfile.mkdtemp(prefix='scrpr-replay-')
+    synthesize_payloads(payload_dir, args.operating_systems.split(','), args.regions.split(','), args.synthetic_rows)
+    return payload_dir
+
+
+def main(args) -> int:
+    Path(args.log_file).parent.mkdir(parents=True, exist_ok=True)
+    scrpr.init_logging(verbosity=args.v, follow=True, log_file=args.log_file)
+    server = ReplayServer((args.host, args.port), payload_dir_of(args), page_size=args.page_size, latency_ms=args.latency_ms)
+    logger.info("serving the pricing page with {} tables at {}".format(len(server.payloads), server.page_url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+    raise SystemExit(main(do_args(sys.argv[1:])))
@@ -10,11 +10,15 @@ from selenium.webdriver.remote.webdriver import WebDriver
 import zipfile
 import logging
 from logging.handlers import RotatingFileHandler
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from copy import copy
 import threading
+import queue
+import heapq
 import argparse
 from argparse import BooleanOptionalAction
+import multiprocessing
+import multiprocessing.connection
 from multiprocessing import cpu_count
 # 99% sure catching SIGINT hangs Selenium
 # update: we have to wait for Selenium to close all of its webdrivers if you
@@ -26,13 +30,18 @@ from multiprocessing import cpu_count
 # import signal
 import os
 import shutil
+import socket
 from uuid import uuid1
 from contextlib import contextmanager
+from concurrent.futures import Future
 import dotenv
-from collections import OrderedDict
+import psutil
+from collections import OrderedDict, Counter
 import json
+import hashlib
 import re
 import warnings
+from urllib.parse import unquote, quote
 from textwrap import dedent
 
 
@@ -44,11 +53,12 @@ from selenium.webdriver.common import action_chains
 from selenium import webdriver
 from selenium.webdriver.remote.command import Command
 from selenium.common import exceptions as selenium_exception
+import urllib3
 import psycopg2
-from psycopg2.errors import UniqueViolation
+from psycopg2.errors import UniqueViolation, UndefinedTable
 from psycopg2 import sql
 
-from .instance import Instance, PGInstance
+from .instance import ON_CONFLICT, Instance, PGInstance
 from .api.sql_app import crud, database
 
 logger = logging.getLogger(__name__)
@@ -61,6 +71,23 @@ SCRPR_HOME = os.path.join(os.path.expanduser('~'), '.local', 'share', 'scrpr')
 # this is overridable with the flag --csv-data-dir
 DEFAULT_CSV_DATA_DIR = os.path.join(SCRPR_HOME, "csv-data")
 DEFAULT_METRICS_DATA_FILE = os.path.join(SCRPR_HOME, "metric-data.txt")
+DEFAULT_TASK_STATS_FILE = os.path.join(SCRPR_HOME, "task-stats.json")
+DEFAULT_DROPDOWN_CACHE_FILE = os.path.join(SCRPR_HOME, "dropdowns.json")
+DEFAULT_DROPDOWN_CACHE_TTL = 24 * 60 * 60
+DEFAULT_POOL_SOCKET = os.path.join(SCRPR_HOME, "pool.sock")
+DEFAULT_SHARD_DIR = os.path.join(SCRPR_HOME, "shards")
+DEFAULT_LEDGER_DIR = os.path.join(SCRPR_HOME, "ledger")
+# where the pricing page downloads its data from
+DEFAULT_PRICING_URL = 'https://b0.p.awsstatic.com'
+# the pricing page itself, or a scrpr.replay stand-in for it
+DEFAULT_PAGE_URL = 'https://aws.amazon.com/ec2/pricing/on-demand/'
+# EC2HttpDataCollectors are cheap, use plenty
+HTTP_THREAD_COUNT = 16
+# how many scraped pages may wait for each storage writer before workers have to, see --storage-writers
+STORAGE_QUEUE_PAGES_PER_WRITER = 4
+DEFAULT_MEMORY_FLOOR_MB = 512
+# renderer memory keeps growing after init, so leave room for it
+AUTO_THREAD_RSS_HEADROOM = 1.5
 DEFAULT_LOG_FILE = os.path.join(SCRPR_HOME, "logs", "scrpr.log")
 
 ERRORS = []
@@ -75,9 +102,10 @@ ROWS_ALREADY_EXISTED = 0
 
 def set_api_status(status: str):
     try:
-        fastapi_db = database.SessionLocal()
-        logger.debug(f"state transition: {crud.get_system_status(fastapi_db)} -> {status}")
-        crud.set_system_status(status, fastapi_db)
+        # hands its connection back to the api engine's pool when done
+        with database.SessionLocal() as fastapi_db:
+            logger.debug(f"state transition: {crud.get_system_status(fastapi_db)} -> {status}")
+            crud.set_system_status(status, fastapi_db)
     except Exception:
         logger.warning("unable to set api status (desired status is '{}')".format(status))
 
@@ -157,6 +185,300 @@ class DatabaseConfig:
         return dsl
 
 
+class DBPool:
+    """
+    Connections to a Postgres database, shared by the workers and the run's
+    bookkeeping instead of each opening their own. Use shared() to get the
+    process's pool for a DatabaseConfig, and connection() to borrow from it.
+
+    At most size connections are open at once. Borrowers wait for one to be
+    returned, and how long they waited is recorded in WAITS as 'db_pool'.
+    A connection which has sat idle for health_check_after seconds is checked
+    before it's lent out again, and replaced if it's gone bad, as is one
+    which was lent out when the connection failed.
+
+    A forked worker process starts a pool of its own. The connections it
+    inherited are kept, unused, until it exits: closing them, or letting them
+    be garbage collected, would end the parent's sessions on the same sockets.
+    """
+    _shared: Dict[str, 'DBPool'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, dsl: str, size: int = 2, health_check_after: float = 30.0) -> None:
+        self.dsl = dsl
+        self.size = size
+        self.health_check_after = health_check_after
+        self.reconnects = 0
+        self._cond = threading.Condition()
+        self._inherited: List[Tuple[Any, float]] = []
+        self._idle: List[Tuple[Any, float]] = []
+        self._reset()
+
+    def _reset(self) -> None:
+        # never closed, see above
+        self._inherited.extend(self._idle)
+        # (connection, when it was returned)
+        self._idle = []
+        self._open = 0
+        self._pid = os.getpid()
+
+    @classmethod
+    def shared(cls, db_config: DatabaseConfig) -> 'DBPool':
+        dsl = db_config.get_dsl()
+        with cls._shared_lock:
+            if dsl not in cls._shared:
+                cls._shared[dsl] = cls(dsl)
+            return cls._shared[dsl]
+
+    def resize(self, size: int) -> None:
+        with self._cond:
+            self.size = size
+            self._cond.notify_all()
+
+    @staticmethod
+    def is_healthy(conn) -> bool:
+        if conn.closed:
+            return False
+        try:
+            curr = conn.cursor()
+            curr.execute("SELECT 1")
+            curr.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        t_start = time.monotonic()
+        with self._cond:
+            if self._pid != os.getpid():
+                # a forked worker process: the parent's connections aren't ours to use, or to close
+                self._reset()
+            while not self._idle and self._open >= self.size:
+                self._cond.wait()
+            WAITS.record('db_pool', time.monotonic() - t_start)
+            conn, t_idle = self._idle.pop() if self._idle else (None, None)
+            if conn is None:
+                self._open += 1
+        if conn is not None and (conn.closed or (time.monotonic() - t_idle >= self.health_check_after and not self.is_healthy(conn))):
+            logger.info("reconnecting to the database, a pooled connection went bad")
+            self.reconnects += 1
+            self._close(conn)
+            conn = None
+        if conn is None:
+            try:
+                conn = psycopg2.connect(self.dsl)
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def _checkin(self, conn, broken: bool) -> None:
+        if not broken and not conn.closed:
+            try:
+                # whatever the borrower didn't commit isn't left for the next one
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        broken = broken or bool(conn.closed)
+        if broken:
+            self._close(conn)
+        with self._cond:
+            if broken:
+                self._open -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @staticmethod
+    def _close(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self._checkin(conn, broken)
+
+    def close(self) -> None:
+        """Close the idle connections, e.g. at the end of a run."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+
+class StorageWriters:
+    """
+    Threads which store the pages of rows workers scrape, so that a worker's
+    browser moves on to the next page instead of waiting on the database.
+    Workers submit() pages onto a queue of at most depth pages, and only wait
+    for room on it when the writers have fallen behind. That wait is recorded
+    in WAITS as 'storage_queue', and how long each page took to store as
+    'storage_write'; summary() has how deep the queue got.
+
+    One per process, see shared(). Each writer borrows its connections from
+    the DBPool of db_config.
+    """
+    _shared: Optional['StorageWriters'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_config: DatabaseConfig, count: int = 2, depth: Optional[int] = None) -> None:
+        self.db_config = db_config
+        self.count = count
+        self.depth = depth or count * STORAGE_QUEUE_PAGES_PER_WRITER
+        pool = DBPool.shared(db_config)
+        if pool.size < count + 1:
+            # room for the writers and the worker waiting on them, e.g. in a worker process
+            pool.resize(count + 1)
+        self.queue: queue.Queue = queue.Queue(maxsize=self.depth)
+        # how many pages were waiting each time one was submitted
+        self.depths: List[int] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._threads = [
+            threading.Thread(name="writer-{}".format(n), target=self._write, daemon=True)
+            for n in range(count)
+        ]
+        for t in self._threads:
+            t.start()
+
+    @classmethod
+    def shared(cls, db_config: DatabaseConfig, count: int) -> 'StorageWriters':
+        with cls._shared_lock:
+            # a forked worker process starts writers of its own
+            if cls._shared is None or cls._shared._pid != os.getpid():
+                cls._shared = cls(db_config, count)
+            return cls._shared
+
+    @classmethod
+    def close_shared(cls) -> Optional['StorageWriters']:
+        """Stop this process's writers once they've stored what's queued. Returns them, for summary()."""
+        with cls._shared_lock:
+            writers, cls._shared = cls._shared, None
+        if writers is not None:
+            writers.close()
+        return writers
+
+    def submit(self, store, *args) -> Future:
+        """
+        Queue store(conn, *args) for a writer, committing after it. Blocks
+        while the queue is full. The returned Future has store's result, or
+        what it raised.
+        """
+        future: Future = Future()
+        t_start = time.monotonic()
+        self.queue.put((future, store, args))
+        WAITS.record('storage_queue', time.monotonic() - t_start)
+        with self._lock:
+            self.depths.append(self.queue.qsize())
+        return future
+
+    def _write(self) -> None:
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            future, store, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            t_start = time.monotonic()
+            try:
+                with DBPool.shared(self.db_config).connection() as conn:
+                    result = store(conn, *args)
+                    conn.commit()
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+            WAITS.record('storage_write', time.monotonic() - t_start)
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self.queue.put(None)
+        for t in self._threads:
+            t.join()
+
+    def summary(self) -> List[str]:
+        with self._lock:
+            depths = self.depths or [0]
+            return ["{} storage writers: queue of {} pages, {:.1f} waiting on average, {} at most, {} times full".format(
+                self.count, self.depth, sum(depths) / len(depths), max(depths), depths.count(self.depth)
+            )]
+
+
+@dataclass
+class BlockProfile:
+    """
+    Page resources a worker's browser doesn't load: the pricing table lives in
+    an iframe, and needs none of the marketing page's pictures, videos, fonts
+    or tags. Blocked with DevTools (Network.setBlockedURLs) and, for images,
+    Chrome's content settings.
+    """
+    name: str
+    # keys of RESOURCE_TYPE_PATTERNS
+    resource_types: Tuple[str, ...] = ()
+    # DevTools url patterns, '*' matches anything
+    url_patterns: Tuple[str, ...] = ()
+
+    def blocked_urls(self) -> List[str]:
+        return [p for t in self.resource_types for p in RESOURCE_TYPE_PATTERNS[t]] + list(self.url_patterns)
+
+    def chrome_prefs(self) -> Dict[str, int]:
+        # 2 = block
+        return {CHROME_CONTENT_SETTINGS[t]: 2 for t in self.resource_types if t in CHROME_CONTENT_SETTINGS}
+
+
+RESOURCE_TYPE_PATTERNS = {
+    'image': ('*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.svg*', '*.ico*'),
+    'font': ('*.woff*', '*.woff2*', '*.ttf*', '*.otf*', '*.eot*'),
+    'media': ('*.mp4*', '*.webm*', '*.m3u8*', '*.mp3*'),
+}
+CHROME_CONTENT_SETTINGS = {
+    'image': 'profile.managed_default_content_settings.images',
+}
+# analytics beacons and third party tags on the marketing page
+TAG_URL_PATTERNS = (
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googleadservices.com*',
+    '*facebook.net*', '*facebook.com/tr*', '*linkedin.com/px*', '*licdn.com*', '*ads-twitter.com*',
+    '*bat.bing.com*', '*demdex.net*', '*omtrdc.net*', '*everesttech.net*', '*adsrvr.org*',
+)
+BLOCK_PROFILES = {
+    'none': BlockProfile('none'),
+    'media': BlockProfile('media', resource_types=('image', 'font', 'media')),
+    'heavy': BlockProfile('heavy', resource_types=('image', 'font', 'media'), url_patterns=TAG_URL_PATTERNS),
+}
+
+
+@dataclass
+class BlockStats:
+    """What a browser blocked and loaded, according to its performance log."""
+    requests_blocked: int = 0
+    requests_loaded: int = 0
+    bytes_loaded: int = 0
+    # DevTools resource type -> requests blocked
+    blocked_by_type: Counter = field(default_factory=Counter)
+
+    def __str__(self) -> str:
+        return "blocked {} requests ({}), loaded {} requests, {:.2f} MB".format(
+            self.requests_blocked,
+            ", ".join("{} {}".format(n, t) for t, n in self.blocked_by_type.most_common()) or "none",
+            self.requests_loaded,
+            self.bytes_loaded / 1024 / 1024,
+        )
+
+
 @dataclass
 class DataCollectorConfig:
     """
@@ -165,39 +487,672 @@ class DataCollectorConfig:
     human_date: (YYYY-MM-DD) required
     db_config: None to supress writing to a database.
     csv_data_dir: None to supress writing to a database.
-    url: no touch. nein.
+    url: the pricing page, e.g. a scrpr.replay server's page_url instead of AWS's
     headless: False to start windowed browsers
     window_w: width of browser resolution (still applies if headless=False)
     window_h: height of browser resolution (still applies if headless=False)
+    recycle_after_tasks: replace the browser after this many tasks (0 to never)
+    recycle_rss_mb: replace the browser once its processes use this much memory (0 to never)
+    pool_socket: borrow browsers from the scrpr.pool daemon listening here, if it has any idle
+    block_profile: page resources the browser doesn't load, see BLOCK_PROFILES
     """
     human_date: str
     headless: bool = True
     window_w: int = 1920
     window_h: int = 1080
+    recycle_after_tasks: int = 0
+    recycle_rss_mb: int = 0
+    pool_socket: Optional[str] = None
+    block_profile: Optional[BlockProfile] = None
+    # where EC2DataCollectors keep the dropdown menus they found, None to always look
+    dropdown_cache: Optional[str] = DEFAULT_DROPDOWN_CACHE_FILE
+    dropdown_cache_ttl: float = DEFAULT_DROPDOWN_CACHE_TTL
 
 
 @dataclass
 class EC2DataCollectorConfig(DataCollectorConfig):
-    url: str = 'https://aws.amazon.com/ec2/pricing/on-demand/'
+    url: str = DEFAULT_PAGE_URL
     db_config: Optional[DatabaseConfig] = None  # @@@ what happens with this is None?
     csv_data_dir: Optional[str] = None
+    # 'cells' reads each table cell through the WebDriver, 'js' reads a whole page in one script
+    row_extraction: str = 'cells'
+    # read every row of the table from the page's own data, instead of page by page
+    full_table: bool = False
+    # save each pricing payload read by EC2NetworkDataCollector or EC2HttpDataCollector here, as <os>/<region>.json
+    payload_dir: Optional[str] = None
+    # where EC2HttpDataCollector downloads the pricing data from
+    pricing_url: str = DEFAULT_PRICING_URL
+    # COPY rows into this table instead of inserting them, for merge_staging_table() to store, see --db-load-mode
+    staging_table: Optional[str] = None
+    # what storing a row that's already stored does, one of instance.ON_CONFLICT, see --db-conflict
+    db_conflict: str = 'skip'
+    # hand each page to this many StorageWriters to store, instead of storing it from the worker, see --storage-writers
+    storage_writers: int = 0
 
 
 seconds_to_timer = lambda x: f"{floor(x/60)}m:{x%60:.1000f}s ({x} seconds)"  # noqa: E731
 
 
+class WaitMetrics:
+    """
+    How long each kind of readiness wait in the scrape path took, and how
+    often one ran out of time. Shared by every worker thread.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # name -> seconds waited, one per wait
+        self.samples: Dict[str, List[float]] = {}
+        self.timeouts: Dict[str, int] = {}
+
+    def record(self, name: str, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+            if timed_out:
+                self.timeouts[name] = self.timeouts.get(name, 0) + 1
+
+    def drain(self) -> Dict[str, Any]:
+        """Everything recorded since the last drain(), for merge() in another process."""
+        with self._lock:
+            drained = {'samples': self.samples, 'timeouts': self.timeouts}
+            self.samples, self.timeouts = {}, {}
+        return drained
+
+    def merge(self, drained: Dict[str, Any]) -> None:
+        with self._lock:
+            for name, samples in drained['samples'].items():
+                self.samples.setdefault(name, []).extend(samples)
+            for name, n in drained['timeouts'].items():
+                self.timeouts[name] = self.timeouts.get(name, 0) + n
+
+    def summary(self) -> List[str]:
+        with self._lock:
+            return [
+                "{}: {} waits, {:.2f}s total, {:.2f}s max, {} timed out".format(
+                    name, len(samples), sum(samples), max(samples), self.timeouts.get(name, 0)
+                )
+                for name, samples in sorted(self.samples.items())
+            ]
+
+
+WAITS = WaitMetrics()
+
+
+def wait_until(name: str, condition, timeout: float, poll: float = 0.05) -> bool:
+    """
+    Poll condition() until it returns something truthy, for at most timeout
+    seconds. Exceptions count as not ready yet (elements go stale while the
+    page re-renders). The time waited is recorded in WAITS under name.
+    Returns False if it timed out, which callers treat like the fixed sleeps
+    this replaces: carry on, the row count check catches a table that wasn't
+    ready.
+    """
+    t_start = time.monotonic()
+    while True:
+        try:
+            if condition():
+                WAITS.record(name, time.monotonic() - t_start)
+                return True
+        except Exception:
+            pass
+        if time.monotonic() - t_start >= timeout:
+            WAITS.record(name, time.monotonic() - t_start, timed_out=True)
+            logger.debug("gave up waiting for {} after {}s".format(name, timeout))
+            return False
+        time.sleep(poll)
+
+
+class TaskStats:
+    """
+    Row counts and run times of (operating_system, region) tasks from previous
+    runs, kept in a local json file. Used to start the most expensive tasks
+    first, so that large tables don't drag out the tail of a run.
+
+    ```json
+    {"Linux|us-east-1": {"rows": 586, "t_run": 92.1}, ...}
+    ```
+    """
+    # used to rank tasks by row count alone, before any history exists
+    default_seconds_per_row = 0.15
+
+    def __init__(self, stats_file: Optional[str | Path] = DEFAULT_TASK_STATS_FILE) -> None:
+        self.stats_file = stats_file
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    @staticmethod
+    def key(_os: str, region: str) -> str:
+        return "{}|{}".format(_os, region)
+
+    def load(self) -> bool:
+        """Returns False if there is no usable history."""
+        try:
+            with open(self.stats_file, 'r') as f:
+                self.stats = json.load(f)
+            return True
+        except FileNotFoundError:
+            logger.debug("No task stats at '{}'".format(self.stats_file))
+        except Exception as e:
+            logger.warning("Error loading task stats from '{}': {}".format(self.stats_file, e))
+        return False
+
+    def save(self) -> bool:
+        try:
+            Path(self.stats_file).parent.mkdir(parents=True, exist_ok=True)
+            tmp = "{}.tmp".format(self.stats_file)
+            with open(tmp, 'w') as f:
+                json.dump(self.stats, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.stats_file)
+            return True
+        except Exception as e:
+            logger.warning("Error saving task stats to '{}': {}".format(self.stats_file, e))
+            return False
+
+    def record(self, _os: str, region: str, rows: int, t_run: float, weight: float = 0.5) -> None:
+        """Smooth run times across runs; the row count is always the latest."""
+        k = self.key(_os, region)
+        if k in self.stats and self.stats[k].get('t_run'):
+            t_run = weight * t_run + (1 - weight) * self.stats[k]['t_run']
+        self.stats[k] = {'rows': rows, 't_run': t_run}
+
+    def seconds_per_row(self) -> float:
+        rates = [s['t_run'] / s['rows'] for s in self.stats.values() if s.get('rows') and s.get('t_run')]
+        if not rates:
+            return self.default_seconds_per_row
+        return sorted(rates)[len(rates) // 2]
+
+    def unknown_regions(self, regions: List[str]) -> List[str]:
+        """Regions for which no operating system has any history."""
+        known = {k.split('|', 1)[1] for k in self.stats}
+        return [r for r in regions if r not in known]
+
+    def expected_cost(self, _os: str, region: str, row_counts: Optional[Dict[str, int]] = None) -> Optional[float]:
+        """
+        Expected run time in seconds of a task, or None if nothing is known about it.
+        Falls back to the average rows of the region under other operating
+        systems, then to row_counts (region -> Rows.get_total_row_count()).
+        """
+        s = self.stats.get(self.key(_os, region))
+        if s and s.get('t_run'):
+            return s['t_run']
+        rows = self.expected_rows(_os, region, row_counts)
+        if rows is None:
+            return None
+        return rows * self.seconds_per_row()
+
+    def expected_rows(self, _os: str, region: str, row_counts: Optional[Dict[str, int]] = None) -> Optional[float]:
+        """The task's last row count, with the same fallbacks as expected_cost()."""
+        s = self.stats.get(self.key(_os, region))
+        rows = s.get('rows') if s else None
+        if rows is None:
+            region_rows = [v['rows'] for k, v in self.stats.items() if k.endswith('|' + region) and v.get('rows')]
+            if region_rows:
+                rows = sum(region_rows) / len(region_rows)
+        if rows is None and row_counts:
+            rows = row_counts.get(region)
+        return rows
+
+    def order(self, tasks: List[Tuple[str, str]], row_counts: Optional[Dict[str, int]] = None) -> List[Tuple[str, str]]:
+        """
+        Longest expected task first. Tasks with unknown cost are assumed to be
+        the most expensive, since starting them late is the worst case.
+        """
+        costs = {t: self.expected_cost(*t, row_counts=row_counts) for t in tasks}
+        return sorted(tasks, key=lambda t: (costs[t] is not None, -(costs[t] or 0)))
+
+
+def split_tasks(tasks: List[Tuple[str, str]], vcpus: List[str], min_rows: float, expected_rows) -> List[tuple]:
+    """
+    Replace each task expected_rows(_os, region) says has at least min_rows
+    rows with one (operating_system, region, vcpu) sub-task per vCPU filter
+    option, in its place, so that several workers can share a big table.
+    """
+    split = []
+    for task in tasks:
+        rows = expected_rows(*task)
+        if vcpus and rows is not None and rows >= min_rows:
+            split.extend(task + (vcpu,) for vcpu in vcpus)
+        else:
+            split.append(task)
+    return split
+
+
+def lpt_makespan(costs: List[float], workers: int) -> float:
+    """
+    Simulate handing out tasks, in the order given, to whichever worker frees
+    up first. Returns the time at which the last worker finishes.
+    """
+    finish_times = [0.0] * max(workers, 1)
+    for c in costs:
+        heapq.heapreplace(finish_times, finish_times[0] + c)
+    return max(finish_times)
+
+
+def auto_thread_count(driver_rss: int, available: int, memory_floor: int, max_threads: Optional[int] = None) -> int:
+    """
+    The largest number of workers that fit in available memory without going
+    under memory_floor, assuming each uses driver_rss bytes grown by
+    AUTO_THREAD_RSS_HEADROOM over the course of a run. Never less than 1.
+    """
+    if driver_rss <= 0:
+        logger.warning("Could not measure browser memory use, using 1 thread")
+        return 1
+    n = floor((available - memory_floor) / (driver_rss * AUTO_THREAD_RSS_HEADROOM))
+    if max_threads is not None:
+        n = min(n, max_threads)
+    return max(n, 1)
+
+
+def rerun_hint(tasks: List[Tuple[str, str]]) -> List[str]:
+    """Command line arguments which would scrape only the given (operating_system, region) tasks."""
+    regions_by_os: Dict[str, List[str]] = OrderedDict()
+    for _os, region in tasks:
+        regions_by_os.setdefault(_os, []).append(region)
+    return [
+        "--operating-systems '{}' --regions {}".format(_os, ','.join(regions))
+        for _os, regions in regions_by_os.items()
+    ]
+
+
+def thread_count_arg(value: str) -> int | str:
+    """argparse type for --thread-count: an integer, or 'auto'"""
+    if value == 'auto':
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected an integer or 'auto', got '{}'".format(value))
+
+
+def storage_writers_arg(value: str) -> int:
+    """argparse type for --storage-writers: a count, 0 to store from the workers"""
+    try:
+        count = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected an integer, got '{}'".format(value))
+    if count < 0:
+        raise argparse.ArgumentTypeError("can't have {} storage writers".format(count))
+    return count
+
+
+class RunLedger:
+    """
+    The (operating_system, region) tasks completed on human_date, with their
+    row counts, written as each one finishes so that --resume can pick up
+    where an interrupted run left off.
+    Kept in the 'run_ledger' table when db_config is given, otherwise in a
+    local json file per day:
+
+    ```json
+    {"Linux|us-east-1": {"rows": 586, "expected_rows": 586}, ...}
+    ```
+    """
+    def __init__(self, human_date: str, db_config: Optional[DatabaseConfig] = None, ledger_dir: str | Path = DEFAULT_LEDGER_DIR) -> None:
+        self.human_date = human_date
+        self.db_config = db_config
+        self.ledger_file = Path(ledger_dir) / "{}.json".format(human_date)
+        self.entries: Dict[str, Dict[str, Optional[int]]] = {}
+        # run_ledger is created the first time it's used, whether that's load() or record()
+        self._table_created = False
+
+    def load(self) -> bool:
+        """Returns False if nothing has been recorded for the day."""
+        try:
+            if self.db_config is not None:
+                self._load_db()
+            else:
+                with open(self.ledger_file, 'r') as f:
+                    self.entries = json.load(f)
+        except FileNotFoundError:
+            logger.debug("No run ledger at '{}'".format(self.ledger_file))
+        except Exception as e:
+            logger.warning("Error loading run ledger for {}: {}".format(self.human_date, e))
+        return bool(self.entries)
+
+    def _load_db(self) -> None:
+        with DBPool.shared(self.db_config).connection() as conn:
+            curr = conn.cursor()
+            self._create_table(conn, curr)
+            curr.execute(
+                "SELECT operating_system, region, rows, expected_rows FROM run_ledger WHERE date = %s",
+                (self.human_date,)
+            )
+            self.entries = {
+                TaskStats.key(_os, region): {'rows': rows, 'expected_rows': expected_rows}
+                for _os, region, rows, expected_rows in curr.fetchall()
+            }
+            curr.close()
+
+    def _create_table(self, conn, curr) -> None:
+        if self._table_created:
+            return
+        curr.execute("""\
+            CREATE TABLE IF NOT EXISTS run_ledger (
+                date DATE NOT NULL,
+                operating_system VARCHAR(60) NOT NULL,
+                region VARCHAR(15) NOT NULL,
+                rows INTEGER NOT NULL,
+                expected_rows INTEGER,
+                PRIMARY KEY (date, operating_system, region)
+            )""")
+        conn.commit()
+        self._table_created = True
+
+    def record(self, _os: str, region: str, rows: int, expected_rows: Optional[int] = None) -> bool:
+        """Write down a completed task right away."""
+        self.entries[TaskStats.key(_os, region)] = {'rows': rows, 'expected_rows': expected_rows}
+        try:
+            if self.db_config is not None:
+                with DBPool.shared(self.db_config).connection() as conn:
+                    curr = conn.cursor()
+                    self._create_table(conn, curr)
+                    curr.execute("""\
+                        INSERT INTO run_ledger (date, operating_system, region, rows, expected_rows)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (date, operating_system, region) DO UPDATE
+                        SET rows = EXCLUDED.rows, expected_rows = EXCLUDED.expected_rows
+                        """,
+                        (self.human_date, _os, region, rows, expected_rows)
+                    )
+                    conn.commit()
+                    curr.close()
+            else:
+                self.ledger_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp = "{}.tmp".format(self.ledger_file)
+                with open(tmp, 'w') as f:
+                    json.dump(self.entries, f, indent=1, sort_keys=True)
+                os.replace(tmp, self.ledger_file)
+            return True
+        except Exception as e:
+            logger.warning("Error recording {} in the run ledger: {}".format((_os, region), e))
+            return False
+
+    def is_complete(self, _os: str, region: str) -> bool:
+        entry = self.entries.get(TaskStats.key(_os, region))
+        if not entry or not entry['rows']:
+            return False
+        return entry['expected_rows'] is None or entry['rows'] >= entry['expected_rows']
+
+    def remaining(self, tasks: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """The tasks which are missing from the ledger, or have fewer rows than the page said they would."""
+        return [t for t in tasks if not self.is_complete(*t)]
+
+
+def shard_arg(value: str) -> Tuple[int, int]:
+    """argparse type for --shard: K/N, the K'th (counting from 1) of N shards"""
+    try:
+        k, n = (int(x) for x in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected K/N, got '{}'".format(value))
+    if not 1 <= k <= n:
+        raise argparse.ArgumentTypeError("shard {} of {} doesn't exist".format(k, n))
+    return k, n
+
+
+def matrix_fingerprint(tasks: List[Tuple[str, str]]) -> str:
+    """Identifies a set of (operating_system, region) tasks, regardless of their order."""
+    return hashlib.sha256('\n'.join(sorted(TaskStats.key(*t) for t in tasks)).encode()).hexdigest()
+
+
+def shard_tasks(tasks: List[Tuple[str, str]], shard: int, shard_count: int) -> List[Tuple[str, str]]:
+    """
+    The tasks belonging to shard (counting from 1) of shard_count.
+    Every host gets the same split of the same task matrix without talking
+    to the others: tasks are shuffled by their hash and dealt out in turn,
+    so shards get the same number of tasks (give or take one) and a mix of
+    large and small tables.
+    """
+    ordered = sorted(tasks, key=lambda t: hashlib.sha256(TaskStats.key(*t).encode()).hexdigest())
+    return [t for n, t in enumerate(ordered) if n % shard_count == shard - 1]
+
+
+@dataclass
+class ShardReport:
+    """
+    What one host did for its --shard of the day's task matrix.
+    Kept in ~/.local/share/scrpr/shards/, and in the 'shard_runs' table when
+    storing to a database, so that verify_shards() can check the day's shards
+    covered everything.
+    """
+    date: str
+    shard: int
+    shard_count: int
+    # of the whole task matrix, not just this shard's tasks
+    matrix_fingerprint: str
+    tasks: List[Tuple[str, str]]
+    failed: List[Tuple[str, str]]
+
+    def save(self, shard_dir: str | Path = DEFAULT_SHARD_DIR) -> Path:
+        path = Path(shard_dir) / "{}-{}of{}.json".format(self.date, self.shard, self.shard_count)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.__dict__, f)
+        return path
+
+    @classmethod
+    def load_all(cls, date: str, shard_dir: str | Path = DEFAULT_SHARD_DIR) -> List['ShardReport']:
+        reports = []
+        for path in sorted(Path(shard_dir).glob("{}-*of*.json".format(date))):
+            with open(path, 'r') as f:
+                d = json.load(f)
+            d['tasks'] = [tuple(t) for t in d['tasks']]
+            d['failed'] = [tuple(t) for t in d['failed']]
+            reports.append(cls(**d))
+        return reports
+
+    def store(self, db_config: DatabaseConfig) -> bool:
+        """Save to the 'shard_runs' table, replacing an earlier run of the same shard."""
+        try:
+            with DBPool.shared(db_config).connection() as conn:
+                curr = conn.cursor()
+                curr.execute("""\
+                    CREATE TABLE IF NOT EXISTS shard_runs (
+                        date DATE NOT NULL,
+                        shard INTEGER NOT NULL,
+                        shard_count INTEGER NOT NULL,
+                        matrix_fingerprint CHAR(64) NOT NULL,
+                        tasks TEXT NOT NULL,
+                        failed TEXT NOT NULL,
+                        PRIMARY KEY (date, shard, shard_count)
+                    )""")
+                curr.execute("""\
+                    INSERT INTO shard_runs (date, shard, shard_count, matrix_fingerprint, tasks, failed)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (date, shard, shard_count) DO UPDATE
+                    SET matrix_fingerprint = EXCLUDED.matrix_fingerprint, tasks = EXCLUDED.tasks, failed = EXCLUDED.failed
+                    """,
+                    (self.date, self.shard, self.shard_count, self.matrix_fingerprint, json.dumps(self.tasks), json.dumps(self.failed))
+                )
+                conn.commit()
+                curr.close()
+            return True
+        except Exception as e:
+            logger.warning("Error saving shard report to database: {}".format(e))
+            return False
+
+    @classmethod
+    def load_all_from_db(cls, date: str, db_config: DatabaseConfig) -> List['ShardReport']:
+        with DBPool.shared(db_config).connection() as conn:
+            curr = conn.cursor()
+            try:
+                curr.execute(
+                    "SELECT shard, shard_count, matrix_fingerprint, tasks, failed FROM shard_runs WHERE date = %s ORDER BY shard",
+                    (date,)
+                )
+            except UndefinedTable:
+                # no shard has stored a report to this database yet
+                curr.close()
+                return []
+            reports = [
+                cls(date, shard, shard_count, fingerprint.strip(), [tuple(t) for t in json.loads(tasks)], [tuple(t) for t in json.loads(failed)])
+                for shard, shard_count, fingerprint, tasks, failed in curr.fetchall()
+            ]
+            curr.close()
+        return reports
+
+
+def verify_shards(reports: List[ShardReport]) -> List[str]:
+    """
+    Check that a day's shard reports together covered every task of the
+    matrix exactly once. Returns a list of problems, empty if there are none.
+    """
+    if not reports:
+        return ["no shard reports"]
+    problems = []
+    shard_counts = {r.shard_count for r in reports}
+    fingerprints = {r.matrix_fingerprint for r in reports}
+    if len(shard_counts) > 1:
+        problems.append("shards were run with different shard counts: {}".format(sorted(shard_counts)))
+    if len(fingerprints) > 1:
+        problems.append("shards were run over {} different task matrices".format(len(fingerprints)))
+    if problems:
+        return problems
+    return _shard_coverage_problems(reports, shard_counts.pop(), fingerprints.pop())
+
+
+def _shard_coverage_problems(reports: List[ShardReport], shard_count: int, fingerprint: str) -> List[str]:
+    problems = []
+    missing = sorted(set(range(1, shard_count + 1)) - {r.shard for r in reports})
+    if missing:
+        problems.append("missing shards: {}".format(', '.join("{}/{}".format(k, shard_count) for k in missing)))
+    seen = Counter(t for r in reports for t in r.tasks)
+    for t, count in sorted(seen.items()):
+        if count > 1:
+            problems.append("{} was collected by {} shards".format(t, count))
+    if not missing and matrix_fingerprint(list(seen)) != fingerprint:
+        problems.append("shards' tasks don't add up to the task matrix")
+    for r in reports:
+        for t in r.failed:
+            problems.append("{} failed in shard {}/{}".format(t, r.shard, shard_count))
+    return problems
+
+
+@dataclass
+class TaskResult:
+    """
+    Reported on a ThreadDivvier's completion channel each time a worker
+    finishes a task, whether or not the task succeeded.
+    """
+    worker_id: Any
+    task: Tuple[str, str]
+    ok: bool
+    t_run: float = 0
+    rows: int = 0
+    expected_rows: Optional[int] = None
+    error: Optional[str] = None
+    # set by the dispatcher, starting at 1
+    attempt: int = 0
+    # ROWS_* counters and ERRORS accumulated in a worker process since its last report
+    counters: Optional[Dict[str, int]] = None
+    errors: Optional[List[Any]] = None
+    # WaitMetrics.drain() of a worker process
+    waits: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class TaskStarted:
+    """Reported on a ThreadDivvier's completion channel when a worker takes a task off the queue."""
+    worker_id: Any
+    task: Tuple[str, str]
+
+
+@dataclass
+class WorkerReady:
+    """Reported on a ProcessDivvier's completion channel once a worker process has initialized its DataCollector."""
+    worker_id: Any
+
+
+@dataclass
+class WorkerExited:
+    """Reported on a ThreadDivvier's completion channel when a worker stops taking tasks."""
+    worker_id: Any
+    # None when the worker was told to stop
+    reason: Optional[str] = None
+
+
+class AffinityQueue(queue.Queue):
+    """
+    The task queue of a ThreadDivvier. A worker can ask for a task sharing the
+    operating system (or failing that, the region) of its last one, which its
+    page already has selected. Looks no more than window tasks ahead, so that
+    the longest-first order mostly holds.
+    """
+    def __init__(self, window: int = 0) -> None:
+        super().__init__()
+        self.window = window
+
+    def _like(self, last_task: Optional[tuple]) -> int:
+        """index of the queued task most like last_task"""
+        if last_task is None or self.window < 2:
+            return 0
+        best, best_score = 0, 0
+        for i in range(min(self.window, len(self.queue))):
+            task = self.queue[i]
+            if task is None:
+                continue
+            score = 2 if task[0] == last_task[0] else int(task[1] == last_task[1])
+            if score > best_score:
+                best, best_score = i, score
+        return best
+
+    def get_like(self, last_task: Optional[tuple]) -> Optional[tuple]:
+        """Like get(), but preferring tasks like last_task."""
+        with self.not_empty:
+            while not self._qsize():
+                self.not_empty.wait()
+            i = self._like(last_task)
+            task = self.queue[i]
+            del self.queue[i]
+            self.not_full.notify()
+            return task
+
+
 class ThreadDivvier:
     """
     Converts machine time processing data into developer time debugging exceptions.
+
+    Each DataCollector is a long-lived worker which blocks on a shared task
+    queue, and reports back on the completion channel after every task. The
+    dispatching thread only ever sleeps on the completion channel.
     """
-    def __init__(self, thread_count) -> None:
+    def __init__(self, thread_count, memory_floor: int = 0, max_attempts: int = 1, retry_backoff: float = 5.0, restart_on_failure: bool = True, ledger: Optional[RunLedger] = None, collector_class: Optional[type] = None, affinity_window: int = 8) -> None:
         """
         Initialize one DataCollector for use in a thread, creating thread_count DataCollector instances with identical configuration.
         Each thread manages its own Selenium.WebDriver.
+
+        memory_floor: bytes of available system memory under which workers stop
+        taking new tasks and quit, until only one is left. 0 to disable.
+        max_attempts: times a task is tried before it is given up on.
+        retry_backoff: seconds before the first retry of a task, doubling with each attempt.
+        restart_on_failure: restart a worker's driver after it fails a task.
+        ledger: record each task there as soon as it succeeds.
+        collector_class: the DataCollector to start for each worker, EC2DataCollector by default.
+        affinity_window: how many tasks ahead a worker may look for one like its last, see AffinityQueue.
         """
         logger.debug("init ThreadDivvier with {} threads".format(thread_count))
         self.thread_count = thread_count
+        self.memory_floor = memory_floor
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_backoff = retry_backoff
+        self.restart_on_failure = restart_on_failure
+        self.ledger = ledger
+        self.collector_class = collector_class
+        self.attempts: Dict[tuple, int] = {}
+        # how many pieces split tasks were split into, and the results of those done
+        self._piece_counts: Counter = Counter()
+        self._pieces: Dict[tuple, List[TaskResult]] = {}
+        self._retry_timers: List[threading.Timer] = []
+        # worker id -> the task it is running
+        self.in_flight: Dict[Any, tuple] = {}
+        # shared with worker processes, see ProcessDivvier
+        self._active_workers = multiprocessing.Value('i', 0)
         self.drivers: List[DataCollector] = []
+        self._drivers_lock = threading.Lock()
+        self._init_threads: List[threading.Thread] = []
+        # (operating_system, region) tuples, or None to tell a worker to quit
+        self.tasks: queue.Queue = AffinityQueue(affinity_window)
+        # TaskResult or WorkerExited
+        self.completed: queue.Queue = queue.Queue()
+        # the final result of each task
+        self.results: List[TaskResult] = []
 
     def init_scraper(self, thread_id: int, config: DataCollectorConfig) -> None:
         try:
@@ -205,101 +1160,516 @@ class ThreadDivvier:
             # pyright and I do not like assigning an instance of type
             # DataCollectorConfig which is only supposed to accept
             # EC2DataCollectorConfig, a subclass.
-            d = EC2DataCollector(_id=thread_id, config=config)
+            d = (self.collector_class or EC2DataCollector)(_id=thread_id, config=config)
 
             # after = psutil.Process().memory_info().rss
             # print("change = {}".format(after.rss - before.rss))
 
-            self.drivers.append(d)
+            with self._drivers_lock:
+                self.drivers.append(d)
             logger.debug(f"initialized {thread_id=}")
-        except ScrprCritical as e:
-            logger.critical(e, exc_info=True)
+        except Exception as e:
+            # anything escaping this thread would otherwise go unnoticed
+            logger.critical("worker {} failed to initialize: {}".format(thread_id, e), exc_info=True)
 
-    def init_scrapers_of(self, config: DataCollectorConfig) -> None:
+    def init_scrapers_of(self, config: DataCollectorConfig, count: Optional[int] = None, first_id: int = 0, wait: bool = True) -> None:
         """
-        Initialize scrapers one at a time.
+        Initialize count (default thread_count) scrapers in parallel, with ids
+        starting at first_id.
         As scrapers become initialized, give them to the ThreadDivvier's drivers pool.
+        wait=False returns immediately; call wait_for_scrapers() before run_threads().
         """
-        next_id = 0  # name shown in log messages
+        count = self.thread_count if count is None else count
         # start init for each driver
-        logger.debug("initializing {} drivers".format(self.thread_count))
-        threads = []
-        # logger.critical(f"\033[44mBefore threads init: {psutil.Process().memory_full_info()=}\033[0m")
-        for _ in range(self.thread_count):
+        logger.debug("initializing {} drivers".format(count))
+        for next_id in range(first_id, first_id + count):  # name shown in log messages
             logger.debug("initializing new driver with id '{}'".format(next_id))
-            # before = psutil.Process().memory_info().rss
-            # logger.critical(f"\033[44mthread {next_id} {before=}\033[0m")
             t = threading.Thread(
                 name=str(next_id),
                 target=self.init_scraper,
                 args=(next_id, config),
                 daemon=False,
             )
-            next_id += 1
             t.start()
-            # always the same as the one below
-            # logger.critical(f"\033[44m{psutil.Process(t.native_id).memory_full_info().rss=}\033[0m")
-            threads.append(t)
-            # time.sleep(0.1)
-            # logger.critical(f"\033[44m{psutil.Process(t.native_id).memory_full_info().rss=}\033[0m")
-
-        # wait until each driver's init is finished
-        # drivers are only added to self.init_drivers *after* they are done being initialized
-        # i.e. when __init__ has finished
-        while len(self.drivers) != self.thread_count:
-            pass
-        # logger.critical(f"\033[44mAfter threads init: {psutil.Process().memory_full_info()=}\033[0m")
-        for t in threads:
+            self._init_threads.append(t)
+        if wait:
+            self.wait_for_scrapers()
+
+    def add_scraper(self, d: 'DataCollector') -> None:
+        """Adopt an already initialized DataCollector as a worker."""
+        with self._drivers_lock:
+            self.drivers.append(d)
+
+    def wait_for_scrapers(self) -> None:
+        """Block until every scraper started by init_scrapers_of() has initialized, or failed to."""
+        # drivers are only added to self.drivers *after* they are done being
+        # initialized, i.e. when __init__ has finished, or not at all.
+        for t in self._init_threads:
             t.join()
+        self._init_threads = []
         logger.debug("Finished initializing {} scrapers".format(len(self.drivers)))
 
-        return
+        if not self.drivers:
+            raise ScrprCritical("None of the {} requested scrapers could be initialized".format(self.thread_count))
+        if len(self.drivers) != self.thread_count:
+            logger.warning("Only {}/{} scrapers initialized, continuing with fewer threads".format(len(self.drivers), self.thread_count))
+            self.thread_count = len(self.drivers)
 
-    # @memory_profiler.profile
-    def run_threads(self, arg_queue: List[tuple]):
+    def shutdown(self) -> None:
+        """Quit every scraper without running any tasks, e.g. when main() bails out early."""
+        try:
+            self.wait_for_scrapers()
+        except ScrprCritical:
+            return
+        self.run_threads([])
+
+    def _work(self, d: 'DataCollector') -> None:
         """
-        Takes a list of tuples (operating_system, region) and gathers corresponding EC2 instance pricing data.
-        Items in the arg_queue are removed as work is completed, until there are no items left in the queue.
+        Worker loop for a single DataCollector.
+        Takes tasks off the queue until told to stop, then quits its driver.
         """
-        logger.debug(f"running {self.thread_count} threads")
-        # _arg_queue = copy(arg_queue)  # feels wrong to pop from a queue that might could be acessed outside of func
-        _arg_queue = arg_queue
-        logger.debug("Test to make sure drivers are not locked...")
+        reason = None
+        last_task = None
+        try:
+            while True:
+                if self.should_shed():
+                    reason = "available memory under {} MB".format(self.memory_floor // 1024 // 1024)
+                    logger.warning("worker {}: shedding, {}".format(d._id, reason))
+                    break
+                task = self.next_task(last_task)
+                if task is None:
+                    break
+                self.completed.put(TaskStarted(d._id, task))
+                result = self._run_task(d, task)
+                self.completed.put(result)
+                if not result.ok and self.restart_on_failure:
+                    # who knows what state the page was left in
+                    new = d.recycle()
+                else:
+                    new = d.after_task()
+                # a new browser starts out on the page's default selections
+                last_task = task if new is d else None
+                d = self.replace_driver(d, new)
+        finally:
+            d.discard_replacement()
+            try:
+                logger.debug("Quitting driver {}".format(d._id))
+                d.driver.quit()
+                logger.debug("Quit driver {} successfully.".format(d._id))
+            except Exception as e:
+                logger.warning("worker {}: error while quitting driver: {}".format(d._id, e))
+            self.completed.put(WorkerExited(d._id, reason=reason))
+
+    def next_task(self, last_task: Optional[tuple]) -> Optional[tuple]:
+        """Block until there's a task for a worker whose last task was last_task."""
+        return self.tasks.get_like(last_task)
+
+    def _run_task(self, d: 'DataCollector', task: tuple) -> TaskResult:
+        t_start = time.time()
+        # a context manager guarantees the lock is released, even when
+        # scrape_and_store throws
+        with d.lock:
+            try:
+                ok = d.scrape_and_store(*task)
+                result = TaskResult(d._id, task, ok=bool(ok))
+            except Exception as e:
+                logger.critical("worker {}: unhandled exception while running task {}: {}".format(d._id, task, e), exc_info=True)
+                result = TaskResult(d._id, task, ok=False, error=str(e))
+        result.t_run = time.time() - t_start
+        result.rows = d.task_rows
+        result.expected_rows = d.task_expected_rows
+        return result
+
+    def replace_driver(self, old: 'DataCollector', new: 'DataCollector') -> 'DataCollector':
+        """Swap a recycled collector for its replacement in self.drivers"""
+        if new is not old:
+            with self._drivers_lock:
+                self.drivers[self.drivers.index(old)] = new
+        return new
+
+    def should_shed(self) -> bool:
+        """
+        True when a worker should quit instead of taking another task, to give
+        its memory back. The last worker never sheds.
+        """
+        if not self.memory_floor or psutil.virtual_memory().available >= self.memory_floor:
+            return False
+        with self._active_workers.get_lock():
+            if self._active_workers.value <= 1:
+                logger.warning("available memory is under the floor, but only one worker is left")
+                return False
+            self._active_workers.value -= 1
+            return True
+
+    def on_result(self, result: TaskResult) -> bool:
+        """
+        Called from the dispatching thread for each task a worker reports on.
+        Returns False if the task was put back on the queue to be retried.
+        """
+        result.attempt = self.attempts[result.task] = self.attempts.get(result.task, 0) + 1
+        if result.ok:
+            return self.finish(result)
+        if result.attempt >= self.max_attempts:
+            logger.error("worker {} failed task {} for the last time ({}/{}): {}".format(
+                result.worker_id, result.task, result.attempt, self.max_attempts, result.error
+            ))
+            return self.finish(result)
+        delay = self.retry_backoff * 2 ** (result.attempt - 1)
+        logger.warning("worker {} failed task {} (attempt {}/{}), retrying in {}s: {}".format(
+            result.worker_id, result.task, result.attempt, self.max_attempts, delay, result.error
+        ))
+        t = threading.Timer(delay, self.tasks.put, args=(result.task,))
+        t.daemon = True
+        t.start()
+        self._retry_timers.append(t)
+        return False
+
+    def finish(self, result: TaskResult) -> bool:
+        """
+        Record the final result of a task. The pieces of a split task are
+        held on to until they are all in, then reported as the one task.
+        Returns False if the task was put back on the queue, whole.
+        """
+        if len(result.task) > 2:
+            result = self._assemble(result)
+            if result is None:
+                return True
+            if not result.ok and self.max_attempts > 1:
+                logger.warning("{}, collecting {} whole instead".format(result.error, result.task))
+                self.tasks.put(result.task)
+                return False
+        self.results.append(result)
+        if result.ok and self.ledger is not None:
+            self.ledger.record(*result.task, rows=result.rows, expected_rows=result.expected_rows)
+        return True
+
+    def _assemble(self, piece: TaskResult) -> Optional[TaskResult]:
+        """
+        The result of the task split_tasks() made piece from, once every piece
+        is in. It succeeds if every piece did, and the pieces' rows add up to
+        the whole table's.
+        """
+        task = piece.task[:2]
+        pieces = self._pieces.setdefault(task, [])
+        pieces.append(piece)
+        if len(pieces) < self._piece_counts[task]:
+            return None
+        rows = sum(p.rows for p in pieces)
+        # every piece reads the unfiltered table's row count
+        expected = Counter(p.expected_rows for p in pieces if p.expected_rows is not None)
+        expected_rows = expected.most_common(1)[0][0] if expected else None
+        result = TaskResult(
+            piece.worker_id, task, ok=True,
+            t_run=sum(p.t_run for p in pieces),
+            rows=rows,
+            expected_rows=expected_rows,
+            attempt=max(p.attempt for p in pieces),
+        )
+        failed = [p for p in pieces if not p.ok]
+        if failed:
+            result.ok = False
+            result.error = "{} of {} pieces failed: {}".format(len(failed), len(pieces), failed[0].error)
+        elif expected_rows is None or rows != expected_rows:
+            result.ok = False
+            result.error = "pieces add up to {} of {} rows".format(rows, expected_rows)
+        return result
+
+    def failed(self) -> List[TaskResult]:
+        """Tasks which did not succeed in any attempt."""
+        return [r for r in self.results if not r.ok]
+
+    def on_worker_exited(self, exited: WorkerExited) -> None:
+        """Called from the dispatching thread when a worker quits while there is still work to do."""
+        if exited.reason is None:
+            logger.error("worker {} exited before the task queue was drained".format(exited.worker_id))
+        else:
+            logger.warning("worker {} exited early: {}".format(exited.worker_id, exited.reason))
+
+    def _start_workers(self) -> list:
+        """Start one worker per initialized DataCollector. Returns something to join() on for each."""
+        workers = []
+        self._active_workers.value = len(self.drivers)
         for d in self.drivers:
-            assert not d.lock.locked()
-        logger.debug("ok.")
-        while _arg_queue:
-            for d in self.drivers:
-                if not d.lock.locked():
-                    d.lock.acquire()
-                    try:
-                        args = _arg_queue.pop()
-                    except IndexError:
-                        logger.warning(f"driver {d._id} tried to pop from an empty queue")
-                        continue
-                    logger.debug(f"{len(_arg_queue)} left in queue")
-                    # t = threading.Thread(name='-'.join(args), target=d.scrape_and_store, args=args, daemon=False)
-                    t = threading.Thread(target=d.scrape_and_store, args=args, daemon=False)
-                    t.start()
-                    logger.debug(f"worker id {d._id} running new thread {'-'.join(args)}")
-        # determine when all threads have finished
-        # wait to return until all threads have finished their work
-        threads_finished = []
+            t = threading.Thread(name=str(d._id), target=self._work, args=(d,), daemon=False)
+            t.start()
+            workers.append(t)
+        return workers
+
+    def _next_message(self, workers: list):
+        """Block until a worker reports something on the completion channel."""
+        return self.completed.get()
+
+    def _handle_message(self, msg) -> Tuple[int, int]:
+        """
+        Returns (tasks finished, workers exited).
+        A worker which exits in the middle of a task fails that task.
+        """
+        if isinstance(msg, TaskStarted):
+            self.in_flight[msg.worker_id] = msg.task
+            return 0, 0
+        exited = 0
+        if isinstance(msg, WorkerExited):
+            exited = 1
+            self.on_worker_exited(msg)
+            task = self.in_flight.pop(msg.worker_id, None)
+            if task is None:
+                return 0, exited
+            msg = TaskResult(msg.worker_id, task, ok=False, error="worker exited mid-task: {}".format(msg.reason))
+        self.in_flight.pop(msg.worker_id, None)
+        return int(self.on_result(msg)), exited
+
+    def _stop_workers(self, workers: list, workers_alive: int) -> None:
+        """Send one stop signal per worker still waiting on the queue, and wait for them all to quit."""
+        for _ in range(workers_alive):
+            self.tasks.put(None)
         logger.debug("waiting for last threads to finish juuuust a sec")
-        while len(threads_finished) != self.thread_count:
-            # @@ bug when number of threads is greater than the arg queue
-            for d in self.drivers:
-                # @@ if an exception is thrown in a thread it may not properly release it's lock.
-                # This will cause the script to hang after it is done running, at least.
-                if not d.lock.locked() and d._id not in threads_finished:
-                    threads_finished.append(d._id)
-                    logger.debug("Quitting driver {}/{}".format(
-                        len(threads_finished) - self.thread_count,
-                        self.thread_count
-                    ))
-                    d.driver.quit()
-                    logger.debug("Quit driver {} successfully.".format(d._id))
-        return
+        while workers_alive:
+            if isinstance(self._next_message(workers), WorkerExited):
+                workers_alive -= 1
+        for w in workers:
+            w.join()
+
+    def run_threads(self, arg_queue: List[tuple]) -> List[TaskResult]:
+        """
+        Takes a list of tuples (operating_system, region), or (operating_system,
+        region, vcpu) pieces of a task from split_tasks(), and gathers corresponding EC2 instance pricing data.
+        Blocks until every task has been reported on and every worker has quit.
+        """
+        logger.debug(f"running {self.thread_count} threads")
+        self._piece_counts.update(task[:2] for task in arg_queue if len(task) > 2)
+        for task in arg_queue:
+            self.tasks.put(task)
+        outstanding = len(arg_queue)
+
+        workers = self._start_workers()
+        workers_alive = len(workers)
+
+        while outstanding and workers_alive:
+            finished, exited = self._handle_message(self._next_message(workers))
+            outstanding -= finished
+            workers_alive -= exited
+            if finished:
+                logger.debug(f"{outstanding} tasks left")
+        if outstanding:
+            logger.error("{} tasks were never run: no workers left".format(outstanding))
+        for t in self._retry_timers:
+            t.cancel()
+
+        self._stop_workers(workers, workers_alive)
+        return self.results
+
+
+class _PipeWriter:
+    """The sending end of a worker process's completion channel."""
+    def __init__(self, conn) -> None:
+        self.conn = conn
+
+    def put(self, msg) -> None:
+        # unlike multiprocessing.Queue.put, this doesn't return until the
+        # message is in the pipe, so nothing is lost if the process dies next
+        self.conn.send(msg)
+
+
+class ProcessDivvier(ThreadDivvier):
+    """
+    Runs each DataCollector in its own worker process, each with its own
+    driver and database connections, instead of in a thread.
+
+    Workers take tasks from a shared multiprocessing queue, and report back
+    over a pipe of their own. Worker processes send their ROWS_* counters and
+    ERRORS with every TaskResult, and the dispatching process adds them to
+    its own.
+    """
+    def __init__(self, thread_count, **kwargs) -> None:
+        super().__init__(thread_count, **kwargs)
+        # workers inherit the divvier, queues included
+        self._ctx = multiprocessing.get_context('fork')
+        self.tasks = self._ctx.Queue()
+        self._active_workers = self._ctx.Value('i', 0)
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self._ready: List[multiprocessing.Process] = []
+        self._pending_init = 0
+        # worker id -> receiving end of its pipe, while it is open
+        self._conns: Dict[int, Any] = {}
+        self._exited: set = set()
+        self._reported: Dict[str, int] = {}
+
+    @staticmethod
+    def _counters() -> Dict[str, int]:
+        return {
+            'ROWS_COLLECTED': ROWS_COLLECTED,
+            'ROWS_STORED': ROWS_STORED,
+            'ROWS_ALREADY_EXISTED': ROWS_ALREADY_EXISTED,
+            'ERRORS': len(ERRORS),
+        }
+
+    def _process_main(self, worker_id: int, config: DataCollectorConfig, conn) -> None:
+        """Entry point of a worker process."""
+        self.completed = _PipeWriter(conn)
+        self.drivers = []
+        self._reported = self._counters()
+        self.init_scraper(worker_id, config)
+        if not self.drivers:
+            self.completed.put(WorkerExited(worker_id, reason="failed to initialize"))
+            return
+        self.completed.put(WorkerReady(worker_id))
+        self._work(self.drivers[0])
+
+    def next_task(self, last_task: Optional[tuple]) -> Optional[tuple]:
+        # a multiprocessing queue can only be taken from in order
+        return self.tasks.get()
+
+    def _run_task(self, d: 'DataCollector', task: tuple) -> TaskResult:
+        """Runs in a worker process. Attaches what changed in this process since the last report."""
+        result = super()._run_task(d, task)
+        counters = self._counters()
+        result.counters = {k: v - self._reported[k] for k, v in counters.items() if k != 'ERRORS'}
+        result.errors = [str(e) for e in ERRORS[self._reported['ERRORS']:]]
+        result.waits = WAITS.drain()
+        self._reported = counters
+        return result
+
+    def init_scrapers_of(self, config: DataCollectorConfig, count: Optional[int] = None, first_id: int = 0, wait: bool = True) -> None:
+        """Start one worker process per scraper, and wait for each to initialize or fail."""
+        count = self.thread_count if count is None else count
+        logger.debug("starting {} worker processes".format(count))
+        for worker_id in range(first_id, first_id + count):
+            recv_conn, send_conn = self._ctx.Pipe(duplex=False)
+            p = self._ctx.Process(name=str(worker_id), target=self._process_main, args=(worker_id, config, send_conn), daemon=False)
+            p.start()
+            # only the worker may hold the sending end, so that we see EOF when it dies
+            send_conn.close()
+            self._conns[worker_id] = recv_conn
+            self.processes[worker_id] = p
+            self._pending_init += 1
+        if wait:
+            self.wait_for_scrapers()
+
+    def add_scraper(self, d: 'DataCollector') -> None:
+        """Workers are processes of their own, so main() doesn't hand them the os/region collector."""
+        raise ScrprException("a DataCollector can't be moved into a worker process")
+
+    def wait_for_scrapers(self) -> None:
+        while self._pending_init:
+            msg = self._next_message(list(self.processes.values()))
+            self._pending_init -= 1
+            if isinstance(msg, WorkerReady):
+                self._ready.append(self.processes[msg.worker_id])
+            else:
+                logger.critical("worker process {} failed to initialize: {}".format(msg.worker_id, msg.reason))
+        logger.debug("Finished initializing {} worker processes".format(len(self._ready)))
+
+        if not self._ready:
+            raise ScrprCritical("None of the {} requested worker processes could be initialized".format(self.thread_count))
+        if len(self._ready) != self.thread_count:
+            logger.warning("Only {}/{} worker processes initialized, continuing with fewer".format(len(self._ready), self.thread_count))
+            self.thread_count = len(self._ready)
+
+    def _start_workers(self) -> list:
+        """Worker processes are already waiting on the task queue."""
+        self._active_workers.value = len(self._ready)
+        return self._ready
+
+    def _next_message(self, workers: list):
+        """
+        Block until any worker process reports something. A worker process
+        which closes its pipe without saying goodbye (killed by the OOM
+        killer, say) is reported as having exited.
+        """
+        while self._conns:
+            conn = multiprocessing.connection.wait(list(self._conns.values()))[0]
+            worker_id = next(k for k, v in self._conns.items() if v is conn)
+            try:
+                msg = conn.recv()
+            except EOFError:
+                conn.close()
+                del self._conns[worker_id]
+                if worker_id in self._exited:
+                    continue
+                self._exited.add(worker_id)
+                p = self.processes[worker_id]
+                p.join()
+                return WorkerExited(worker_id, reason="process died with exit code {}".format(p.exitcode))
+            if isinstance(msg, WorkerExited):
+                self._exited.add(worker_id)
+            return msg
+        raise ScrprCritical("waiting on worker processes, but none are left")
+
+    def on_result(self, result: TaskResult) -> bool:
+        global ROWS_COLLECTED, ROWS_STORED, ROWS_ALREADY_EXISTED
+        if result.counters:
+            ROWS_COLLECTED += result.counters.get('ROWS_COLLECTED', 0)
+            ROWS_STORED += result.counters.get('ROWS_STORED', 0)
+            ROWS_ALREADY_EXISTED += result.counters.get('ROWS_ALREADY_EXISTED', 0)
+        if result.errors:
+            ERRORS.extend(result.errors)
+        if result.waits:
+            WAITS.merge(result.waits)
+        return super().on_result(result)
+
+
+def pool_request(f, msg: Dict[str, Any]) -> Dict[str, Any]:
+    """Send one message over a connection to a scrpr.pool daemon and return its reply (json lines)."""
+    f.write(json.dumps(msg) + '\n')
+    f.flush()
+    line = f.readline()
+    if not line:
+        raise ConnectionError("browser pool closed the connection")
+    return json.loads(line)
+
+
+class LeasedDriver(webdriver.Remote):
+    """
+    A browser session borrowed from a scrpr.pool daemon, already sitting on
+    the pricing page. quit() hands the browser back to the pool instead of
+    closing it. The pool also takes it back if this process dies.
+    """
+    def __init__(self, conn: socket.socket, executor_url: str, session_id: str, rss: int = 0) -> None:
+        self._conn = conn
+        self._f = conn.makefile('rw')
+        self._lease_session_id = session_id
+        # as measured by the pool when it handed the browser out
+        self.rss = rss
+        super().__init__(command_executor=executor_url, options=webdriver.ChromeOptions())
+
+    def start_session(self, capabilities, browser_profile=None) -> None:
+        # attach to the pool's session instead of starting a new browser
+        self.session_id = self._lease_session_id
+        self.caps = {}
+
+    def quit(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            pool_request(self._f, {'op': 'release'})
+        except (OSError, ValueError) as e:
+            # the pool reclaims the browser when the connection closes anyway
+            logger.warning("could not release browser {} to the pool: {}".format(self.session_id, e))
+        finally:
+            self._f.close()
+            self._conn.close()
+            self._conn = None
+            self.command_executor.close()
+
+
+def lease_pooled_driver(socket_path: str, timeout: float = 10.0) -> Optional[LeasedDriver]:
+    """Borrow an idle browser from the scrpr.pool daemon at socket_path, or None if there isn't one."""
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.settimeout(timeout)
+        conn.connect(socket_path)
+        with conn.makefile('rw') as f:
+            reply = pool_request(f, {'op': 'lease'})
+    except (OSError, ValueError) as e:
+        logger.warning("browser pool at '{}' is unavailable, starting a browser instead: {}".format(socket_path, e))
+        conn.close()
+        return None
+    if not reply.get('ok'):
+        logger.info("browser pool has no browser to lend ({}), starting a browser instead".format(reply.get('error')))
+        conn.close()
+        return None
+    conn.settimeout(None)
+    return LeasedDriver(conn, reply['executor_url'], reply['session_id'], rss=reply.get('rss', 0))
 
 
 class DataCollector:
@@ -307,6 +1677,13 @@ class DataCollector:
     Base class for selenium drivers to interface with a ThreadDivvier.
     """
     data_type_scraped = None
+    # turn on Chrome's performance log, see EC2NetworkDataCollector
+    performance_log = False
+    # rows scraped during the current (or last) task, and how many the page said there would be
+    task_rows: int = 0
+    task_expected_rows: Optional[int] = None
+    # set once the browser's been told to block what config.block_profile says
+    block_stats: Optional[BlockStats] = None
 
     def __init__(self, _id, config: DataCollectorConfig, _test_driver=None):
         logger.debug("init DataCollector")
@@ -316,16 +1693,21 @@ class DataCollector:
         ###################################################
         # config
         ###################################################
+        self.config = config
         self.human_date = config.human_date
+        self.tasks_run = 0
+        # a fresh collector being started in the background, see recycle()
+        self._replacement: Optional[DataCollector] = None
+        self._replacement_thread: Optional[threading.Thread] = None
 
-        if _test_driver is None:
+        if _test_driver is not None:
+            self.driver = _test_driver
+        elif not (config.pool_socket and self.lease_driver(config.pool_socket)):
             self.get_driver(
                 headless=config.headless,
                 window_w=config.window_w,
                 window_h=config.window_h
             )
-        else:
-            self.driver = _test_driver
         logger.debug("Finished init of thread {} without errors".format(self._id))
         self.lock.release()
 
@@ -357,23 +1739,211 @@ class DataCollector:
         options.add_argument("window-size={},{}".format(window_w, window_h))
         if headless:
             options.add_argument('-headless')
+        block_profile = self.config.block_profile
+        if block_profile is not None:
+            options.add_experimental_option('prefs', block_profile.chrome_prefs())
+        if self.performance_log or block_profile is not None:
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
         driverService = Service(automation_driver)
         self.driver = webdriver.Chrome(service=driverService, options=options)
+        if block_profile is not None:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': block_profile.blocked_urls()})
+            self.block_stats = BlockStats()
+
+    def lease_driver(self, socket_path: str) -> bool:
+        """Use a browser from the scrpr.pool daemon. False if none could be had."""
+        driver = lease_pooled_driver(socket_path)
+        if driver is None:
+            return False
+        logger.debug("worker {}: leased browser {} from the pool".format(self._id, driver.session_id))
+        self.driver = driver
+        return True
+
+    def read_performance_log(self) -> List[Dict[str, Any]]:
+        """
+        The DevTools messages logged since the last call, which empties the
+        performance log; it would otherwise keep growing. Everything that
+        reads the log goes through here, and they're counted into
+        self.block_stats on the way.
+        """
+        try:
+            log = self.driver.get_log('performance')
+        except Exception as e:
+            logger.debug("worker {}: could not read the performance log: {}".format(self._id, e))
+            return []
+        messages = [json.loads(entry['message'])['message'] for entry in log]
+        if self.block_stats is not None:
+            for message in messages:
+                params = message.get('params', {})
+                if message['method'] == 'Network.loadingFailed' and params.get('blockedReason'):
+                    self.block_stats.requests_blocked += 1
+                    self.block_stats.blocked_by_type[params.get('type', 'Other')] += 1
+                elif message['method'] == 'Network.loadingFinished':
+                    self.block_stats.requests_loaded += 1
+                    self.block_stats.bytes_loaded += int(params.get('encodedDataLength', 0))
+        return messages
+
+    def read_block_stats(self) -> Optional[BlockStats]:
+        """
+        Add what the browser blocked and loaded since the last call to
+        self.block_stats. None if nothing is being blocked.
+        """
+        if self.block_stats is None:
+            return None
+        self.read_performance_log()
+        return self.block_stats
+
+    def get_driver_rss(self) -> int:
+        """
+        Resident memory in bytes of this collector's chromedriver and every
+        browser process started under it. Returns 0 if it can't be measured.
+        """
+        if isinstance(self.driver, LeasedDriver):
+            return self.driver.rss
+        try:
+            proc = psutil.Process(self.driver.service.process.pid)
+            procs = [proc] + proc.children(recursive=True)
+        except (AttributeError, psutil.Error) as e:
+            logger.debug("worker {}: unable to find driver process: {}".format(self._id, e))
+            return 0
+        rss = 0
+        for p in procs:
+            try:
+                rss += p.memory_info().rss
+            except psutil.Error:
+                # processes come and go
+                pass
+        return rss
+
+    def should_recycle(self, margin: float = 1.0) -> bool:
+        """
+        True once this collector has run config.recycle_after_tasks tasks, or
+        its browser uses more than config.recycle_rss_mb.
+        margin < 1 asks whether it is getting close.
+        """
+        n = self.config.recycle_after_tasks
+        if n and self.tasks_run >= floor(n * margin):
+            return True
+        rss_mb = self.config.recycle_rss_mb
+        if rss_mb and self.get_driver_rss() >= rss_mb * 1024 * 1024 * margin:
+            return True
+        return False
 
-    def scroll(self, amt):
-        """scroll down amt in pixels"""
+    def warm_replacement(self) -> None:
+        """Start a collector with the same id and config in the background, to take over from this one."""
+        if self._replacement_thread is not None:
+            return
+
+        def _warm():
+            try:
+                self._replacement = type(self)(self._id, config=self.config)
+            except Exception as e:
+                logger.error("worker {}: could not start a replacement driver: {}".format(self._id, e), exc_info=True)
+
+        logger.debug("worker {}: warming a replacement driver".format(self._id))
+        self._replacement_thread = threading.Thread(name="{}-replacement".format(self._id), target=_warm, daemon=False)
+        self._replacement_thread.start()
+
+    def recycle(self) -> 'DataCollector':
+        """
+        Quit this collector's driver and return its replacement, waiting for
+        it to finish warming if it hasn't yet.
+        If no replacement could be started, keep using this collector.
+        """
+        self.warm_replacement()
+        self._replacement_thread.join()
+        replacement = self._replacement
+        self._replacement = None
+        self._replacement_thread = None
+        if replacement is None:
+            self.tasks_run = 0
+            return self
+        logger.info("worker {}: recycling driver after {} tasks".format(self._id, self.tasks_run))
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning("worker {}: error while quitting driver: {}".format(self._id, e))
+        return replacement
+
+    def discard_replacement(self) -> None:
+        """Quit the replacement warm_replacement() started, once it's done starting, e.g. when the worker stops."""
+        if self._replacement_thread is None:
+            return
+        self._replacement_thread.join()
+        replacement = self._replacement
+        self._replacement = None
+        self._replacement_thread = None
+        if replacement is None:
+            return
+        logger.debug("worker {}: quitting its unused replacement driver".format(self._id))
+        try:
+            replacement.driver.quit()
+        except Exception as e:
+            logger.warning("worker {}: error while quitting replacement driver: {}".format(self._id, e))
+
+    def after_task(self) -> 'DataCollector':
+        """
+        Called by the ThreadDivvier between tasks.
+        Returns the collector to use for the next task.
+        """
+        self.tasks_run += 1
+        self.read_block_stats()
+        if self.should_recycle():
+            return self.recycle()
+        if self.should_recycle(margin=0.8) or self.config.recycle_after_tasks == self.tasks_run + 1:
+            self.warm_replacement()
+        return self
+
+    def scroll(self, amt, timeout: float = 1.0):
+        """scroll down amt in pixels, and wait for the page to stop moving"""
         action = action_chains.ActionChains(self.driver)
         action.scroll_by_amount(0, amt)
         action.perform()
-        time.sleep(1)
+        positions = []
+
+        def stopped():
+            positions.append(self.driver.execute_script("return window.pageYOffset"))
+            return len(positions) > 1 and positions[-1] == positions[-2]
+        wait_until('scroll', stopped, timeout)
 
 
 class EC2DataCollectionElementBase:
+    # Count changes to the table and its row count heading from now on, and
+    # when the last one happened. Listboxes opening and closing don't count.
+    watch_table_js = """
+        var root = arguments[0];
+        if (window.scrprObserver) { window.scrprObserver.disconnect(); }
+        window.scrprMutations = 0;
+        window.scrprObserver = new MutationObserver(function (records) {
+            records.forEach(function (r) {
+                var el = r.target.nodeType === Node.ELEMENT_NODE ? r.target : r.target.parentElement;
+                if (el && el.closest('table, h2')) {
+                    window.scrprMutations += 1;
+                    window.scrprLastMutation = performance.now();
+                }
+            });
+        });
+        window.scrprObserver.observe(root, {childList: true, subtree: true, characterData: true});
+    """
+    # the table has changed, and not since arguments[0] ms ago
+    table_settled_js = """
+        return window.scrprMutations > 0 && performance.now() - window.scrprLastMutation >= arguments[0];
+    """
+
     def __init__(self, driver: WebDriver) -> None:
         self.driver = driver
         self.waiter = WebDriverWait(self.driver, 3.0)
         self.data_selection_root = self._get_data_selection_root()
 
+    def watch_table(self) -> None:
+        """requires switching to iframe. Call before whatever should change the table."""
+        self.driver.execute_script(self.watch_table_js, self.data_selection_root)
+
+    def table_changed(self, quiet_ms: int = 0) -> bool:
+        """requires switching to iframe. Whether the table changed since watch_table(), and has been still for quiet_ms."""
+        return self.driver.execute_script(self.table_settled_js, quiet_ms)
+
     def _get_data_selection_root(self):
         """ Speeds up find_element(s) operations by minimizing the surface area to scrape.  """
         self.waiter.until(ec.visibility_of_element_located((By.XPATH, "//*[@data-selection-root]")))
@@ -408,6 +1978,22 @@ class EC2Table(EC2DataCollectionElementBase):
         """
         self.data_selection_root.find_element(By.XPATH, './/ul/li[last()]').click()
 
+    def navto_next_page_and_wait(self, timeout: float = 5.0) -> bool:
+        """
+        requires switching to iframe
+
+        Click 'next' and wait for the page counter to move on and the rows to
+        be replaced.
+        """
+        page = self.get_current_page_number()
+        self.watch_table()
+        self.navto_next_page()
+        return wait_until(
+            'next_page',
+            lambda: self.get_current_page_number() == page + 1 and self.table_changed(),
+            timeout
+        )
+
 
 class Header(EC2DataCollectionElementBase):
     """ Represents the clickable header of the EC2 pricing table.  """
@@ -426,19 +2012,187 @@ class Rows(EC2DataCollectionElementBase):
     def __init__(self, driver: WebDriver) -> None:
         super().__init__(driver)
 
-    def get_rows(self) -> List[WebElement]:
-        """requires switching to iframe"""
-        trs = self.data_selection_root.find_elements(By.XPATH, './/table/tbody/tr')
-        for tr in trs:
-            yield tr
+    # innerText is what WebElement.text gives, give or take whitespace
+    rows_data_js = """
+        return Array.from(arguments[0].querySelectorAll('table > tbody > tr'), function (tr) {
+            return Array.from(tr.querySelectorAll('td'), function (td) { return td.innerText.trim(); });
+        });
+    """
+
+    # Walks up the React component tree from the <table> to the table
+    # component (the one with columnDefinitions), then further up until some
+    # component holds an array of exactly the expected number of items, and
+    # renders them with the table's own cell functions.
+    # Returns null if anything about that doesn't work out.
+    all_rows_data_js = """
+        var root = arguments[0], expected = arguments[1];
+        function render(columns, items) {
+            return items.map(function (item) {
+                return columns.map(function (column) {
+                    var v = column.cell(item);
+                    if (v === null || v === undefined) { return ''; }
+                    if (typeof v === 'object') { throw 'cell is not text'; }
+                    return String(v).trim();
+                });
+            });
+        }
+        function candidates(fiber) {
+            var found = [], props = fiber.memoizedProps, hook = fiber.memoizedState;
+            if (props && typeof props === 'object') {
+                for (var name in props) { found.push(props[name]); }
+            }
+            for (; hook && typeof hook === 'object' && 'next' in hook; hook = hook.next) {
+                found.push(hook.memoizedState);
+            }
+            return found;
+        }
+        try {
+            var table = root.querySelector('table');
+            var key = table && Object.keys(table).find(function (k) {
+                return k.startsWith('__reactFiber$') || k.startsWith('__reactInternalInstance$');
+            });
+            if (!key) { return null; }
+            var columns = null;
+            for (var fiber = table[key]; fiber; fiber = fiber.return) {
+                var props = fiber.memoizedProps;
+                if (!columns && props && Array.isArray(props.columnDefinitions)) { columns = props.columnDefinitions; }
+                if (!columns) { continue; }
+                var found = candidates(fiber);
+                for (var i = 0; i < found.length; i++) {
+                    var items = found[i];
+                    if (Array.isArray(items) && items.length === expected && items[0] && typeof items[0] === 'object') {
+                        return render(columns, items);
+                    }
+                }
+            }
+        } catch (e) {}
+        return null;
+    """
+
+    def get_rows(self) -> List[WebElement]:
+        """requires switching to iframe"""
+        trs = self.data_selection_root.find_elements(By.XPATH, './/table/tbody/tr')
+        for tr in trs:
+            yield tr
+
+    def get_rows_data(self) -> List[List[str]]:
+        """
+        requires switching to iframe
+
+        The text of every cell of the rows displayed, in a single round trip
+        instead of one per cell.
+        """
+        rows = self.driver.execute_script(self.rows_data_js, self.data_selection_root)
+        if not isinstance(rows, list):
+            raise ScrprException("table rows script returned {}".format(type(rows)))
+        return rows
+
+    def get_all_rows_data(self, expected: int) -> Optional[List[List[str]]]:
+        """
+        requires switching to iframe
+
+        The text of every row of the table, on every page, read from the data
+        behind the table. None if that doesn't give exactly expected rows,
+        including every row displayed right now.
+        """
+        try:
+            rows = self.driver.execute_script(self.all_rows_data_js, self.data_selection_root, expected)
+        except Exception as e:
+            logger.debug("could not read the table's data: {}".format(e))
+            return None
+        if not isinstance(rows, list) or len(rows) != expected:
+            logger.debug("table's data has {} rows instead of {}".format(len(rows) if isinstance(rows, list) else None, expected))
+            return None
+        unseen = Counter(tuple(row) for row in rows)
+        for row in self.get_rows_data():
+            if unseen[tuple(row)] == 0:
+                logger.debug("displayed row {} is not in the table's data".format(row))
+                return None
+            unseen[tuple(row)] -= 1
+        return rows
+
+    def get_total_row_count(self) -> int:
+        """requires switching to iframe"""
+        t = self.data_selection_root.find_element(By.XPATH, './/h2/span').text
+        row_count_re = re.compile(r'(?P<row_count>[0-9]{1,3}) available instances$')
+        b = row_count_re.search(t)
+        if b is not None:
+            return int(b.groupdict()['row_count'])
+
+
+class DropdownCache:
+    """
+    The pricing table's dropdown menus, as found by
+    EC2DataCollector.get_dropdown_menus(), kept in a local json file so
+    that collectors don't have to open every menu and read every option.
+    Only used while it is younger than ttl seconds, and the page's data
+    analytics labels (the fingerprint) are the ones the menus were found with.
+    A page other than AWS's, e.g. a scrpr.replay page, gets a cache file of
+    its own, see file_for().
+
+    ```json
+    {"t_saved": 1676592000.0, "fingerprint": "9f86d0...", "dropdowns": {
+        "Region": {"label": "id=\"aws-element-...-label\"", "button": "//button[@id='aws-element-...']", "options": ["us-east-1", ...]},
+    ...}}
+    ```
+    """
+    def __init__(self, cache_file: Optional[str | Path] = DEFAULT_DROPDOWN_CACHE_FILE, ttl: float = DEFAULT_DROPDOWN_CACHE_TTL, url: str = DEFAULT_PAGE_URL) -> None:
+        self.cache_file = self.file_for(cache_file, url)
+        self.ttl = ttl
+        self.t_saved = 0.0
+        self.fingerprint: Optional[str] = None
+        # category -> data analytics label, button xpath, and options
+        self.dropdowns: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def file_for(cache_file: str | Path, url: str) -> str | Path:
+        """cache_file for the pricing page at url, e.g. 'dropdowns-1a2b3c4d5e6f.json' next to 'dropdowns.json'"""
+        if url == DEFAULT_PAGE_URL:
+            return cache_file
+        path = Path(cache_file)
+        return path.with_name("{}-{}{}".format(path.stem, hashlib.sha256(url.encode()).hexdigest()[:12], path.suffix))
+
+    @staticmethod
+    def fingerprint_of(labels: List[str]) -> str:
+        return hashlib.sha256('\n'.join(sorted(labels)).encode()).hexdigest()
+
+    def load(self) -> bool:
+        """Returns False if there is nothing cached."""
+        try:
+            with open(self.cache_file, 'r') as f:
+                cached = json.load(f)
+            self.t_saved = cached['t_saved']
+            self.fingerprint = cached['fingerprint']
+            self.dropdowns = cached['dropdowns']
+            return True
+        except FileNotFoundError:
+            logger.debug("No dropdown cache at '{}'".format(self.cache_file))
+        except Exception as e:
+            logger.warning("Error loading dropdown cache from '{}': {}".format(self.cache_file, e))
+        return False
+
+    def save(self) -> bool:
+        self.t_saved = time.time()
+        try:
+            Path(self.cache_file).parent.mkdir(parents=True, exist_ok=True)
+            # every worker may be saving at once
+            tmp = "{}.{}.tmp".format(self.cache_file, uuid1())
+            with open(tmp, 'w') as f:
+                json.dump({'t_saved': self.t_saved, 'fingerprint': self.fingerprint, 'dropdowns': self.dropdowns}, f, indent=1)
+            os.replace(tmp, self.cache_file)
+            return True
+        except Exception as e:
+            logger.warning("Error saving dropdown cache to '{}': {}".format(self.cache_file, e))
+            return False
+
+    def is_fresh(self, fingerprint: Optional[str] = None) -> bool:
+        """Young enough, and found on a page with the given fingerprint, if any."""
+        if not self.dropdowns or time.time() - self.t_saved > self.ttl:
+            return False
+        return fingerprint is None or fingerprint == self.fingerprint
 
-    def get_total_row_count(self) -> int:
-        """requires switching to iframe"""
-        t = self.data_selection_root.find_element(By.XPATH, './/h2/span').text
-        row_count_re = re.compile(r'(?P<row_count>[0-9]{1,3}) available instances$')
-        b = row_count_re.search(t)
-        if b is not None:
-            return int(b.groupdict()['row_count'])
+    def options(self, category: str) -> List[str]:
+        return self.dropdowns.get(category, {}).get('options', [])
 
 
 class EC2Dropdown:
@@ -452,30 +2206,69 @@ class EC2Dropdown:
     def current_value(self):
         return self.button.text
 
-    def select(self, selection: str, delay: Optional[float] = None) -> None:
-        """screen-covering operation"""
+    def listbox_items(self) -> List[WebElement]:
+        return self.analytics_element.find_elements(By.XPATH, './/ul[@role="listbox"]/li')
+
+    def listbox_open(self) -> bool:
+        return any(li.is_displayed() for li in self.listbox_items())
+
+    def _select_and_wait(self, selection: str, table: EC2DataCollectionElementBase, timeout: float) -> bool:
+        """Wait for the listbox to open, then to close and the table to re-render."""
+        self.button.click()
+        wait_until('listbox_open', self.listbox_open, timeout)
+        for li in self.listbox_items():
+            if selection not in li.text:
+                continue
+            if li.get_attribute('aria-selected') == 'true':
+                # nothing would change, don't wait for it to
+                self.button.click()
+                wait_until('listbox_closed', lambda: not self.listbox_open(), timeout)
+                return True
+            table.watch_table()
+            li.click()
+            wait_until('listbox_closed', lambda: not self.listbox_open(), timeout)
+            # long enough for the row count heading to catch up with the rows
+            wait_until('table_update', lambda: table.table_changed(quiet_ms=100), timeout)
+            return True
+        # not an option, close the listbox on the table as it was
+        self.button.click()
+        wait_until('listbox_closed', lambda: not self.listbox_open(), timeout)
+        return False
+
+    def select(self, selection: str, delay: Optional[float] = None, table: Optional[EC2DataCollectionElementBase] = None, timeout: float = 5.0) -> bool:
+        """
+        screen-covering operation
+
+        With table (requires switching to iframe), wait for the table to
+        re-render with the new selection instead of sleeping delay seconds.
+        Returns False if selection isn't one of the options.
+        """
         logger.debug("{} '{}'".format(self.__class__.__name__, selection))
         try:
+            if selection in self.current_value().split('\n'):
+                # e.g. the worker's last task was for the same operating system
+                logger.debug("{} '{}' is already selected".format(self.__class__.__name__, selection))
+                WAITS.record('select_skipped', 0.0)
+                return True
+            if table is not None:
+                return self._select_and_wait(selection, table, timeout)
             self.button.click()
-            # self.waiter.until(ec.element_to_be_clickable((By.XPATH, './/ul[@role="listbox"]/li')))
             if delay is not None:
                 time.sleep(delay/2)
-            lis = self.analytics_element.find_elements(By.XPATH, './/ul[@role="listbox"]/li')
-            for li in lis:
+            for li in self.listbox_items():
                 if selection in li.text:
                     li.click()
                     if delay is not None:
                         time.sleep(delay/2)
-                    # self.waiter.until(ec.invisibility_of_element((By.XPATH, './/ul[@role="listbox"]/li')))
-                    break
-            return
-
+                    return True
+            return False
         except Exception as e:  # pragma: no cover
             self.driver.quit()
             logger.error(e)
             # @@ do we need to raise?
             # note removed try/catch in collect_ec2_data()
             # raise
+            return False
 
 class EC2LocationType(EC2Dropdown):
     def __init__(self, driver: WebDriver):
@@ -501,7 +2294,11 @@ class EC2CpuCount(EC2Dropdown):
 class EC2DataCollector(DataCollector):
     """ Instantiates a Selenium WebDriver for Chrome.  """
     data_type_scraped = 'ec2'
-    url = 'https://aws.amazon.com/ec2/pricing/on-demand/'
+    url = DEFAULT_PAGE_URL
+    cpu_dropdown: Optional['EC2CpuCount'] = None
+    # what the vCPU filter shows when the page loads, and whether it's been changed since
+    cpu_default: Optional[str] = None
+    vcpu_filtered = False
 
     def __init__(self, _id, config: EC2DataCollectorConfig, _test_driver=None):
         super().__init__(_id, config, _test_driver)
@@ -509,6 +2306,8 @@ class EC2DataCollector(DataCollector):
         self.csv_data_dir = config.csv_data_dir
         self.db_config = config.db_config
         self.url = config.url
+        self.row_extraction = config.row_extraction
+        self.full_table = config.full_table
         if _test_driver is None:
             self.prep_driver()
 
@@ -521,26 +2320,35 @@ class EC2DataCollector(DataCollector):
             self.location_type_dropdown = None
             self.cpu_dropdown = None
             self.get_dropdown_menus()
+            if self.cpu_dropdown is not None:
+                self.cpu_default = self.cpu_dropdown.current_value()
             self.driver.switch_to.default_content()
 
         self.lock.release()
 
-    def prep_driver(self):
-        delay = 0.5
+    def prep_driver(self, reload: bool = False):
+        """
+        Load the pricing page and find its iframe.
+        A browser which is already on the page (e.g. leased from the pool) isn't
+        reloaded unless reload=True.
+        """
         try:
             self.waiter = WebDriverWait(self.driver, 10)
-            self.driver.get(self.url)
+            if reload or not self.driver.current_url.startswith(self.url):
+                self.driver.get(self.url)
             logger.debug("Initializing worker with id {}".format(self._id))
             logger.debug(f"{self._id} begin nav_to")
-            time.sleep(delay)
             logger.debug("wait untill iFrame located...")
             self.waiter.until(ec.visibility_of_element_located((By.ID, "iFrameResizer0")))
             self.iframe = self.driver.find_element('id', "iFrameResizer0")
-            logger.debug("done. waiting 3 seconds before releasing lock...")
-            time.sleep(delay)
+            logger.debug("done. waiting for the page to finish loading before releasing lock...")
+            wait_until('page_load', lambda: self.driver.execute_script("return document.readyState") == 'complete', 10)
         except Exception as e:  # pragma: no cover
             logger.critical("While initializing worker '{}', an exception occurred which requires closing the Selenium WebDriver: {}".format(self._id, e), exc_info=True)
             self.driver.quit()
+            return
+        if self.read_block_stats() is not None:
+            logger.info("worker {}: loaded the pricing page, {}".format(self._id, self.block_stats))
 
     def _get_data_analytics_divs(self) -> List[WebElement]:
         """
@@ -556,10 +2364,82 @@ class EC2DataCollector(DataCollector):
             raise SystemExit(1)
         return data_analytics_divs
 
+    def get_data_analytics_labels(self) -> List[str]:
+        """requires switching to iframe. The data analytics labels of the dropdown menus, in one call."""
+        self.waiter.until(ec.visibility_of_element_located((By.XPATH, "//*[@data-analytics-field-label]")))
+        return self.driver.execute_script(
+            "return Array.from(document.querySelectorAll('[data-analytics-field-label]'), e => e.getAttribute('data-analytics-field-label'))"
+        )
+
     def get_dropdown_menus(self) -> None:
+        """
+        Set up the dropdown menus from the config's DropdownCache if it's fresh,
+        otherwise find them on the page (see find_dropdown_menus) and cache them.
+
+        requires switching to iframe
+        """
+        if not self.config.dropdown_cache:
+            self.find_dropdown_menus()
+            return
+        cache = DropdownCache(self.config.dropdown_cache, ttl=self.config.dropdown_cache_ttl, url=self.config.url)
+        fingerprint = DropdownCache.fingerprint_of(self.get_data_analytics_labels())
+        if cache.load() and cache.is_fresh(fingerprint):
+            try:
+                self.load_dropdown_menus(cache)
+                logger.debug("{} found the dropdown menus in the cache".format(self._id))
+                return
+            except selenium_exception.NoSuchElementException as e:
+                logger.info("{} cached dropdown menus are gone from the page, looking for them: {}".format(self._id, e))
+        elif cache.dropdowns:
+            logger.info("{} cached dropdown menus are out of date, looking for them".format(self._id))
+        cache.fingerprint = fingerprint
+        cache.dropdowns = self.find_dropdown_menus()
+        cache.save()
+
+    def load_dropdown_menus(self, cache: DropdownCache) -> None:
+        """requires switching to iframe. Find the cached dropdown menus' elements, without opening them."""
+        for category, cached in cache.dropdowns.items():
+            dad = self.driver.find_element(By.XPATH, "//*[@data-analytics-field-label='{}']".format(cached['label']))
+            button = self.driver.find_element(By.XPATH, cached['button'])
+            self._set_dropdown(category, button, dad, cached['options'])
+
+    def _set_dropdown(self, category: str, button: WebElement, dad: WebElement, options: List[str]) -> None:
+        """assign a dropdown's elements and options to their rightful dropdown"""
+        # I sense a software design pattern going *woosh*
+        match category:
+            case 'Region':
+                self.region_dropdown = EC2Region(self.driver)
+                self.region_dropdown.button = button
+                self.region_dropdown.analytics_element = dad
+                self.region_dropdown.options = options
+            case 'Operating system':
+                self.operating_system_dropdown = EC2OperatingSystem(self.driver)
+                self.operating_system_dropdown.button = button
+                self.operating_system_dropdown.analytics_element = dad
+                self.operating_system_dropdown.options = options
+            case 'Instance type':
+                self.instance_type_dropdown = EC2InstanceType(self.driver)
+                self.instance_type_dropdown.button = button
+                self.instance_type_dropdown.analytics_element = dad
+                self.instance_type_dropdown.options = options
+            case 'vCPU':  # not something we filter based on
+                self.cpu_dropdown = EC2CpuCount(self.driver)
+                self.cpu_dropdown.button = button
+                self.cpu_dropdown.analytics_element = dad
+                self.cpu_dropdown.options = options
+            case 'Location Type':  # always "AWS Region"
+                self.location_type_dropdown = EC2LocationType(self.driver)
+                self.location_type_dropdown.button = button
+                self.location_type_dropdown.analytics_element = dad
+                self.location_type_dropdown.options = options
+            case _:
+                logger.warning(f"unsupported filter category: {category}")
+
+    def find_dropdown_menus(self) -> Dict[str, Dict[str, Any]]:
         """
         Create self.Region, self.InstanceType, and self.OperatingSystem classes
         from the WebElements available on the EC2 pricing page.
+        Returns what's needed to find them again, for a DropdownCache.
 
         we do this here instead of in the classes
         themselves to avoid having to
@@ -567,7 +2447,7 @@ class EC2DataCollector(DataCollector):
 
         switches to iframe
         """
-
+        found = {}
         data_analytics_divs = self._get_data_analytics_divs()
 
         # sift through and find the key terms we can filter on
@@ -626,39 +2506,13 @@ class EC2DataCollector(DataCollector):
                         options.append(option)
 
             # after options have been collected, assign them to their rightful dropdown
-            # I sense a software design pattern going *woosh*
-            match category_text_elem.text:
-                case 'Region':
-                    self.region_dropdown = EC2Region(self.driver)
-                    self.region_dropdown.button = button_click_elem
-                    self.region_dropdown.analytics_element = dad
-                    self.region_dropdown.options = options
-                case 'Operating system':
-                    self.operating_system_dropdown = EC2OperatingSystem(self.driver)
-                    self.operating_system_dropdown.button = button_click_elem
-                    self.operating_system_dropdown.analytics_element = dad
-                    self.operating_system_dropdown.options = options
-                case 'Instance type':
-                    self.instance_type_dropdown = EC2InstanceType(self.driver)
-                    self.instance_type_dropdown.button = button_click_elem
-                    self.instance_type_dropdown.analytics_element = dad
-                    self.instance_type_dropdown.options = options
-                case 'vCPU':  # not something we filter based on
-                    self.cpu_dropdown = EC2CpuCount(self.driver)
-                    self.cpu_dropdown.button = button_click_elem
-                    self.cpu_dropdown.analytics_element = dad
-                    self.cpu_dropdown.options = options
-                case 'Location Type':  # always "AWS Region"
-                    self.location_type_dropdown = EC2LocationType(self.driver)
-                    self.location_type_dropdown.button = button_click_elem
-                    self.location_type_dropdown.analytics_element = dad
-                    self.location_type_dropdown.options = options
-                case _:
-                    logger.warning(f"unsupported filter category: {category_text_elem.text}")
+            category = category_text_elem.text
+            self._set_dropdown(category, button_click_elem, dad, options)
+            found[category] = {'label': query_category, 'button': button_xpath_query, 'options': options}
 
             # once finished, click button again to hide menu
             button_click_elem.click()
-        return None
+        return found
 
     def get_available_operating_systems(self) -> List[str]:
         """
@@ -718,16 +2572,64 @@ class EC2DataCollector(DataCollector):
         self.region_dropdown.select(region)
         return region
 
-    def collect_ec2_data(self, _os: str, region: str) -> List[Instance]:
+    def get_row_count(self, _os: str, region: str) -> Optional[int]:
+        """
+        Filter the table by operating system and region, and read how many rows
+        it would have without scraping any of them.
+        NOTE: switches to iframe
+        """
+        self.driver.switch_to.frame(self.iframe)
+        try:
+            self.operating_system_dropdown.select(_os, table=self.table)
+            self.region_dropdown.select(region, table=self.table)
+            return self.table.rows.get_total_row_count()
+        finally:
+            self.driver.switch_to.default_content()
+
+    def read_displayed_rows(self) -> List[List[str]]:
+        """requires switching to iframe. The text of each cell of the rows on the table's current page."""
+        if self.row_extraction == 'js':
+            return self.table.rows.get_rows_data()
+        return [[td.text for td in row.find_elements(By.XPATH, './/td')] for row in self.table.rows.get_rows()]
+
+    def filter_table(self, _os: str, region: str, vcpu: Optional[str] = None) -> Tuple[int, int]:
+        """
+        requires switching to iframe. Select an operating system, region and
+        optionally a vCPU count. Returns the number of rows in the table before
+        and after filtering by vCPU count.
+        """
+        self.operating_system_dropdown.select(_os, table=self.table)
+        self.region_dropdown.select(region, table=self.table)
+        if self.vcpu_filtered:
+            # the last task's vCPU filter is still on, put it back the way the page started out before counting the whole table
+            self.cpu_dropdown.select(self.cpu_default, table=self.table)
+            self.vcpu_filtered = False
+        unfiltered = self.table.rows.get_total_row_count()
+        if vcpu is None:
+            return unfiltered, unfiltered
+        if self.cpu_dropdown is None:
+            raise ScrprException("worker {}: no vCPU filter to select '{}' with".format(self._id, vcpu))
+        if not self.cpu_dropdown.select(vcpu, table=self.table):
+            # the unfiltered table isn't this task's slice of it
+            raise ScrprException("worker {}: could not filter the table by {} vCPUs, the vCPU filter's options are {}".format(
+                self._id, vcpu, self.cpu_dropdown.options
+            ))
+        self.vcpu_filtered = True
+        return unfiltered, self.table.rows.get_total_row_count()
+
+    def collect_ec2_data(self, _os: str, region: str, vcpu: Optional[str] = None) -> List[Instance]:
         """
         Select an operating system and region to fill the pricing page table with data, scrape it, and save it to a csv file.
+        With vcpu, only the rows for that vCPU count; see split_tasks().
         CSV files are saved in a parent directory of self.csv_data_dir, by date then by operating system. e.g. '<self.csv_data_dir>/2023-01-18/Linux'
+        Rows count towards ROWS_COLLECTED once they're stored, see scrape_and_store().
         """
 
-        global ROWS_COLLECTED
+        self.task_rows = 0
+        self.task_expected_rows = None
         self.driver.switch_to.frame(self.iframe)
 
-        logger.debug(f"{self._id} scrape all: {region=} {_os=}")
+        logger.debug(f"{self._id} scrape all: {region=} {_os=} {vcpu=}")
 
         try:
             logger.debug(f"before nav to first page: {self.table.get_current_page_number()}")
@@ -739,53 +2641,50 @@ class EC2DataCollector(DataCollector):
 
             # @@@ retry these with delay = 0
             # only thing that doesnt throw see is sleep in here.
-            self.operating_system_dropdown.select(_os, delay=2)
-            self.region_dropdown.select(region, delay=2)
-
+            self.task_expected_rows, total_row_count = self.filter_table(_os, region, vcpu)
             num_pages = self.table.get_total_pages()
-            total_row_count = self.table.rows.get_total_row_count()
             validation_rows_scraped_per_page = {}
 
-            logger.info("{} scraping {} rows on {} pages for os: {} region {}...".format(self._id, total_row_count, num_pages, _os, region))
+            logger.info("{} scraping {} rows on {} pages for os: {} region {} vcpu {}...".format(self._id, total_row_count, num_pages, _os, region, vcpu))
             logger.debug(f"total row count: {total_row_count}")
 
+            if self.full_table and (rows := self.table.rows.get_all_rows_data(total_row_count)) is not None:
+                # one read instead of num_pages
+                logger.debug("{} read all {} rows from the table's data".format(self._id, len(rows)))
+                num_pages = 0
+                self.task_rows += len(rows)
+                yield rows
+            elif self.full_table:
+                logger.info("{} could not read the table's data, reading it page by page".format(self._id))
+
             trc = 0
-            tdc = 0
             for i in range(num_pages):
                 # navto next page only after the initial page is marshalled
-                page_rows = []
                 if i > 0:
                     logger.trace("{} clicking 'next' button".format(self._id))
-                    self.table.navto_next_page()
-                    time.sleep(0.5)  # voodo
+                    self.table.navto_next_page_and_wait()
 
                 validation_current_page = self.table.get_current_page_number()
                 validation_rows_scraped_per_page[validation_current_page] = 0
                 logger.trace("current page: {}".format(validation_current_page))
 
                 # exctract data from rows displayed
-                for row in self.table.rows.get_rows():
-                    trc += 1
-                    row_data = []
-                    for td in row.find_elements(By.XPATH, './/td'):
-                        tdc += 1
-                        row_data.append(td.text)
-                    page_rows.append(row_data)
-                    ROWS_COLLECTED += 1
+                page_rows = self.read_displayed_rows()
+                trc += len(page_rows)
+                self.task_rows += len(page_rows)
 
                 yield page_rows
             self.scroll(-10000)
-            time.sleep(1)  # is snappy
             self.driver.switch_to.default_content()
-            return 
 
         except Exception as e:  # pragma: no cover
             print('ception?')
             logger.critical("worker {}: While scraping os '{}' for region '{}'. an exception occurred which requires closing the Selenium WebDriver: {}".format(self._id, _os, region, e), exc_info=True)
-        finally:
-            # print('still doesnt exit')
-            # self.driver.switch_to.default_content()
-            pass
+            raise ScrprCritical("worker {}: scraping os '{}' for region '{}' failed: {}".format(self._id, _os, region, e)) from e
+
+        # a partial table is as good as a failure
+        if total_row_count is not None and self.task_rows != total_row_count:
+            raise ScrprException("worker {}: scraped {}/{} rows for os '{}' region '{}'".format(self._id, self.task_rows, total_row_count, _os, region))
 
     def store_postgres(self, instances: List[PGInstance], table='ec2_instance_pricing') -> Tuple[int, int]:
         """
@@ -804,17 +2703,16 @@ class EC2DataCollector(DataCollector):
             return 0, 1
             
         with self.get_db() as conn:
-            for instance in instances:
-                try:
-                    if instance.store(conn, table=table):
-                        stored_count += 1
-                    else:
-                        already_existed_count += 1
-                        error_count += 1
-                except Exception as e:  # pragma: no cover
-                    logger.error("An unhandled exception occured while attempting to write data to database: {}".format(e))
-                    error_count += 1
-                    conn.commit()
+            if conn is None:
+                logger.debug("{} not storing {} records, no database".format(self._id, len(instances)))
+                return 0, 0
+            try:
+                stored_count, already_existed_count = PGInstance.store_many(conn, instances, table=table, on_conflict=self.config.db_conflict)
+                error_count += already_existed_count
+            except Exception as e:  # pragma: no cover
+                logger.error("An unhandled exception occured while attempting to write data to database: {}".format(e))
+                conn.rollback()
+                error_count += len(instances)
         if already_existed_count:
             logger.warning("{} records already existed in database and were not stored".format(already_existed_count))
             ROWS_ALREADY_EXISTED += already_existed_count
@@ -885,46 +2783,118 @@ class EC2DataCollector(DataCollector):
 
         return stored_count, 0
 
-    def scrape_and_store(self, _os: str, region: str) -> bool:
+    def store_page(self, conn, _os: str, region: str, page_rows: List[list], table='ec2_instance_pricing') -> Tuple[int, int]:
+        """
+        Store a page of rows from collect_ec2_data() in one transaction.
+        Rows which can't be made sense of are logged and left out.
+        Returns (stored, already existed).
+        """
+        global ROWS_COLLECTED, ROWS_STORED, ROWS_ALREADY_EXISTED
+        stored, already_existed = PGInstance.store_many(
+            conn, self.page_instances(_os, region, page_rows), table=table, on_conflict=self.config.db_conflict
+        )
+        # committed, so a retry of the task finds them already there and counts them again
+        ROWS_COLLECTED += len(page_rows)
+        ROWS_STORED += stored
+        ROWS_ALREADY_EXISTED += already_existed
+        return stored, already_existed
+
+    def copy_page(self, conn, _os: str, region: str, page_rows: List[list]) -> int:
+        """
+        Stream a page of rows from collect_ec2_data() into the config's
+        staging table, in the caller's transaction. Rows which can't be made
+        sense of are logged and left out. Returns how many were copied.
+        """
+        return PGInstance.copy_many(conn, self.page_instances(_os, region, page_rows), self.config.staging_table)
+
+    def copy_task(self, conn, _os: str, region: str, pages: List[List[list]]) -> int:
+        """copy_page() every page of a task, in the caller's transaction. Returns how many rows were copied."""
+        return sum(self.copy_page(conn, _os, region, page_rows) for page_rows in pages)
+
+    def page_instances(self, _os: str, region: str, page_rows: List[list]) -> List[PGInstance]:
+        instances = []
+        for data_row in page_rows:
+            try:
+                instance = PGInstance(self.human_date, region, _os, *data_row)
+                instance.prep_data()
+                instances.append(instance)
+            except Exception as e:
+                logger.error("worker {}: could not store row {} scraped for os '{}' in region '{}': {}".format(self._id, data_row, _os, region, e))
+        return instances
+
+    def scrape_and_submit(self, _os: str, region: str, vcpu: Optional[str] = None) -> None:
+        """
+        scrape_and_store() with StorageWriters: each page is submitted for a
+        writer to store, in a transaction of its own, while the next one is
+        scraped. Waits for the last of them before returning, so that a task
+        isn't done (or in the ledger) until its rows are stored, and a page
+        which couldn't be fails it.
+        Into a staging table, the whole task is handed to a writer once it's
+        scraped instead, and staged in one transaction.
+        """
+        global ROWS_COLLECTED
+        writers = StorageWriters.shared(self.db_config, self.config.storage_writers)
+        if self.config.staging_table:
+            # the whole table or none of it, so a retry doesn't stage it twice
+            pages = list(self.collect_ec2_data(_os=_os, region=region, vcpu=vcpu))
+            writers.submit(self.copy_task, _os, region, pages).result()
+            ROWS_COLLECTED += sum(len(page_rows) for page_rows in pages)
+            return
+        pending = [
+            writers.submit(self.store_page, _os, region, page_rows)
+            for page_rows in self.collect_ec2_data(_os=_os, region=region, vcpu=vcpu)
+        ]
+        # like storing from the worker, the pages of a task which fails are still stored, and its
+        # retry finds them already there
+        for future in pending:
+            future.result()
+
+    def scrape_and_store(self, _os: str, region: str, vcpu: Optional[str] = None) -> bool:
         """
         Select an operating system and region to fill the pricing page table with data, scrape it, and save it.
         CSV files are saved in a parent directory of self.csv_data_dir, by date then by operating system. e.g. '<self.csv_data_dir>/2023-01-18/Linux'
-        This function is meant to be run in a ThreadDivvier singleton.
+        This function is meant to be run in a ThreadDivvier singleton, which
+        holds self.lock for the duration of the call.
+        Raises ScrprCritical or ScrprException if the table could not be
+        scraped and stored completely, so that the task can be retried.
         NOTE: contains try/catch for self.driver
         """
-        global ROWS_STORED, ROWS_ALREADY_EXISTED
         # t_thread_start = int(time.time())
         logger.debug(f"{self._id} scrape and store: {region=} {_os=}")
         ################# # Scrape #################
         # instances: List[PGInstance] = self.collect_ec2_data(_os=_os, region=region)
         # instances: List[PGInstance] = []
-        stored_count = 0
-        already_existed_count = 0
-        error_count = 0
+        global ROWS_COLLECTED
         try:
+            if self.config.storage_writers:
+                self.scrape_and_submit(_os, region, vcpu)
+                return True
             with self.get_db() as conn:
-                for page_row in self.collect_ec2_data(_os=_os, region=region):
-                    for data_row in page_row:
-                        try:
-                            i = PGInstance(self.human_date, region, _os, *data_row)
-                            if i.store(conn):
-                                ROWS_STORED += 1
-                            else:
-                                ROWS_ALREADY_EXISTED += 1
-                                error_count += 1
-                        except Exception as e:  # pragma: no cover
-                            logger.error("worker {}: An unhandled exception occured afterscraping os '{}' in region '{}', while attempting to write data to database: {}".format(self._id, _os, region, e))
-                            error_count += 1
-                            conn.commit()
+                # rows count towards ROWS_COLLECTED once they're committed, store_page() counts its own
+                uncounted = 0
+                for page_rows in self.collect_ec2_data(_os=_os, region=region, vcpu=vcpu):
+                    if conn is None:
+                        # --no-store-db: scraped, and that's all
+                        uncounted += len(page_rows)
+                    elif self.config.staging_table:
+                        self.copy_page(conn, _os, region, page_rows)
+                        uncounted += len(page_rows)
+                    else:
+                        self.store_page(conn, _os, region, page_rows)
+                # the whole table or none of it, so a retry doesn't stage it twice
+                if conn is not None and self.config.staging_table:
+                    conn.commit()
+                ROWS_COLLECTED += uncounted
                 # self.store_postgres(data_row)
+        except (ScrprCritical, ScrprException):
+            # already logged and counted
+            raise
         except Exception as e:  # pragma: no cover
             logger.critical("worker {}: While storing data for os '{}' for region '{}', an exception occurred which may result in dataloss: {}".format(self._id, _os, region, e), exc_info=True)
-            # raise ScrprException("worker {}: While storing data for os '{}' for region '{}', an exception occurred which may result in dataloss: {}".format(self._id, _os, region, e))
-        finally:
-            self.lock.release()
-
+            raise ScrprException("worker {}: While storing data for os '{}' for region '{}', an exception occurred which may result in dataloss: {}".format(self._id, _os, region, e))
+        return True
 
-            ################# # Postgres #################
+        #     ################# # Postgres #################
         #     if self.db_config is not None:  # @@@ when is self.db_config ever None?
         #         stored_count, error_count = self.store_postgres(instances)
         #         ROWS_STORED += stored_count
@@ -964,20 +2934,304 @@ class EC2DataCollector(DataCollector):
     @contextmanager
     def get_db(self):
         """
-        Uses DataCollectorConfig.db (db_config) to yield a connection to a Postgres database
+        Uses DataCollectorConfig.db (db_config) to yield a connection to a Postgres database,
+        or None without one (--no-store-db), for the caller to skip storing
         """
         if self.db_config is None:
             logger.debug("No db_config specified.")
+            yield None
+            return
+        logger.debug("borrowing a database connection with config: {}".format(self.db_config))
+        with DBPool.shared(self.db_config).connection() as conn:
+            yield conn
+            # logger.debug("committing transactions")
+            # conn.commit()
+        logger.debug("{} returned its database connection".format(self._id))
+
+
+# part of the url of every pricing payload the page downloads
+PRICING_PAYLOAD_URL = '/pricing/2.0/meteredUnitMaps/ec2/'
+
+
+def parse_pricing_payload(payload: Dict[str, Any]) -> List[list]:
+    """
+    The rows of the pricing table, with the page's columns (instance type,
+    cost per hour, vCPUs, GiB of memory, storage, network performance), from
+    one of the json documents the page downloads for an operating system and
+    region. Costs and sizes come out as numbers instead of '$0.0052' and
+    '0.5 GiB'.
+
+    ```json
+    {"manifest": {...}, "sets": {}, "regions": {"US East (N. Virginia)": {
+        "t3.nano Linux": {"price": "0.0052000000", "Instance Type": "t3.nano", "vCPU": "2",
+            "Memory": "0.5 GiB", "Storage": "EBS Only", "Network Performance": "Up to 5 Gigabit", ...},
+    ...}}}
+    ```
+    """
+    rows = []
+    for items in payload['regions'].values():
+        for item in items.values():
+            rows.append([
+                item['Instance Type'],
+                float(item['price']),
+                int(item['vCPU']),
+                float(item['Memory'].split(' ')[0].replace(',', '')),
+                item['Storage'],
+                item['Network Performance'],
+            ])
+    return rows
+
+
+def save_payload(payload_dir: str | Path, _os: str, region: str, payload: Dict[str, Any]) -> Path:
+    """Record a payload as payload_dir/<os>/<region>.json, e.g. for scrpr.payload_server or a test fixture."""
+    path = Path(payload_dir) / _os / "{}.json".format(region)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(payload, f)
+    return path
+
+
+class EC2NetworkDataCollector(EC2DataCollector):
+    """
+    Reads the pricing data the page downloads when the operating system and
+    region are selected, out of Chrome's performance log, instead of reading
+    the rendered table page by page.
+    Falls back to the table if no usable download shows up, e.g. in a
+    browser leased from the pool, which doesn't keep a performance log.
+    """
+    performance_log = True
+
+    def __init__(self, _id, config: EC2DataCollectorConfig, _test_driver=None):
+        # request id -> url, of pricing payload responses seen in the log
+        self._payload_responses: Dict[str, str] = {}
+        self._finished_requests: set = set()
+        # given up on once a task sees no pricing traffic at all
+        self.read_payloads = True
+        super().__init__(_id, config, _test_driver)
+        self.payload_dir = config.payload_dir
+
+    def read_payload_responses(self) -> None:
+        """Note the pricing payloads which have been received, and which requests have finished loading."""
+        for message in self.read_performance_log():
+            params = message.get('params', {})
+            if message['method'] == 'Network.responseReceived' and PRICING_PAYLOAD_URL in params['response']['url']:
+                self._payload_responses[params['requestId']] = unquote(params['response']['url'])
+            elif message['method'] == 'Network.loadingFinished':
+                self._finished_requests.add(params['requestId'])
+
+    def forget_payloads(self) -> None:
+        self.read_payload_responses()
+        self._payload_responses.clear()
+        self._finished_requests.clear()
+
+    def location_of(self, region: str) -> Optional[str]:
+        """The long name of region, which its pricing payloads are filed under. None if it can't be looked up."""
+        try:
+            return PricingClient.shared(self.config.pricing_url).locations().get(region)
+        except ScrprException as e:
+            logger.warning("worker {}: can't look up the pricing locations, reading tables from now on: {}".format(self._id, e))
+            self.read_payloads = False
+            return None
+
+    def latest_payload(self, _os: str, region: str) -> Optional[Dict[str, Any]]:
+        """
+        The last fully downloaded pricing payload for _os and region since
+        forget_payloads(), if any. Selecting the operating system first
+        downloads its payload for the last region too, which doesn't count.
+        """
+        location = self.location_of(region)
+        if location is None:
+            return None
+        self.read_payload_responses()
+        for request_id, url in reversed(list(self._payload_responses.items())):
+            if request_id in self._finished_requests and "/{}/{}/".format(location, _os) in url:
+                body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+                return json.loads(body['body'])
+        return None
+
+    def collect_ec2_data(self, _os: str, region: str, vcpu: Optional[str] = None) -> List[Instance]:
+        self.task_rows = 0
+        self.task_expected_rows = None
+        rows = None
+        total_row_count = None
+        found = {}
+        # the payload is the whole table
+        if not self.read_payloads or vcpu is not None or self.vcpu_filtered:
+            yield from super().collect_ec2_data(_os, region, vcpu)
+            return
+
+        def payload_downloaded():
+            found['payload'] = self.latest_payload(_os, region)
+            return found['payload'] is not None
+        try:
+            self.forget_payloads()
+            self.driver.switch_to.frame(self.iframe)
+            try:
+                self.operating_system_dropdown.select(_os, table=self.table)
+                self.region_dropdown.select(region, table=self.table)
+                total_row_count = self.table.rows.get_total_row_count()
+            finally:
+                self.driver.switch_to.default_content()
+            if wait_until('pricing_payload', payload_downloaded, 5.0):
+                rows = parse_pricing_payload(found['payload'])
+            elif not self._payload_responses:
+                logger.warning("worker {}: the page's pricing downloads don't show up in the performance log, reading tables from now on".format(self._id))
+                self.read_payloads = False
+        except Exception as e:
+            logger.warning("worker {}: could not read the pricing payload for os '{}' region '{}': {}".format(self._id, _os, region, e))
+
+        if rows is None or len(rows) != total_row_count:
+            logger.info("worker {}: no usable pricing payload for os '{}' region '{}' ({} rows), reading the table".format(
+                self._id, _os, region, None if rows is None else len(rows)
+            ))
+            yield from super().collect_ec2_data(_os, region)
             return
-        logger.debug("connecting to database with config: {}".format(self.db_config))
-        conn = psycopg2.connect(
-            self.db_config.get_dsl()
+
+        if self.payload_dir is not None:
+            logger.debug("saved pricing payload to '{}'".format(save_payload(self.payload_dir, _os, region, found['payload'])))
+        self.task_expected_rows = total_row_count
+        self.task_rows = len(rows)
+        yield rows
+
+
+# the long names of the regions, which the pricing payloads are filed under
+LOCATIONS_PATH = '/locations/1.0/aws/current/locations.json'
+PRICING_PAYLOAD_PATH = PRICING_PAYLOAD_URL + 'USD/current/ec2-ondemand-without-sec-sel/{location}/{os}/index.json'
+
+
+class PricingClient:
+    """
+    Downloads the pricing page's data, without the page, over a pool of
+    connections to base_url. Takes the place of the browser in an
+    EC2HttpDataCollector. Use shared() to get the one every worker uses.
+    """
+    _shared: Dict[str, 'PricingClient'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, base_url: str = DEFAULT_PRICING_URL, maxsize: int = HTTP_THREAD_COUNT, timeout: float = 10.0, retries: int = 3) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.http = urllib3.PoolManager(
+            maxsize=maxsize,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=urllib3.Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
         )
-        yield conn
-        # logger.debug("committing transactions")
-        # conn.commit()
-        logger.debug("{} closing database connection".format(self._id))
-        conn.close()
+        self._locations: Optional[Dict[str, str]] = None
+        self._locations_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, base_url: str = DEFAULT_PRICING_URL) -> 'PricingClient':
+        with cls._shared_lock:
+            if base_url not in cls._shared:
+                cls._shared[base_url] = cls(base_url)
+            return cls._shared[base_url]
+
+    def get_json(self, path: str) -> Any:
+        url = self.base_url + quote(path, safe="/()")
+        try:
+            r = self.http.request('GET', url)
+        except urllib3.exceptions.HTTPError as e:
+            raise ScrprException("GET {} failed: {}".format(url, e)) from e
+        if r.status != 200:
+            raise ScrprException("GET {} returned {}".format(url, r.status))
+        return json.loads(r.data)
+
+    def locations(self) -> Dict[str, str]:
+        """region code -> the region's long name, e.g. 'us-east-1' -> 'US East (N. Virginia)'"""
+        with self._locations_lock:
+            if self._locations is None:
+                self._locations = {
+                    loc['code']: loc['name'] for loc in self.get_json(LOCATIONS_PATH).values()
+                    if loc.get('type') == 'AWS Region'
+                }
+            return self._locations
+
+    def get_payload(self, _os: str, region: str) -> Dict[str, Any]:
+        location = self.locations().get(region)
+        if location is None:
+            raise ScrprException("no pricing location for region '{}'".format(region))
+        return self.get_json(PRICING_PAYLOAD_PATH.format(location=location, os=_os))
+
+    def quit(self) -> None:
+        # the connections are shared with every other worker, and closed on exit
+        pass
+
+
+class EC2HttpDataCollector(EC2DataCollector):
+    """
+    Downloads each table's pricing data like the page does, without a
+    browser, and stores it like any other EC2DataCollector.
+    Which regions and operating systems there are still has to be read off the
+    page, by an EC2DataCollector.
+    """
+    def __init__(self, _id, config: EC2DataCollectorConfig, _test_driver=None):
+        # a PricingClient in place of a browser, so there's no page to prepare
+        super().__init__(_id, config, _test_driver=_test_driver or PricingClient.shared(config.pricing_url))
+        self.payload_dir = config.payload_dir
+
+    def get_row_count(self, _os: str, region: str) -> Optional[int]:
+        return len(parse_pricing_payload(self.driver.get_payload(_os, region)))
+
+    def collect_ec2_data(self, _os: str, region: str, vcpu: Optional[str] = None) -> List[Instance]:
+        self.task_rows = 0
+        self.task_expected_rows = None
+        if vcpu is not None:
+            raise ScrprException("worker {}: tasks can't be split by vCPU count without a browser".format(self._id))
+        logger.debug(f"{self._id} download: {region=} {_os=}")
+        payload = self.driver.get_payload(_os, region)
+        rows = parse_pricing_payload(payload)
+        if self.payload_dir is not None:
+            logger.debug("saved pricing payload to '{}'".format(save_payload(self.payload_dir, _os, region, payload)))
+        logger.info("{} downloaded {} rows for os: {} region {}".format(self._id, len(rows), _os, region))
+        self.task_rows = len(rows)
+        yield rows
+
+
+COLLECTORS = {
+    'selenium': EC2DataCollector,
+    'devtools': EC2NetworkDataCollector,
+    'http': EC2HttpDataCollector,
+}
+
+
+def _rows_as_stored(rows: List[list]) -> Dict[str, tuple]:
+    """instance type -> the row's values the way they'd be stored"""
+    stored = {}
+    for row in rows:
+        try:
+            stored[row[0]] = PGInstance('', '', '', *row).prep_data()[4:]
+        except (ValueError, TypeError, IndexError):
+            stored[row[0]] = tuple(row[1:])
+    return stored
+
+
+def diff_rows(expected: List[list], actual: List[list]) -> List[str]:
+    """How two collectors' rows for the same table differ, once normalized the way they'd be stored."""
+    expected_rows = _rows_as_stored(expected)
+    actual_rows = _rows_as_stored(actual)
+    differences = []
+    for instance_type in sorted(expected_rows.keys() | actual_rows.keys()):
+        e = expected_rows.get(instance_type)
+        a = actual_rows.get(instance_type)
+        if e != a:
+            differences.append("{}: {} != {}".format(instance_type, e, a))
+    return differences
+
+
+def compare_collectors(tasks: List[Tuple[str, str]], expected: DataCollector, actual: DataCollector) -> Dict[Tuple[str, str], List[str]]:
+    """Collect each task with both collectors, without storing anything. The tasks whose rows differ, and how."""
+    differences = {}
+    for task in tasks:
+        try:
+            expected_rows = [row for page in expected.collect_ec2_data(*task) for row in page]
+            actual_rows = [row for page in actual.collect_ec2_data(*task) for row in page]
+        except Exception as e:
+            differences[task] = ["could not collect: {}".format(e)]
+            continue
+        task_differences = diff_rows(expected_rows, actual_rows)
+        logger.info("{}: {} rows, {} differences".format(task, len(expected_rows), len(task_differences)))
+        if task_differences:
+            differences[task] = task_differences
+    return differences
 
 
 def compress_data(csv_data_dir: str, data_type_scraped: str, human_date: str, rm_tree=True):
@@ -1054,8 +3308,93 @@ def do_args(sys_args):
     parser.add_argument("-t", "--thread-count",
         default=cpu_count(),
         action='store',
+        type=thread_count_arg,
+        help="number of threads (Selenium drivers) to use, or 'auto' to use as many as available memory allows")
+    parser.add_argument("--executor",
+        choices=('thread', 'process'),
+        default='thread',
+        help="run each Selenium driver in a thread of this process, or in a separate worker process")
+    parser.add_argument("--split-rows",
+        default=500,
+        type=int,
+        metavar='N',
+        help="split operating system/region tables expected to have N or more rows into one task per vCPU count, for several threads to share (0 never splits). Only with --collector selenium")
+    parser.add_argument("--task-affinity",
+        default=8,
+        type=int,
+        metavar='N',
+        help="let a thread look up to N tasks ahead for one with the operating system or region it already has selected (0 or 1 to take tasks strictly in order)")
+    parser.add_argument("--row-extraction",
+        choices=('cells', 'js'),
+        default='cells',
+        help="read the pricing table one cell at a time through the WebDriver, or a page at a time with a script")
+    parser.add_argument("--full-table",
+        action=BooleanOptionalAction,
+        default=False,
+        help="read all of a table's rows at once from the page's data instead of clicking through its pages, falling back to the pages if that doesn't work")
+    parser.add_argument("--collector",
+        choices=tuple(COLLECTORS),
+        default='selenium',
+        help="read the pricing table from the page (selenium), the pricing data the page downloads from Chrome's performance log (devtools), or download that data without a browser (http)")
+    parser.add_argument("--record-payloads",
+        default=None,
+        metavar='DIR',
+        help="with --collector devtools or http, save every pricing payload read under DIR/<operating system>/<region>.json")
+    parser.add_argument("--page-url",
+        default=DEFAULT_PAGE_URL,
+        metavar='URL',
+        help="the pricing page the browsers scrape, e.g. a 'python -m scrpr.replay' stand-in for it")
+    parser.add_argument("--pricing-url",
+        default=DEFAULT_PRICING_URL,
+        metavar='URL',
+        help="where --collector http downloads the pricing data from, e.g. a 'python -m scrpr.payload_server'")
+    parser.add_argument("--compare-collectors",
+        action='store_true',
+        help="collect each operating system/region with the browser and with --collector http, print where they differ, then exit. Stores nothing")
+    parser.add_argument("--block-resources",
+        choices=tuple(BLOCK_PROFILES),
+        default='none',
+        help="keep the browsers from loading the pricing page's images, fonts and videos (media), and its analytics and third party tags too (heavy)")
+    parser.add_argument("--block-url",
+        action='append',
+        default=None,
+        metavar='PATTERN',
+        help="also keep the browsers from loading urls matching PATTERN, e.g. '*.css*'. May be given more than once")
+    parser.add_argument("--pool",
+        nargs='?',
+        const=DEFAULT_POOL_SOCKET,
+        default=None,
+        metavar='SOCKET',
+        help="borrow warm browsers from a running 'python -m scrpr.pool' (default socket {}), starting browsers as usual for any it can't lend".format(DEFAULT_POOL_SOCKET))
+    parser.add_argument("--memory-floor-mb",
+        default=DEFAULT_MEMORY_FLOOR_MB,
+        action='store',
+        type=int,
+        help="stop starting new tasks and shed threads while available memory is under this many MB (0 disables)")
+    parser.add_argument("--recycle-after-tasks",
+        default=0,
+        action='store',
+        type=int,
+        help="restart each thread's browser after this many tasks (0 never restarts)")
+    parser.add_argument("--recycle-rss-mb",
+        default=0,
+        action='store',
+        type=int,
+        help="restart a thread's browser between tasks once it uses this many MB of memory (0 never restarts)")
+    parser.add_argument("--max-attempts",
+        default=3,
+        action='store',
         type=int,
-        help="number of threads (Selenium drivers) to use")
+        help="number of times to try scraping an operating system/region before giving up on it")
+    parser.add_argument("--retry-backoff",
+        default=5.0,
+        action='store',
+        type=float,
+        help="seconds to wait before retrying a failed operating system/region, doubled after each attempt")
+    parser.add_argument("--retry-restart",
+        action=BooleanOptionalAction,
+        default=True,
+        help="restart a thread's browser after it fails to scrape an operating system/region")
     parser.add_argument("--overdrive-madness",
         action='store_true',
         help=f"allow going over the recommended number of threads (number of threads for your machine, {cpu_count()})")
@@ -1084,6 +3423,11 @@ def do_args(sys_args):
         action='store_true',
         required=False,
         help="print a list of the available regions and exit")
+    parser.add_argument("--dropdown-cache-ttl",
+        default=DEFAULT_DROPDOWN_CACHE_TTL,
+        type=float,
+        metavar='SECONDS',
+        help="reuse the regions, operating systems and dropdown menus found on the page for this long, unless the page has changed (0 to always look)")
     parser.add_argument("-d", "--csv-data-dir",
         required=False,
         default=DEFAULT_CSV_DATA_DIR,
@@ -1099,6 +3443,23 @@ def do_args(sys_args):
         action=BooleanOptionalAction,
         default=True,
         help="toggle saving data to a database")
+    parser.add_argument("--db-load-mode",
+        choices=('insert', 'copy'),
+        default='insert',
+        help="insert each page of rows as it's scraped, or COPY them into a staging table and store them all at once when the run is done")
+    parser.add_argument("--db-conflict",
+        choices=ON_CONFLICT,
+        default='skip',
+        help="what storing a row which is already in the database does: leave the stored row be, or overwrite it with the new price")
+    parser.add_argument("--storage-writers",
+        type=storage_writers_arg,
+        default=0,
+        help="store the scraped pages on this many threads of their own, so that the browsers don't wait on the database. 0 stores each page from the worker which scraped it")
+    parser.add_argument("--probe-row-counts",
+        required=False,
+        action=BooleanOptionalAction,
+        default=True,
+        help="read the table size of regions that have never been scraped before, to schedule the largest tasks first")
     parser.add_argument("-v",
         required=False,
         action='count',
@@ -1109,6 +3470,20 @@ def do_args(sys_args):
         required=False,
         action='store_true',
         help='return the current size of the database and csv directory, then exit.')
+    parser.add_argument("--resume",
+        action='store_true',
+        help="skip the operating system/region pairs already collected today, according to the run ledger")
+    parser.add_argument("--shard",
+        type=shard_arg,
+        default=None,
+        metavar='K/N',
+        help="collect only the K'th of N equal shares of the operating system/region pairs, e.g. one per host")
+    parser.add_argument("--verify-shards",
+        nargs='?',
+        const=get_date().strftime("%Y-%m-%d"),
+        default=None,
+        metavar='YYYY-MM-DD',
+        help="check that the day's (default today) --shard runs covered every operating system/region pair exactly once, then exit. Reads the database, or the local shard reports with --no-store-db")
 
     # parser.add_argument("-h", "--help",
     #     required=False,
@@ -1154,14 +3529,14 @@ def get_table_size(db_config: DatabaseConfig, table='ec2_instance_pricing') -> i
     # SELECT pg_size_pretty(pg_total_relation_size('public.ec2_instance_pricing'));  # kB, mB
     try:
         s = sql.SQL("SELECT pg_total_relation_size('public.{}')".format(table))
-        conn = psycopg2.connect(db_config.get_dsl())
-        curr = conn.cursor()
-        curr.execute(s)
-        r = curr.fetchone()
+        with DBPool.shared(db_config).connection() as conn:
+            curr = conn.cursor()
+            curr.execute(s)
+            r = curr.fetchone()
+            curr.close()
         if r is None:
             logger.error("Couldn't get table size data - check your db_config.")
         size_bytes = r[0]
-        conn.close()
         logger.debug("'{}' table is {:.2f} Mb ({} bytes)".format(
             table, size_bytes / 1024 / 1024, size_bytes
         ))
@@ -1171,6 +3546,51 @@ def get_table_size(db_config: DatabaseConfig, table='ec2_instance_pricing') -> i
         return -1
 
 
+def staging_table_name(human_date: str, shard: Optional[Tuple[int, int]] = None) -> str:
+    """One per day (and shard), so that --resume merges what a run which died before merging had staged."""
+    name = "ec2_instance_pricing_staging_{}".format(human_date.replace('-', '_'))
+    if shard:
+        name += "_{}of{}".format(*shard)
+    return name
+
+
+def create_staging_table(db_config: DatabaseConfig, staging: str, table='ec2_instance_pricing') -> bool:
+    try:
+        with DBPool.shared(db_config).connection() as conn:
+            PGInstance.create_staging_table(conn, staging, table=table)
+        return True
+    except Exception as e:
+        logger.error("Could not create staging table '{}': {}".format(staging, e))
+        return False
+
+
+def merge_staging_table(db_config: DatabaseConfig, staging: str, table='ec2_instance_pricing', on_conflict='skip') -> Optional[Tuple[int, int]]:
+    """
+    Store what the workers copied into staging, see PGInstance.merge_staged().
+    Returns (stored, already existed), or None on error, leaving staging be.
+    """
+    try:
+        t_start = time.monotonic()
+        with DBPool.shared(db_config).connection() as conn:
+            stored, already_existed = PGInstance.merge_staged(conn, staging, table=table, on_conflict=on_conflict)
+        logger.info("merged '{}' into '{}' in {:.2f}s: {} rows stored, {} already existed".format(
+            staging, table, time.monotonic() - t_start, stored, already_existed
+        ))
+        return stored, already_existed
+    except Exception as e:
+        logger.error("Could not merge staging table '{}' into '{}', it's been kept: {}".format(staging, table, e))
+        return None
+
+
+def size_db_pool(db_config: DatabaseConfig, num_threads: int, storage_writers: int = 0) -> None:
+    """
+    A connection for each worker or storage writer, and one for the run's own
+    bookkeeping. Before the workers start: worker processes keep the pool size
+    they were forked with.
+    """
+    DBPool.shared(db_config).resize(num_threads + storage_writers + 1)
+
+
 @dataclass
 class RunArgs:
     """
@@ -1178,7 +3598,7 @@ class RunArgs:
     These are provided as a Namespace by do_args()
     """
     follow: bool
-    thread_count: int
+    thread_count: int | str
     overdrive_madness: bool
     compress: bool
     regions: List[str]
@@ -1192,6 +3612,33 @@ class RunArgs:
     log_file: str = DEFAULT_LOG_FILE
     csv_data_dir: str = DEFAULT_CSV_DATA_DIR
     no_headless_init: bool = True
+    probe_row_counts: bool = True
+    memory_floor_mb: int = DEFAULT_MEMORY_FLOOR_MB
+    recycle_after_tasks: int = 0
+    recycle_rss_mb: int = 0
+    max_attempts: int = 3
+    retry_backoff: float = 5.0
+    retry_restart: bool = True
+    executor: str = 'thread'
+    task_affinity: int = 8
+    split_rows: int = 500
+    pool: Optional[str] = None
+    block_resources: str = 'none'
+    block_url: Optional[List[str]] = None
+    row_extraction: str = 'cells'
+    full_table: bool = False
+    dropdown_cache_ttl: float = DEFAULT_DROPDOWN_CACHE_TTL
+    collector: str = 'selenium'
+    record_payloads: Optional[str] = None
+    page_url: str = DEFAULT_PAGE_URL
+    pricing_url: str = DEFAULT_PRICING_URL
+    db_load_mode: str = 'insert'
+    db_conflict: str = 'skip'
+    storage_writers: int = 0
+    compare_collectors: bool = False
+    resume: bool = False
+    shard: Optional[Tuple[int, int]] = None
+    verify_shards: Optional[str] = None
 
     def load(self):
         raise NotImplementedError
@@ -1216,6 +3663,8 @@ class MetricData:
     s_csv: float = -2
     s_db: float = -2
     reported_errors: int = -2
+    # K/N, for a --shard run
+    shard: Optional[str] = None
     _command_line: dict = None
 
     def __init__(self, date):
@@ -1262,6 +3711,7 @@ class MetricData:
             "s_csv": self.s_csv,
             "s_db": self.s_db,
             "reported_errors": self.reported_errors,
+            "shard": self.shard,
             "command_line": self.command_line,
         })
 
@@ -1273,16 +3723,18 @@ class MetricData:
             logger.warn("not storing data")
             return False
         try:
-            conn = psycopg2.connect(db_config.get_dsl())
-            curr = conn.cursor()
-            curr.execute("""\
-                INSERT INTO metric_data (date, threads, oses, regions, t_init, t_run, s_csv, s_db, reported_errors, command_line)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (self.date, self.threads, self.oses, self.regions, self.t_init, self.t_run, self.s_csv, self.s_db, self.reported_errors, json.dumps(self.command_line))
-            )
-            conn.commit()
-            conn.close()
+            with DBPool.shared(db_config).connection() as conn:
+                curr = conn.cursor()
+                # metric_data tables from before --shard don't have the column
+                curr.execute("ALTER TABLE metric_data ADD COLUMN IF NOT EXISTS shard VARCHAR(15)")
+                curr.execute("""\
+                    INSERT INTO metric_data (date, threads, oses, regions, t_init, t_run, s_csv, s_db, reported_errors, command_line, shard)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """,
+                    (self.date, self.threads, self.oses, self.regions, self.t_init, self.t_run, self.s_csv, self.s_db, self.reported_errors, json.dumps(self.command_line), self.shard)
+                )
+                conn.commit()
+                curr.close()
             return True
         except Exception as e:
             logger.warning("Error saving metric data to database: {}".format(e))
@@ -1380,9 +3832,40 @@ def api_status_wrapper(f):
     return wrapper
 
 
+def get_thread_count(args: RunArgs) -> Optional[int]:
+    """Number of worker threads to use, or None when it must be measured (--thread-count auto)."""
+    if args.collector == 'http':
+        # no browsers, so no cpu or memory to run out of
+        return HTTP_THREAD_COUNT if args.thread_count == 'auto' else max(args.thread_count, 1)
+    if args.thread_count == 'auto':
+        return None
+    if args.thread_count < 1:
+        return 1
+    if args.thread_count > cpu_count() and not args.overdrive_madness:
+        logger.warning("Using {} threads instead of requested {}".format(cpu_count(), args.thread_count))
+        return cpu_count()
+    return args.thread_count
+
+
+def print_available(args: RunArgs, tgt_oses: List[str], tgt_regions: List[str]) -> None:
+    """--get-operating-systems and --get-regions"""
+    # argparsing
+    if args.get_operating_systems:
+        logger.debug("tgt_oses = {}".format(tgt_oses))
+        print("Available Operating Systems:")
+        for _os in tgt_oses:
+            print(f"\t'{_os}'")
+    # argparsing
+    if args.get_regions:
+        logger.debug("tgt_regions = {}".format(tgt_regions))
+        print("Available Regions:")
+        for r in tgt_regions:
+            print(f"\t{r}")
+
+
 @api_status_wrapper
 def main(args: RunArgs):  # noqa: C901
-    global ROWS_STORED, ROWS_COLLECTED
+    global ROWS_STORED, ROWS_COLLECTED, ROWS_ALREADY_EXISTED
 
     t_main = time.time()
     # set the collection date relative to time main() was called
@@ -1428,12 +3911,24 @@ def main(args: RunArgs):  # noqa: C901
             print(e)
         raise SystemExit(0)
 
+    # argparsing
+    if args.verify_shards:
+        if args.store_db:
+            reports = ShardReport.load_all_from_db(args.verify_shards, db_config)
+        else:
+            reports = ShardReport.load_all(args.verify_shards)
+        problems = verify_shards(reports)
+        for problem in problems:
+            print(problem)
+        if not problems:
+            print("{} shards of {} covered every task exactly once".format(len(reports), args.verify_shards))
+        raise SystemExit(1 if problems else 0)
+
     # argparsing
     if args.store_db:
         metric_data.s_db = -1
-        conn = psycopg2.connect(db_config.get_dsl())
-        conn.close()
-        logger.debug("db connection ok")
+        with DBPool.shared(db_config).connection():
+            logger.debug("db connection ok")
     else:
         db_config = None
 
@@ -1443,12 +3938,34 @@ def main(args: RunArgs):  # noqa: C901
     else:
         csv_data_dir = DEFAULT_CSV_DATA_DIR
 
+    block_profile = BLOCK_PROFILES[args.block_resources]
+    # argparsing
+    if args.block_url:
+        block_profile = replace(block_profile, url_patterns=block_profile.url_patterns + tuple(args.block_url))
+
     config = EC2DataCollectorConfig(
         headless=True,
         human_date=human_date,
         csv_data_dir=csv_data_dir,
         db_config=db_config,
+        recycle_after_tasks=args.recycle_after_tasks,
+        recycle_rss_mb=args.recycle_rss_mb,
+        pool_socket=args.pool,
+        block_profile=block_profile if block_profile.blocked_urls() else None,
+        row_extraction=args.row_extraction,
+        full_table=args.full_table,
+        payload_dir=args.record_payloads,
+        dropdown_cache_ttl=args.dropdown_cache_ttl,
+        url=args.page_url,
+        pricing_url=args.pricing_url,
+        db_conflict=args.db_conflict,
+        storage_writers=args.storage_writers if args.store_db else 0,
     )
+    # argparsing
+    if args.store_db and args.db_load_mode == 'copy':
+        config.staging_table = staging_table_name(human_date, args.shard)
+        if not create_staging_table(db_config, config.staging_table):
+            raise SystemExit(1)
 
     logger.debug("-----------------program args---------------------")
     for arg, val in vars(args).items():
@@ -1469,29 +3986,70 @@ def main(args: RunArgs):  # noqa: C901
     ##########################################################################
     # regions and operating systems
     ##########################################################################
-    if not DataCollector.version_check():
+    # argparsing
+    if args.get_operating_systems or args.get_regions:
+        dropdown_cache = DropdownCache(ttl=args.dropdown_cache_ttl, url=args.page_url)
+        # no need for a browser
+        if dropdown_cache.load() and dropdown_cache.is_fresh():
+            logger.debug("listing from the dropdown cache saved at {}".format(dropdown_cache.t_saved))
+            print_available(args, dropdown_cache.options('Operating system'), dropdown_cache.options('Region'))
+            exit(0)
+
+    # the pool checks its own browsers
+    if not args.pool and not DataCollector.version_check():
         raise SystemExit(1)
+
+    metric_data.t_init = 0
+    # written to as tasks finish, for --resume
+    ledger = RunLedger(human_date, db_config=db_config)
+    # argparsing
+    collector_class = COLLECTORS[args.collector]
+    # the regions and operating systems are always read off the page
+    bootstrap_class = EC2DataCollector if collector_class is EC2HttpDataCollector else collector_class
+    num_threads = get_thread_count(args)
+    memory_floor = args.memory_floor_mb * 1024 * 1024
+    # argparsing
+    divvier = ProcessDivvier if args.executor == 'process' else ThreadDivvier
+    thread_thing = divvier(
+        thread_count=num_threads or 1,
+        memory_floor=memory_floor,
+        max_attempts=args.max_attempts,
+        retry_backoff=args.retry_backoff,
+        restart_on_failure=args.retry_restart,
+        ledger=ledger,
+        collector_class=collector_class,
+        affinity_window=args.task_affinity,
+    )
+    # the os/region collector becomes worker 0 once it's done, unless it can't
+    # be handed to a worker process, or its window is shown for debugging
+    reuse_bootstrap = divvier is ThreadDivvier and not args.no_headless_init and bootstrap_class is collector_class
+    # argparsing
+    no_workers = args.get_operating_systems or args.get_regions or args.compare_collectors
+    if num_threads is not None and not no_workers:
+        if db_config:
+            size_db_pool(db_config, num_threads, config.storage_writers)
+        # start the other workers while the os/region collector loads the page
+        thread_thing.init_scrapers_of(
+            config=config, count=num_threads - reuse_bootstrap, first_id=int(reuse_bootstrap), wait=False
+        )
+
     set_api_status("collecting available regions and operating systems")
     os_region_collector_config = copy(config)
     os_region_collector_config.headless = not args.no_headless_init
-    os_region_collector = EC2DataCollector('os_region_collector', config=os_region_collector_config)
+    try:
+        os_region_collector = bootstrap_class(
+            0 if reuse_bootstrap else 'os_region_collector', config=os_region_collector_config
+        )
+    except BaseException:
+        # including a SystemExit or KeyboardInterrupt, the workers started above don't outlive main()
+        thread_thing.shutdown()
+        raise
     tgt_oses = os_region_collector.operating_system_dropdown.options
     tgt_regions = os_region_collector.region_dropdown.options
     # argparsing
-    if args.get_operating_systems:
-        logger.debug("tgt_oses = {}".format(tgt_oses))
-        print("Available Operating Systems:")
-        for _os in tgt_oses:
-            print(f"\t'{_os}'")
-    # argparsing
-    if args.get_regions:
-        logger.debug("tgt_regions = {}".format(tgt_regions))
-        print("Available Regions:")
-        for r in tgt_regions:
-            print(f"\t{r}")
-    os_region_collector.driver.quit()
-    # argparsing
     if args.get_operating_systems or args.get_regions:
+        print_available(args, tgt_oses, tgt_regions)
+        os_region_collector.driver.quit()
         exit(0)
 
     ##########################################################################
@@ -1507,6 +4065,8 @@ def main(args: RunArgs):  # noqa: C901
             if r not in tgt_regions:
                 [print(f"{n}:\t{R}") for n, R in enumerate(tgt_regions)]
                 print(f"supplied region '{r}' not in list")
+                os_region_collector.driver.quit()
+                thread_thing.shutdown()
                 exit(1)
         tgt_regions = args.regions.split(',')
     metric_data.regions = len(tgt_regions)
@@ -1520,42 +4080,116 @@ def main(args: RunArgs):  # noqa: C901
             if o not in tgt_oses:
                 [print(f"{n}:\t{O}") for n, O in enumerate(tgt_oses)]
                 print(f"supplied operating system '{o}' not in list")
+                os_region_collector.driver.quit()
+                thread_thing.shutdown()
                 exit(1)
         tgt_oses = args.operating_systems.split(',')
     metric_data.oses = len(tgt_oses)
 
-    num_threads = cpu_count()
     # argparsing
-    if args.thread_count < 1:
-        num_threads = 1
-    elif args.thread_count > cpu_count() and not args.overdrive_madness:
-        logger.warning("Using {} threads instead of requested {}".format(cpu_count(), args.thread_count))
-        num_threads = cpu_count()
-    else:
-        num_threads = args.thread_count
+    if num_threads is None and not no_workers:
+        driver_rss = os_region_collector.get_driver_rss()
+        # the bootstrap collector is already running, count it as one of the threads
+        available = psutil.virtual_memory().available + driver_rss
+        num_threads = auto_thread_count(
+            driver_rss, available, memory_floor,
+            max_threads=None if args.overdrive_madness else cpu_count()
+        )
+        logger.info("Using {} threads ({:.0f} MB per browser, {:.0f} MB available)".format(
+            num_threads, driver_rss / 1024 / 1024, available / 1024 / 1024
+        ))
+        thread_thing.thread_count = num_threads
+        if db_config:
+            size_db_pool(db_config, num_threads, config.storage_writers)
+        thread_thing.init_scrapers_of(
+            config=config, count=num_threads - reuse_bootstrap, first_id=int(reuse_bootstrap), wait=False
+        )
     metric_data.threads = num_threads
 
     thread_tgts = []
     for o in tgt_oses:
         for r in tgt_regions:
             thread_tgts.append((o, r))
+    fingerprint = matrix_fingerprint(thread_tgts)
+    # argparsing
+    if args.shard:
+        thread_tgts = shard_tasks(thread_tgts, *args.shard)
+        metric_data.shard = "{}/{}".format(*args.shard)
+        logger.info("shard {}: {} tasks of {}".format(metric_data.shard, len(thread_tgts), len(tgt_oses) * len(tgt_regions)))
+    shard_tgts = thread_tgts
+    # argparsing
+    if args.compare_collectors:
+        # the table as it's read off the page, whichever --collector bootstrapped the run
+        if type(os_region_collector) is EC2DataCollector:
+            expected = os_region_collector
+        else:
+            os_region_collector.driver.quit()
+            expected = EC2DataCollector('selenium', config)
+        differences = compare_collectors(thread_tgts, expected, EC2HttpDataCollector('http', config))
+        expected.driver.quit()
+        for task, task_differences in differences.items():
+            print("{} {}:".format(*task))
+            for d in task_differences:
+                print("\t{}".format(d))
+        print("{} of {} tasks differ".format(len(differences), len(thread_tgts)))
+        exit(1 if differences else 0)
+    # argparsing
+    if args.resume:
+        ledger.load()
+        thread_tgts = ledger.remaining(thread_tgts)
+        logger.info("resuming: {} of {} tasks left to do".format(len(thread_tgts), len(shard_tgts)))
+
+    # longest expected task first
+    task_stats = TaskStats()
+    task_stats.load()
+    row_counts = {}
+    # argparsing
+    if args.probe_row_counts:
+        for r in task_stats.unknown_regions(tgt_regions):
+            try:
+                row_counts[r] = os_region_collector.get_row_count(tgt_oses[0], r)
+                logger.debug("probed {} rows for region {}".format(row_counts[r], r))
+            except Exception as e:
+                logger.warning("could not probe row count for region {}: {}".format(r, e))
+    if reuse_bootstrap:
+        thread_thing.add_scraper(os_region_collector)
+    else:
+        os_region_collector.driver.quit()
+    thread_tgts = task_stats.order(thread_tgts, row_counts=row_counts)
+    _costs = [task_stats.expected_cost(*t, row_counts=row_counts) for t in thread_tgts]
+    if None not in _costs:
+        logger.info("expected run time {} over {} threads (total work {})".format(
+            seconds_to_timer(lpt_makespan(_costs, num_threads)), num_threads, seconds_to_timer(sum(_costs))
+        ))
+    # argparsing
+    if args.split_rows and collector_class is EC2DataCollector and os_region_collector.cpu_dropdown is not None:
+        vcpus = [v for v in os_region_collector.cpu_dropdown.options if v != os_region_collector.cpu_default]
+        n_tasks = len(thread_tgts)
+        thread_tgts = split_tasks(thread_tgts, vcpus, args.split_rows, lambda o, r: task_stats.expected_rows(o, r, row_counts))
+        logger.info("split tasks of {}+ rows by vCPU count: {} tasks to run for {}".format(args.split_rows, len(thread_tgts), n_tasks))
     logger.trace("thread targets ({}) = {}".format(len(thread_tgts), thread_tgts))
 
-    metric_data.t_init = 0
-    thread_thing = ThreadDivvier(thread_count=num_threads)
-    thread_thing.init_scrapers_of(config=config)
+    thread_thing.wait_for_scrapers()
 
     t_prog_init = time.time() - t_main
     metric_data.t_init = t_prog_init
     logger.debug("Initialized in {}".format(seconds_to_timer(time.time() - t_main)))
 
     # blocks until all threads have finished running, and thread_tgts is exhausted
-    thread_thing.run_threads(thread_tgts)
+    results = thread_thing.run_threads(thread_tgts)
+    for result in results:
+        if result.ok:
+            task_stats.record(*result.task, rows=result.rows, t_run=result.t_run)
+    task_stats.save()
 
     ##########################################################################
     # after data has been collected
     ##########################################################################
     set_api_status("cleaning up")
+    storage_writers = StorageWriters.close_shared()
+    if config.staging_table and (merged := merge_staging_table(db_config, config.staging_table, on_conflict=config.db_conflict)) is not None:
+        ROWS_STORED += merged[0]
+        ROWS_ALREADY_EXISTED += merged[1]
     # # argparsing
     # if args.compress and csv_data_dir:
     #     compress_data(csv_data_dir, 'ec2', human_date, rm_tree=True)
@@ -1569,6 +4203,18 @@ def main(args: RunArgs):  # noqa: C901
         s_db = get_table_size(db_config) - s_db_start
         metric_data.s_db = s_db
 
+    # argparsing
+    if args.shard:
+        shard_report = ShardReport(
+            human_date, *args.shard,
+            matrix_fingerprint=fingerprint,
+            tasks=shard_tgts,
+            failed=[r.task for r in thread_thing.failed()],
+        )
+        logger.debug("Saved shard report to '{}'".format(shard_report.save()))
+        if db_config:
+            shard_report.store(db_config)
+
     metric_data.t_run = time.time() - t_main
     metric_data.reported_errors = len(ERRORS)
 
@@ -1586,11 +4232,29 @@ def main(args: RunArgs):  # noqa: C901
     logger.debug('-----------------errors ({})---------------------------'.format(len(ERRORS)))
     for n, e in enumerate(ERRORS):
         logger.error("{}) {}".format(n+1, e))
+    failed = thread_thing.failed()
+    if failed:
+        logger.error('-----------------failed tasks ({})---------------------'.format(len(failed)))
+        for r in failed:
+            logger.error("{} after {} attempts: {}".format(r.task, r.attempt, r.error))
+        logger.error("to collect only the missing data, run:")
+        for hint in rerun_hint([r.task for r in failed]):
+            logger.error("python3 -m scrpr {}".format(hint))
     logger.debug('-----------------sanity check----------------------')
     logger.info(f"{ROWS_COLLECTED=}")
     logger.info(f"{ROWS_STORED=}")
     logger.info(f"{ROWS_ALREADY_EXISTED=}")
     logger.info(f"{ROWS_STORED + ROWS_ALREADY_EXISTED == ROWS_COLLECTED=}")
+    logger.debug('-----------------waits---------------------------------')
+    for line in WAITS.summary():
+        logger.debug(line)
+    if storage_writers is not None:
+        for line in storage_writers.summary():
+            logger.debug(line)
+    if db_config:
+        pool = DBPool.shared(db_config)
+        logger.debug("db pool: {} connections, {} reconnects".format(pool.size, pool.reconnects))
+        pool.close()
 
     # conn = psycopg2.connect(db_config.get_dsl())
     # curr = conn.cursor()
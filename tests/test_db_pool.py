@@ -0,0 +1,169 @@
+import gc
+import os
+import threading
+import time
+import weakref
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import pytest
+
+from scrpr import scrpr
+
+
+def fake_connect(dsl):
+    conn = MagicMock()
+    conn.closed = 0
+    return conn
+
+
+@pytest.fixture
+def connect():
+    with patch.object(scrpr.psycopg2, 'connect', side_effect=fake_connect) as connect:
+        yield connect
+
+
+def test_db_pool_reuses_connections(connect):
+    pool = scrpr.DBPool('dbname=test', size=2)
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert connect.call_count == 1
+    # whatever wasn't committed is rolled back before the next borrower gets it
+    first.rollback.assert_called()
+
+
+def test_db_pool_waits_for_a_connection(connect):
+    pool = scrpr.DBPool('dbname=test', size=1)
+    got = []
+
+    def borrow():
+        with pool.connection() as conn:
+            got.append(conn)
+
+    with patch.object(scrpr, 'WAITS', scrpr.WaitMetrics()) as waits:
+        with pool.connection() as held:
+            t = threading.Thread(target=borrow)
+            t.start()
+            time.sleep(0.2)
+            # still waiting on the one connection
+            assert got == []
+        t.join(2)
+
+    assert got == [held]
+    assert connect.call_count == 1
+    assert max(waits.samples['db_pool']) >= 0.2
+
+
+def test_db_pool_replaces_broken_connections(connect):
+    pool = scrpr.DBPool('dbname=test', size=1)
+
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+    with pool.connection() as conn:
+        pass
+
+    broken.close.assert_called_once()
+    assert conn is not broken
+    assert connect.call_count == 2
+
+
+def test_db_pool_checks_idle_connections(connect):
+    pool = scrpr.DBPool('dbname=test', size=1, health_check_after=0)
+
+    with pool.connection() as stale:
+        pass
+    stale.cursor.return_value.execute.side_effect = psycopg2.OperationalError("gone")
+    with pool.connection() as conn:
+        pass
+
+    assert conn is not stale
+    assert pool.reconnects == 1
+    # and a healthy one is kept
+    with pool.connection() as again:
+        pass
+    assert again is conn
+    assert pool.reconnects == 1
+
+
+def test_db_pool_shared_by_dsl(connect):
+    config = scrpr.DatabaseConfig('localhost', dbname='scrpr_test_pool', user='nobody')
+    with patch.dict(scrpr.DBPool._shared, clear=True):
+        pool = scrpr.DBPool.shared(config)
+        assert scrpr.DBPool.shared(config) is pool
+        assert scrpr.DBPool.shared(scrpr.DatabaseConfig('localhost', dbname='scrpr_test_pool', user='somebody')) is not pool
+
+
+def test_db_pool_close(connect):
+    pool = scrpr.DBPool('dbname=test', size=2)
+    with pool.connection() as a, pool.connection() as b:
+        pass
+
+    pool.close()
+
+    a.close.assert_called_once()
+    b.close.assert_called_once()
+    with pool.connection() as c:
+        pass
+    assert c not in (a, b)
+
+
+def test_db_pool_leaves_the_parents_connections_alone_after_a_fork(connect):
+    pool = scrpr.DBPool('dbname=test', size=1)
+    with pool.connection() as parents:
+        pass
+
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            inherited = weakref.ref(parents)
+            with pool.connection() as childs:
+                pass
+            del parents
+            gc.collect()
+            # a new connection of its own, and the parent's is neither closed nor finalized
+            if childs is not inherited() and inherited() is not None and not inherited().close.called:
+                status = 0
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    with pool.connection() as conn:
+        conn.cursor().execute("SELECT 1")
+    assert conn is parents
+    parents.close.assert_not_called()
+
+
+def test_db_pool_parents_connection_survives_a_fork(pg_dbconfig):
+    pool = scrpr.DBPool(pg_dbconfig.get_dsl(), size=1)
+    with pool.connection() as parents:
+        pass
+
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            with pool.connection() as conn:
+                curr = conn.cursor()
+                curr.execute("SELECT 1")
+                status = 0
+            pool.close()
+            gc.collect()
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    with pool.connection() as conn:
+        curr = conn.cursor()
+        curr.execute("SELECT 1")
+        assert curr.fetchone() == (1,)
+    assert conn is parents
+    pool.close()
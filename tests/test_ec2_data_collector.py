@@ -1,4 +1,5 @@
 from pathlib import Path
+from unittest.mock import MagicMock, patch
 import os
 
 import pytest
@@ -11,6 +12,347 @@ def test_test_datacollector_has_no_driver_attribute(ec2_driverless_dc):
     assert ec2_driverless_dc.__getattribute__('driver') == 'nodriver'
 
 
+class FakeDriverCollector(scrpr.DataCollector):
+    def get_driver(self, **kwargs):
+        self.driver = MagicMock()
+
+
+def test_data_collector_recycles_after_task_count():
+    config = scrpr.DataCollectorConfig('1999-12-31', recycle_after_tasks=2)
+    dc = FakeDriverCollector('test', config)
+
+    assert dc.after_task() is dc
+    # one task before the limit, the replacement is started in the background
+    assert dc._replacement_thread is not None
+    replacement = dc.after_task()
+
+    assert replacement is not dc
+    assert replacement._id == dc._id
+    assert replacement.tasks_run == 0
+    dc.driver.quit.assert_called_once()
+    replacement.driver.quit.assert_not_called()
+
+
+def test_data_collector_never_recycles_by_default():
+    dc = FakeDriverCollector('test', scrpr.DataCollectorConfig('1999-12-31'))
+    for _ in range(100):
+        assert dc.after_task() is dc
+    assert dc._replacement_thread is None
+
+
+def _network_event(method, **params):
+    return {'message': scrpr.json.dumps({'message': {'method': method, 'params': params}})}
+
+
+def test_blocked_resources():
+    config = scrpr.DataCollectorConfig('1999-12-31', block_profile=scrpr.BLOCK_PROFILES['heavy'])
+    with patch('scrpr.scrpr.webdriver.Chrome') as chrome, patch('scrpr.scrpr.Service'):
+        dc = scrpr.DataCollector('test', config)
+
+    options = chrome.call_args.kwargs['options']
+    assert options.experimental_options['prefs'] == {'profile.managed_default_content_settings.images': 2}
+    assert options.to_capabilities()['goog:loggingPrefs'] == {'performance': 'ALL'}
+    blocked = dc.driver.execute_cdp_cmd.call_args.args[1]['urls']
+    assert '*.woff2*' in blocked and '*googletagmanager.com*' in blocked
+
+    dc.driver.get_log.return_value = [
+        _network_event('Network.loadingFailed', requestId='1', type='Image', blockedReason='inspector'),
+        _network_event('Network.loadingFailed', requestId='2', type='Font', blockedReason='inspector'),
+        _network_event('Network.loadingFailed', requestId='3', type='XHR', errorText='net::ERR_ABORTED'),
+        _network_event('Network.loadingFinished', requestId='4', encodedDataLength=2048),
+    ]
+    dc.after_task()
+    dc.after_task()
+
+    assert dc.block_stats.requests_blocked == 4
+    assert dc.block_stats.blocked_by_type == {'Image': 2, 'Font': 2}
+    assert (dc.block_stats.requests_loaded, dc.block_stats.bytes_loaded) == (2, 4096)
+
+
+def test_nothing_blocked_by_default():
+    with patch('scrpr.scrpr.webdriver.Chrome') as chrome, patch('scrpr.scrpr.Service'):
+        dc = scrpr.DataCollector('test', scrpr.DataCollectorConfig('1999-12-31'))
+
+    assert 'prefs' not in chrome.call_args.kwargs['options'].experimental_options
+    dc.driver.execute_cdp_cmd.assert_not_called()
+    assert dc.read_block_stats() is None
+
+
+LABELS = ['id="aws-element-region-label"', 'id="aws-element-os-label"']
+DROPDOWNS = {
+    'Region': {'label': LABELS[0], 'button': "//button[@id='aws-element-region']", 'options': ['us-east-1', 'us-west-2']},
+    'Operating system': {'label': LABELS[1], 'button': "//button[@id='aws-element-os']", 'options': ['Linux', 'Windows']},
+}
+
+
+def _dropdown_cache_collector(cache_file, ttl=60):
+    config = scrpr.EC2DataCollectorConfig('1999-12-31', dropdown_cache=str(cache_file), dropdown_cache_ttl=ttl)
+    dc = scrpr.EC2DataCollector('test', config, _test_driver=MagicMock())
+    dc.waiter = MagicMock()
+    dc.driver.execute_script.return_value = LABELS
+    dc.find_dropdown_menus = MagicMock(return_value=DROPDOWNS)
+    return dc
+
+
+def test_dropdown_menus_are_found_once_then_cached(tmp_path):
+    cache_file = tmp_path / 'dropdowns.json'
+    dc = _dropdown_cache_collector(cache_file)
+    dc.get_dropdown_menus()
+    dc.find_dropdown_menus.assert_called_once()
+
+    dc = _dropdown_cache_collector(cache_file)
+    dc.get_dropdown_menus()
+
+    dc.find_dropdown_menus.assert_not_called()
+    assert dc.region_dropdown.options == ['us-east-1', 'us-west-2']
+    assert dc.operating_system_dropdown.options == ['Linux', 'Windows']
+    dc.driver.find_element.assert_any_call(scrpr.By.XPATH, "//button[@id='aws-element-os']")
+    dc.driver.find_element.assert_any_call(scrpr.By.XPATH, """//*[@data-analytics-field-label='id="aws-element-os-label"']""")
+
+
+@pytest.mark.parametrize('labels, ttl', [
+    (LABELS, 0),
+    (LABELS + ['id="aws-element-new-filter-label"'], 60),
+])
+def test_stale_dropdown_cache_is_rediscovered(tmp_path, labels, ttl):
+    cache = scrpr.DropdownCache(tmp_path / 'dropdowns.json')
+    cache.fingerprint = scrpr.DropdownCache.fingerprint_of(LABELS)
+    cache.dropdowns = DROPDOWNS
+    cache.save()
+    dc = _dropdown_cache_collector(tmp_path / 'dropdowns.json', ttl=ttl)
+    dc.driver.execute_script.return_value = labels
+
+    dc.get_dropdown_menus()
+
+    dc.find_dropdown_menus.assert_called_once()
+    cache.load()
+    assert cache.fingerprint == scrpr.DropdownCache.fingerprint_of(labels)
+
+
+def test_dropdown_cache_is_kept_per_page(tmp_path):
+    cache = scrpr.DropdownCache(tmp_path / 'dropdowns.json', url='http://localhost:8000/ec2/pricing/on-demand/')
+    cache.fingerprint = scrpr.DropdownCache.fingerprint_of(LABELS)
+    cache.dropdowns = DROPDOWNS
+    cache.save()
+
+    assert cache.cache_file != tmp_path / 'dropdowns.json'
+    # not for AWS's page
+    assert not scrpr.DropdownCache(tmp_path / 'dropdowns.json').load()
+    replayed = scrpr.DropdownCache(tmp_path / 'dropdowns.json', url='http://localhost:8000/ec2/pricing/on-demand/')
+    assert replayed.load() and replayed.is_fresh()
+
+    dc = _dropdown_cache_collector(tmp_path / 'dropdowns.json')
+    dc.get_dropdown_menus()
+    dc.find_dropdown_menus.assert_called_once()
+
+
+def _fake_table_collector(pages, **config):
+    """An EC2DataCollector whose pricing table holds pages of rows."""
+    dc = scrpr.EC2DataCollector('test', scrpr.EC2DataCollectorConfig('1999-12-31', **config), _test_driver=MagicMock())
+    dc.iframe = None
+    dc.operating_system_dropdown = MagicMock()
+    dc.region_dropdown = MagicMock()
+    dc.scroll = MagicMock()
+    dc.table = MagicMock()
+    dc.table.get_total_pages.return_value = len(pages)
+    dc.table.get_current_page_number.return_value = 1
+    dc.table.rows.get_total_row_count.return_value = sum(len(p) for p in pages)
+    dc.table.rows.get_rows_data.side_effect = pages
+    return dc
+
+
+def test_collect_ec2_data_reads_pages_with_a_script():
+    pages = [[['t3.nano', '$0.0052']] * 10, [['t3.micro', '$0.0104']] * 3]
+    dc = _fake_table_collector(pages, row_extraction='js')
+
+    with patch('scrpr.scrpr.time.sleep'), patch.object(scrpr.logger, 'trace', create=True):
+        assert list(dc.collect_ec2_data('Linux', 'us-east-1')) == pages
+    assert dc.task_rows == 13
+    assert dc.table.navto_next_page_and_wait.call_count == 1
+    dc.table.rows.get_rows.assert_not_called()
+
+
+def test_collect_ec2_data_filters_by_vcpu_and_back():
+    dc = _fake_table_collector([[['m5.large', '$0.096']] * 2], row_extraction='js')
+    dc.cpu_dropdown = MagicMock()
+    dc.cpu_default = 'All vCPUs'
+    dc.table.rows.get_total_row_count.side_effect = [40, 2, 40, 40, 40]
+
+    with patch('scrpr.scrpr.time.sleep'), patch.object(scrpr.logger, 'trace', create=True):
+        pages = list(dc.collect_ec2_data('Linux', 'us-east-1', vcpu='2'))
+
+    assert pages == [[['m5.large', '$0.096']] * 2]
+    assert (dc.task_rows, dc.task_expected_rows) == (2, 40)
+    dc.cpu_dropdown.select.assert_called_once_with('2', table=dc.table)
+
+    assert dc.filter_table('Linux', 'us-east-1') == (40, 40)
+    dc.cpu_dropdown.select.assert_called_with('All vCPUs', table=dc.table)
+    assert dc.filter_table('Linux', 'us-east-1') == (40, 40)
+    assert dc.cpu_dropdown.select.call_count == 2
+
+
+def test_filter_table_counts_the_whole_table_after_a_piece():
+    dc = _fake_table_collector([], row_extraction='js')
+    dc.cpu_dropdown = MagicMock()
+    dc.cpu_default = 'All vCPUs'
+    counts = {'All vCPUs': 40, '2': 2, '4': 6}
+    selected = ['All vCPUs']
+    dc.cpu_dropdown.select.side_effect = lambda value, table: selected.append(value) or True
+    dc.table.rows.get_total_row_count.side_effect = lambda: counts[selected[-1]]
+
+    # piece, piece, then the whole table, as one worker would run them
+    assert dc.filter_table('Linux', 'us-east-1', vcpu='2') == (40, 2)
+    assert dc.filter_table('Linux', 'us-east-1', vcpu='4') == (40, 6)
+    assert dc.filter_table('Linux', 'us-east-1') == (40, 40)
+    assert selected == ['All vCPUs', '2', 'All vCPUs', '4', 'All vCPUs']
+    assert not dc.vcpu_filtered
+
+
+def test_filter_table_fails_without_the_vcpu_option():
+    dc = _fake_table_collector([], row_extraction='js')
+    dc.cpu_dropdown = MagicMock()
+    dc.cpu_dropdown.options = ['All vCPUs', '2', '4']
+    dc.cpu_dropdown.select.return_value = False
+    dc.table.rows.get_total_row_count.return_value = 40
+
+    with pytest.raises(scrpr.ScrprException, match="by 96 vCPUs"):
+        dc.filter_table('Linux', 'us-east-1', vcpu='96')
+    assert not dc.vcpu_filtered
+
+
+def test_collect_ec2_data_fails_on_missing_rows():
+    dc = _fake_table_collector([[['t3.nano', '$0.0052']] * 10], row_extraction='js')
+    dc.table.rows.get_total_row_count.return_value = 11
+
+    with patch('scrpr.scrpr.time.sleep'), patch.object(scrpr.logger, 'trace', create=True), pytest.raises(scrpr.ScrprException):
+        list(dc.collect_ec2_data('Linux', 'us-east-1'))
+
+
+def test_collect_ec2_data_reads_the_full_table_at_once():
+    pages = [[['t3.nano', '$0.0052']] * 10, [['t3.micro', '$0.0104']] * 3]
+    dc = _fake_table_collector(pages, full_table=True)
+    dc.table.rows.get_all_rows_data.return_value = pages[0] + pages[1]
+
+    with patch('scrpr.scrpr.time.sleep'), patch.object(scrpr.logger, 'trace', create=True):
+        assert list(dc.collect_ec2_data('Linux', 'us-east-1')) == [pages[0] + pages[1]]
+    assert dc.task_rows == 13
+    dc.table.rows.get_all_rows_data.assert_called_once_with(13)
+    dc.table.navto_next_page_and_wait.assert_not_called()
+
+
+def test_collect_ec2_data_falls_back_to_pages():
+    pages = [[['t3.nano', '$0.0052']] * 10, [['t3.micro', '$0.0104']] * 3]
+    dc = _fake_table_collector(pages, full_table=True, row_extraction='js')
+    dc.table.rows.get_all_rows_data.return_value = None
+
+    with patch('scrpr.scrpr.time.sleep'), patch.object(scrpr.logger, 'trace', create=True):
+        assert list(dc.collect_ec2_data('Linux', 'us-east-1')) == pages
+    assert dc.task_rows == 13
+
+
+@pytest.mark.parametrize('all_rows, ok', [
+    ([['a', '1'], ['b', '2'], ['c', '3']], True),
+    ([['a', '1'], ['b', '2']], False),
+    ([['a', '1'], ['c', '3'], ['c', '3']], False),
+    (None, False),
+    (RuntimeError("javascript error"), False),
+])
+def test_get_all_rows_data_is_checked_against_the_displayed_rows(all_rows, ok):
+    rows = scrpr.Rows.__new__(scrpr.Rows)
+    rows.driver = MagicMock()
+    rows.data_selection_root = MagicMock()
+    # the first page shows two rows
+    rows.driver.execute_script.side_effect = [all_rows, [['b', '2'], ['a', '1']]]
+
+    assert rows.get_all_rows_data(3) == (all_rows if ok else None)
+
+
+def test_wait_until_records_how_long_it_waited():
+    waits = scrpr.WaitMetrics()
+    ready = iter([False, RuntimeError("stale element"), True])
+    with patch.object(scrpr, 'WAITS', waits):
+        assert scrpr.wait_until('thing', lambda: next(ready), timeout=5, poll=0)
+        assert not scrpr.wait_until('thing', lambda: False, timeout=0.05, poll=0.01)
+
+    assert len(waits.samples['thing']) == 2
+    assert waits.timeouts == {'thing': 1}
+    other = scrpr.WaitMetrics()
+    other.merge(waits.drain())
+    assert other.timeouts == {'thing': 1}
+    assert waits.samples == {}
+    assert other.summary()[0].startswith("thing: 2 waits")
+
+
+def _fake_dropdown(options, selected):
+    dropdown = scrpr.EC2Dropdown(MagicMock())
+    listbox = {'open': False}
+    dropdown.button = MagicMock()
+    dropdown.button.click.side_effect = lambda: listbox.update(open=not listbox['open'])
+    dropdown.analytics_element = MagicMock()
+    lis = []
+    for option in options:
+        li = MagicMock()
+        li.text = option
+        li.get_attribute.return_value = 'true' if option == selected else 'false'
+        li.is_displayed.side_effect = lambda: listbox['open']
+        li.click.side_effect = lambda: listbox.update(open=False)
+        lis.append(li)
+    dropdown.analytics_element.find_elements.return_value = lis
+    return dropdown, lis
+
+
+def test_select_waits_for_the_table_to_change():
+    dropdown, lis = _fake_dropdown(['Linux', 'Windows'], selected='Linux')
+    table = MagicMock()
+    table.table_changed.return_value = True
+
+    dropdown.select('Windows', table=table)
+
+    table.watch_table.assert_called_once()
+    lis[1].click.assert_called_once()
+    table.table_changed.assert_called_with(quiet_ms=100)
+
+
+def test_select_skips_the_current_selection():
+    dropdown, lis = _fake_dropdown(['Linux', 'Windows'], selected='Linux')
+    table = MagicMock()
+
+    dropdown.select('Linux', table=table)
+
+    lis[0].click.assert_not_called()
+    table.table_changed.assert_not_called()
+    # opened, then closed again
+    assert dropdown.button.click.call_count == 2
+
+
+def test_select_closes_the_listbox_without_the_option():
+    dropdown, lis = _fake_dropdown(['All vCPUs', '2', '4'], selected='All vCPUs')
+    table = MagicMock()
+
+    assert not dropdown.select('96', table=table)
+
+    assert not any(li.click.called for li in lis)
+    assert not dropdown.listbox_open()
+    table.watch_table.assert_not_called()
+
+
+def test_select_does_nothing_when_the_button_shows_the_selection():
+    dropdown, lis = _fake_dropdown(['Linux', 'Windows'], selected='Linux')
+    dropdown.button.text = 'Linux'
+
+    dropdown.select('Linux', table=MagicMock())
+
+    dropdown.button.click.assert_not_called()
+
+
+@pytest.mark.selenium
+def test_rows_data_matches_cell_text(ec2_data_collector: scrpr.EC2DataCollector):
+    dc = ec2_data_collector
+    dc.driver.switch_to.frame(dc.iframe)
+    by_cell = [[td.text for td in tr.find_elements(scrpr.By.XPATH, './/td')] for tr in dc.table.rows.get_rows()]
+    assert dc.table.rows.get_rows_data() == by_cell
+
+
 @pytest.mark.selenium
 def test_get_driver_on_driverless_datacollector_sets_driver(ec2_driverless_dc):
     ec2_driverless_dc.get_driver()
@@ -131,9 +473,9 @@ def test_ec2_data_collector_is_idempotent(ec2_data_collector: scrpr.EC2DataColle
 @pytest.mark.skip
 @pytest.mark.selenium
 def test_scrape_and_store(ec2_data_collector: scrpr.EC2DataCollector):
-    assert not ec2_data_collector.lock.locked()  # assumed by scrape_and_store function
-    ec2_data_collector.lock.acquire()
-    assert ec2_data_collector.scrape_and_store(_os='Linux', region='ap-southeast-4')
+    assert not ec2_data_collector.lock.locked()
+    with ec2_data_collector.lock:  # held by the ThreadDivvier while a task runs
+        assert ec2_data_collector.scrape_and_store(_os='Linux', region='ap-southeast-4')
     assert not ec2_data_collector.lock.locked()  # ready to accept another job
 
 
@@ -280,3 +622,84 @@ def test_collect_ec2_data_failing(ec2_data_collector_config: scrpr.DataCollector
     for i in instances:
         assert i.region == 'ap-southeast-4'
         assert i.operating_system == 'Linux'
+
+
+def test_store_page_stores_whole_pages():
+    dc = scrpr.EC2DataCollector('test', scrpr.EC2DataCollectorConfig('1999-12-31'), _test_driver=MagicMock())
+    conn = MagicMock()
+    page = [
+        ['t3.micro', '$0.0104', '2', '1 GiB', 'EBS Only', 'Up to 5 Gigabit'],
+        ['t3.nano', 'not a price', '2', '0.5 GiB', 'EBS Only', 'Up to 5 Gigabit'],
+        ['t3.small', '$0.0208', '2', '2 GiB', 'EBS Only', 'Up to 5 Gigabit'],
+    ]
+    rows_stored, rows_already_existed = scrpr.ROWS_STORED, scrpr.ROWS_ALREADY_EXISTED
+
+    with patch.object(scrpr.PGInstance, 'store_many', return_value=(1, 1)) as store_many:
+        assert dc.store_page(conn, 'Linux', 'us-east-1', page) == (1, 1)
+
+    # one call for the page, without the row which can't be stored
+    store_many.assert_called_once()
+    assert [i.instance_type for i in store_many.call_args.args[1]] == ['t3.micro', 't3.small']
+    assert (scrpr.ROWS_STORED, scrpr.ROWS_ALREADY_EXISTED) == (rows_stored + 1, rows_already_existed + 1)
+
+
+def test_scrape_and_store_only_scrapes_without_a_database():
+    dc = scrpr.EC2DataCollector('test', scrpr.EC2DataCollectorConfig('1999-12-31'), _test_driver=MagicMock())
+    assert dc.db_config is None
+    pages = [[['t3.micro', '$0.0104', '2', '1 GiB', 'EBS Only', 'Up to 5 Gigabit']]]
+
+    with patch.object(dc, 'collect_ec2_data', return_value=iter(pages)) as collect, \
+            patch.object(dc, 'store_page') as store_page:
+        assert dc.scrape_and_store('Linux', 'us-east-1')
+
+    collect.assert_called_once()
+    store_page.assert_not_called()
+    with patch.object(scrpr.logger, 'trace', create=True):
+        assert dc.store_postgres([scrpr.PGInstance('1999-12-31', 'us-east-1', 'Linux', *pages[0][0])]) == (0, 0)
+
+
+def test_scrape_and_store_copies_into_staging_table():
+    config = scrpr.EC2DataCollectorConfig('1999-12-31', staging_table=scrpr.staging_table_name('1999-12-31', (2, 3)))
+    dc = scrpr.EC2DataCollector('test', config, _test_driver=MagicMock())
+    conn = MagicMock()
+    dc.get_db = MagicMock()
+    dc.get_db.return_value.__enter__.return_value = conn
+    pages = [
+        [['t3.micro', '$0.0104', '2', '1 GiB', 'EBS Only', 'Up to 5 Gigabit']],
+        [['t3.small', '$0.0208', '2', '2 GiB', 'EBS Only', 'Up to 5 Gigabit']],
+    ]
+
+    with patch.object(dc, 'collect_ec2_data', return_value=iter(pages)), \
+            patch.object(scrpr.PGInstance, 'copy_many', return_value=1) as copy_many, \
+            patch.object(scrpr.PGInstance, 'store_many') as store_many:
+        assert dc.scrape_and_store('Linux', 'us-east-1')
+
+    assert [c.args[2] for c in copy_many.call_args_list] == ['ec2_instance_pricing_staging_1999_12_31_2of3'] * 2
+    store_many.assert_not_called()
+    # once, for the whole table
+    conn.commit.assert_called_once()
+
+
+def test_a_retried_task_counts_its_staged_rows_once():
+    config = scrpr.EC2DataCollectorConfig('1999-12-31', staging_table=scrpr.staging_table_name('1999-12-31'))
+    dc = scrpr.EC2DataCollector('test', config, _test_driver=MagicMock())
+    dc.get_db = MagicMock()
+    pages = [
+        [['t3.micro', '$0.0104', '2', '1 GiB', 'EBS Only', 'Up to 5 Gigabit']],
+        [['t3.small', '$0.0208', '2', '2 GiB', 'EBS Only', 'Up to 5 Gigabit']],
+    ]
+
+    def fails_on_the_second_page(*args, **kwargs):
+        yield pages[0]
+        raise scrpr.ScrprException("the page went away")
+
+    rows_collected = scrpr.ROWS_COLLECTED
+    with patch.object(dc, 'copy_page', return_value=1):
+        with patch.object(dc, 'collect_ec2_data', side_effect=fails_on_the_second_page):
+            with pytest.raises(scrpr.ScrprException):
+                dc.scrape_and_store('Linux', 'us-east-1')
+        # rolled back, not counted
+        assert scrpr.ROWS_COLLECTED == rows_collected
+        with patch.object(dc, 'collect_ec2_data', return_value=iter(pages)):
+            assert dc.scrape_and_store('Linux', 'us-east-1')
+    assert scrpr.ROWS_COLLECTED == rows_collected + 2
@@ -0,0 +1,77 @@
+import os
+import threading
+
+import pytest
+
+from scrpr import scrpr
+from scrpr.payload_server import PayloadServer
+
+
+PAYLOADS_DIR = os.path.join(os.path.dirname(__file__), 'payloads')
+
+
+@pytest.fixture(scope='module')
+def payload_server():
+    server = PayloadServer(('127.0.0.1', 0), PAYLOADS_DIR)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def http_collector(payload_server):
+    config = scrpr.EC2DataCollectorConfig('1999-12-31', pricing_url=payload_server.url)
+    return scrpr.EC2HttpDataCollector('http', config)
+
+
+def test_http_collector_downloads_recorded_payloads(http_collector):
+    assert http_collector.driver.locations() == {'us-east-1': 'US East (N. Virginia)', 'us-west-2': 'US West (Oregon)'}
+
+    pages = list(http_collector.collect_ec2_data('Windows', 'us-west-2'))
+
+    assert pages == [[['t3.micro', 0.0196, 2, 1.0, 'EBS Only', 'Up to 5 Gigabit']]]
+    assert http_collector.task_rows == 1
+    assert http_collector.get_row_count('Linux', 'us-east-1') == 3
+
+
+def test_http_collector_errors(http_collector):
+    with pytest.raises(scrpr.ScrprException, match="returned 404"):
+        list(http_collector.collect_ec2_data('Windows', 'us-east-1'))
+    with pytest.raises(scrpr.ScrprException, match="no pricing location"):
+        list(http_collector.collect_ec2_data('Linux', 'xx-nowhere-1'))
+
+
+def test_http_collectors_share_one_client(payload_server):
+    config = scrpr.EC2DataCollectorConfig('1999-12-31', pricing_url=payload_server.url)
+    a = scrpr.EC2HttpDataCollector(0, config)
+    b = scrpr.EC2HttpDataCollector(1, config)
+    assert a.driver is b.driver
+    a.driver.quit()
+    assert list(b.collect_ec2_data('Windows', 'us-west-2'))
+
+
+class TableCollector:
+    """Rows the way they're read off the page"""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def collect_ec2_data(self, _os, region):
+        yield self.rows
+
+
+def test_compare_collectors(http_collector):
+    scraped = [
+        ['t4g.nano', '$0.0042', '2', '0.5 GiB', 'EBS Only', 'Up to 5 Gigabit'],
+        ['t3.micro', '$0.0104', '2', '1 GiB', 'EBS Only', 'Up to 5 Gigabit'],
+        ['x2iedn.32xlarge', '$26.676', '128', '4,096 GiB', '2 x 1900 NVMe SSD', '100 Gigabit'],
+    ]
+    task = ('Linux', 'us-east-1')
+    assert scrpr.compare_collectors([task], TableCollector(scraped), http_collector) == {}
+
+    scraped[1][1] = '$0.0105'
+    differences = scrpr.compare_collectors([task], TableCollector(scraped[:2]), http_collector)
+    assert differences == {task: [
+        "t3.micro: (0.0105, 2, 1.0, 'EBS Only', 'Up to 5 Gigabit') != (0.0104, 2, 1.0, 'EBS Only', 'Up to 5 Gigabit')",
+        "x2iedn.32xlarge: None != (26.676, 128, 4096.0, '2 x 1900 NVMe SSD', '100 Gigabit')",
+    ]}
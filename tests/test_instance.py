@@ -1,4 +1,6 @@
-from scrpr.instance import PGInstance
+import pytest
+
+from scrpr.instance import CopyStream, PGInstance
 
 
 def test_pginstance_repr():
@@ -36,9 +38,69 @@ def test_pginstance_stores(db):
     curr = db.cursor()
 
     assert instance.store(db, table='ec2_instance_pricing_test')
-    assert not instance.store(db, table='ec2_instance_pricing_test')  # test returns False on psycopg2.errors.UniqueViolation
+    assert not instance.store(db, table='ec2_instance_pricing_test')  # already stored
 
     curr.execute("SELECT * FROM ec2_instance_pricing_test WHERE region = 'test-region-1'")
     r = curr.fetchone()
     assert r is not None
     curr.close()
+
+
+def test_pginstance_store_many(db, instances):
+    # the same row twice in one page is stored once
+    page = instances[:3] + [instances[0]]
+
+    assert PGInstance.store_many(db, page, table='ec2_instance_pricing_test') == (3, 1)
+    assert PGInstance.store_many(db, instances, table='ec2_instance_pricing_test') == (len(instances) - 3, 3)
+    assert PGInstance.store_many(db, [], table='ec2_instance_pricing_test') == (0, 0)
+
+    curr = db.cursor()
+    curr.execute("SELECT count(*) FROM ec2_instance_pricing_test WHERE date = '1999-12-31'")
+    assert curr.fetchone()[0] == len(instances)
+    curr.close()
+
+
+def test_pginstance_store_many_upserts(db, instances):
+    PGInstance.store_many(db, instances[:2], table='ec2_instance_pricing_test')
+    repriced = PGInstance("1999-12-31", "test-region-1", "test os 1", "ts1.type1", "$0.02", 1, "2 GiB", "test storage type 1", "test throughput 1")
+
+    # by default, what's stored stays
+    assert PGInstance.store_many(db, [repriced], table='ec2_instance_pricing_test') == (0, 1)
+    curr = db.cursor()
+    curr.execute("SELECT cost_per_hr FROM ec2_instance_pricing_test WHERE pk = %s", (repriced.pk,))
+    assert curr.fetchone()[0] == pytest.approx(0.010203004)
+
+    assert PGInstance.store_many(db, [repriced, instances[1], instances[2]], table='ec2_instance_pricing_test', on_conflict='upsert') == (1, 2)
+    curr.execute("SELECT cost_per_hr FROM ec2_instance_pricing_test WHERE pk = %s", (repriced.pk,))
+    assert curr.fetchone()[0] == pytest.approx(0.02)
+    curr.close()
+
+
+def test_pginstance_on_conflict_clause():
+    with pytest.raises(ValueError):
+        PGInstance.on_conflict_clause('ec2_instance_pricing', 'overwrite')
+
+
+def test_copy_stream():
+    stream = CopyStream([('a', 1, None), ('tab\there', 0.5, 'back\\slash\nnewline')])
+    assert stream.read(3) == 'a\t1'
+    assert stream.read() == '\t\\N\ntab\\there\t0.5\tback\\\\slash\\nnewline\n'
+    assert stream.read(8192) == ''
+
+
+def test_pginstance_copy_and_merge(db, instances):
+    PGInstance.create_staging_table(db, 'ec2_pricing_staging_test', table='ec2_instance_pricing_test')
+    PGInstance.store_many(db, instances[:2], table='ec2_instance_pricing_test')
+
+    assert PGInstance.copy_many(db, instances, 'ec2_pricing_staging_test') == len(instances)
+    # e.g. a page scraped twice
+    PGInstance.copy_many(db, instances[-1:], 'ec2_pricing_staging_test')
+    db.commit()
+
+    assert PGInstance.merge_staged(db, 'ec2_pricing_staging_test', table='ec2_instance_pricing_test') == (len(instances) - 2, 3)
+    curr = db.cursor()
+    curr.execute("SELECT count(*) FROM ec2_instance_pricing_test WHERE date = '1999-12-31'")
+    assert curr.fetchone()[0] == len(instances)
+    curr.execute("SELECT to_regclass('ec2_pricing_staging_test')")
+    assert curr.fetchone()[0] is None
+    curr.close()
@@ -53,3 +53,15 @@ def test_metric_data_command_line_invalid_input_still_produces_storable_json__lo
     assert len(rows) == 2
     for row in rows:
         assert json.loads(row[10])
+
+
+def test_metric_data_stores_the_shard(db, pg_dbconfig, command_line):
+    md = scrpr.MetricData('1999-12-31')
+    md.command_line = command_line
+    md.shard = "2/3"
+    assert md.store(pg_dbconfig)
+    curr = db.cursor()
+    curr.execute(
+        "SELECT shard FROM metric_data WHERE date = '1999-12-31'"
+    )
+    assert curr.fetchall() == [("2/3",)]
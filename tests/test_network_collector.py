@@ -0,0 +1,122 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from scrpr import scrpr
+
+
+PAYLOADS_DIR = os.path.join(os.path.dirname(__file__), 'payloads')
+
+
+def _load_payload(_os, region):
+    with open(os.path.join(PAYLOADS_DIR, _os, "{}.json".format(region)), 'r') as f:
+        return f.read()
+
+
+def _log_entry(method, **params):
+    return {'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+
+def _payload_log(request_id, url):
+    return [
+        _log_entry('Network.responseReceived', requestId=request_id, response={'url': url}),
+        _log_entry('Network.loadingFinished', requestId=request_id),
+    ]
+
+
+@pytest.fixture(autouse=True)
+def locations():
+    client = MagicMock()
+    client.locations.return_value = {'us-east-1': 'US East (N. Virginia)', 'us-west-2': 'US West (Oregon)'}
+    with patch.object(scrpr.PricingClient, 'shared', return_value=client):
+        yield client
+
+
+def _fake_network_collector(total_row_count, payload_dir=None):
+    config = scrpr.EC2DataCollectorConfig('1999-12-31', payload_dir=payload_dir)
+    dc = scrpr.EC2NetworkDataCollector('test', config, _test_driver=MagicMock())
+    dc.iframe = None
+    dc.operating_system_dropdown = MagicMock()
+    dc.region_dropdown = MagicMock()
+    dc.table = MagicMock()
+    dc.table.rows.get_total_row_count.return_value = total_row_count
+    return dc
+
+
+def test_parse_pricing_payload():
+    rows = scrpr.parse_pricing_payload(json.loads(_load_payload('Linux', 'us-east-1')))
+
+    assert rows[0] == ['t4g.nano', 0.0042, 2, 0.5, 'EBS Only', 'Up to 5 Gigabit']
+    assert rows[2][3] == 4096.0
+    i = scrpr.PGInstance('1999-12-31', 'us-east-1', 'Linux', *rows[1])
+    assert i.prep_data()[4:7] == (0.0104, 2, 1.0)
+
+
+def test_network_collector_reads_the_downloaded_payload(tmp_path):
+    dc = _fake_network_collector(3, payload_dir=str(tmp_path))
+    url = 'https://b0.p.awsstatic.com/pricing/2.0/meteredUnitMaps/ec2/USD/current/ec2-ondemand-without-sec-sel/US%20East%20(N.%20Virginia)/Linux/index.json'
+    # an earlier task's download, then the one for this task
+    dc.driver.get_log.side_effect = [_payload_log('1', url.replace('Linux', 'Windows')), _payload_log('2', url)]
+    dc.driver.execute_cdp_cmd.return_value = {'body': _load_payload('Linux', 'us-east-1')}
+
+    pages = list(dc.collect_ec2_data('Linux', 'us-east-1'))
+
+    assert [len(page) for page in pages] == [3]
+    assert dc.task_rows == 3
+    dc.driver.execute_cdp_cmd.assert_called_once_with('Network.getResponseBody', {'requestId': '2'})
+    dc.table.navto_next_page_and_wait.assert_not_called()
+    with open(tmp_path / 'Linux' / 'us-east-1.json', 'r') as f:
+        assert json.load(f) == json.loads(_load_payload('Linux', 'us-east-1'))
+
+
+def test_network_collector_reads_the_payload_of_the_selected_region():
+    dc = _fake_network_collector(3)
+    url = 'https://b0.p.awsstatic.com/pricing/2.0/meteredUnitMaps/ec2/USD/current/ec2-ondemand-without-sec-sel/{}/Linux/index.json'
+    # selecting Linux downloads it for the last task's region, then selecting us-west-2 for this one's
+    dc.driver.get_log.side_effect = [
+        _payload_log('1', url.format('US%20East%20(N.%20Virginia)')) + _payload_log('2', url.format('US%20West%20(Oregon)'))[:1],
+        [],
+        _payload_log('2', url.format('US%20West%20(Oregon)'))[1:],
+    ]
+    dc.driver.execute_cdp_cmd.return_value = {'body': _load_payload('Linux', 'us-east-1')}
+
+    # this region's isn't done downloading yet, the last region's doesn't count
+    assert dc.latest_payload('Linux', 'us-west-2') is None
+    assert dc.latest_payload('Linux', 'us-west-2') is None
+    assert dc.latest_payload('Linux', 'us-west-2') is not None
+    dc.driver.execute_cdp_cmd.assert_called_once_with('Network.getResponseBody', {'requestId': '2'})
+
+
+def test_network_collector_falls_back_to_the_table():
+    dc = _fake_network_collector(2)
+    dc.driver.get_log.return_value = []
+    dc.table.get_total_pages.return_value = 1
+    dc.table.get_current_page_number.return_value = 1
+    dc.scroll = MagicMock()
+    dc.read_displayed_rows = MagicMock(return_value=[['t3.nano', '$0.0052'], ['t3.micro', '$0.0104']])
+
+    with patch('scrpr.scrpr.wait_until', return_value=False), patch.object(scrpr.logger, 'trace', create=True):
+        pages = list(dc.collect_ec2_data('Linux', 'us-east-1'))
+
+    assert pages == [[['t3.nano', '$0.0052'], ['t3.micro', '$0.0104']]]
+    assert dc.task_rows == 2
+    # nothing in the log at all, don't bother next time
+    assert not dc.read_payloads
+
+
+def test_network_collector_leaves_block_stats_their_share_of_the_log():
+    dc = _fake_network_collector(3)
+    dc.block_stats = scrpr.BlockStats()
+    url = 'https://b0.p.awsstatic.com/pricing/2.0/meteredUnitMaps/ec2/USD/current/ec2-ondemand-without-sec-sel/US%20East%20(N.%20Virginia)/Linux/index.json'
+    dc.driver.get_log.side_effect = [
+        _payload_log('1', url) + [_log_entry('Network.loadingFailed', requestId='2', type='Image', blockedReason='inspector')],
+        [],
+    ]
+    dc.driver.execute_cdp_cmd.return_value = {'body': _load_payload('Linux', 'us-east-1')}
+
+    assert dc.latest_payload('Linux', 'us-east-1') is not None
+    dc.read_block_stats()
+
+    assert (dc.block_stats.requests_blocked, dc.block_stats.requests_loaded) == (1, 1)
@@ -0,0 +1,110 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from scrpr import scrpr, pool
+
+
+EC2DataCollector = scrpr.EC2DataCollector
+
+
+def _fake_collector(_id, config):
+    d = MagicMock(spec=EC2DataCollector)
+    d._id = _id
+    d.driver = MagicMock()
+    d.driver.session_id = "session-{}".format(_id)
+    d.driver.service.service_url = "http://localhost:9"
+    d.driver.execute_script.return_value = 'complete'
+    d.driver.find_elements.return_value = ['iframe']
+    d.get_driver_rss.return_value = 200 * 1024 * 1024
+    return d
+
+
+def _wait_for(condition, timeout=5.0):
+    t_end = time.time() + timeout
+    while not condition():
+        assert time.time() < t_end, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def browser_pool(tmp_path):
+    socket_path = str(tmp_path / 'pool.sock')
+    with patch('scrpr.scrpr.EC2DataCollector', side_effect=_fake_collector):
+        p = pool.BrowserPool(2, scrpr.EC2DataCollectorConfig('1999-12-31'), health_interval=60)
+        p.start()
+        _wait_for(lambda: p.status()['idle'] == 2)
+        server = pool.PoolServer(socket_path, p)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield p, socket_path
+        server.shutdown()
+        server.server_close()
+        p.stop()
+
+
+def test_leased_browser_is_reloaded_and_lent_again_after_release(browser_pool):
+    p, socket_path = browser_pool
+
+    d = scrpr.lease_pooled_driver(socket_path)
+    assert d.session_id in ('session-pool-0', 'session-pool-1')
+    assert d.rss == 200 * 1024 * 1024
+    assert p.status()['leased'] == 1
+    slot = next(s for s in p.slots if s.state == 'leased')
+    reloads = slot.collector.prep_driver.call_count
+
+    d.quit()
+
+    _wait_for(lambda: p.status()['idle'] == 2)
+    assert slot.collector.prep_driver.call_count == reloads + 1
+    slot.collector.driver.quit.assert_not_called()
+
+
+def test_browser_is_taken_back_when_its_run_dies(browser_pool):
+    p, socket_path = browser_pool
+
+    d = scrpr.lease_pooled_driver(socket_path)
+    assert p.status()['leased'] == 1
+    # no release, as if the process had been killed
+    d._f.close()
+    d._conn.close()
+
+    _wait_for(lambda: p.status()['idle'] == 2)
+
+
+def test_no_idle_browsers_falls_back_to_starting_one(browser_pool):
+    p, socket_path = browser_pool
+    leased = [scrpr.lease_pooled_driver(socket_path) for _ in range(2)]
+
+    assert scrpr.lease_pooled_driver(socket_path) is None
+    with patch.object(scrpr.DataCollector, 'get_driver') as get_driver:
+        scrpr.DataCollector(0, scrpr.DataCollectorConfig('1999-12-31', pool_socket=socket_path))
+    get_driver.assert_called_once()
+
+    for d in leased:
+        d.quit()
+
+
+def test_unhealthy_browser_is_replaced(browser_pool):
+    p, socket_path = browser_pool
+    sick = p.slots[0].collector
+    sick.driver.execute_script.side_effect = RuntimeError("chrome not reachable")
+    p.slots[0].t_loaded = time.time()
+
+    with patch('scrpr.scrpr.EC2DataCollector', side_effect=_fake_collector):
+        p.check_idle()
+
+    sick.driver.quit.assert_called_once()
+    assert p.slots[0].collector is not sick
+    assert p.status()['idle'] == 2
+
+
+def test_data_collector_uses_pooled_browser(browser_pool):
+    p, socket_path = browser_pool
+
+    with patch.object(scrpr.DataCollector, 'get_driver') as get_driver:
+        d = scrpr.DataCollector(0, scrpr.DataCollectorConfig('1999-12-31', pool_socket=socket_path))
+    get_driver.assert_not_called()
+    assert isinstance(d.driver, scrpr.LeasedDriver)
+    d.driver.quit()
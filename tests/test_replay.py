@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import urllib.request
+from unittest.mock import MagicMock
+
+import pytest
+from psycopg2.errors import UniqueViolation
+
+from scrpr import scrpr
+from scrpr.bench import Phases, format_report, run_bench, store_rows
+from scrpr.instance import PGInstance
+from scrpr.replay import ReplayServer, synthesize_payloads
+
+
+PAYLOADS_DIR = os.path.join(os.path.dirname(__file__), 'payloads')
+
+
+@pytest.fixture(scope='module')
+def replay_server():
+    server = ReplayServer(('127.0.0.1', 0), PAYLOADS_DIR, page_size=2, latency_ms=50)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(url):
+    with urllib.request.urlopen(url) as r:
+        return r.read().decode()
+
+
+def test_replay_server_serves_the_page(replay_server):
+    assert 'id="iFrameResizer0"' in _get(replay_server.page_url)
+    iframe = _get(replay_server.page_url + 'table.html')
+    assert 'data-selection-root' in iframe
+    config = replay_server.replay_config()
+    assert json.dumps(config) in iframe
+    assert config['regions'] == [['US East (N. Virginia)', 'us-east-1'], ['US West (Oregon)', 'us-west-2']]
+    assert (config['oses'], config['os'], config['region']) == (['Linux', 'Windows'], 'Linux', 'us-east-1')
+    assert config['vcpus'] == ['2', '128']
+    # the payloads the page downloads are there too
+    payload = json.loads(_get(replay_server.url + scrpr.PRICING_PAYLOAD_PATH.format(location='US%20West%20(Oregon)', os='Windows')))
+    assert scrpr.parse_pricing_payload(payload) == replay_server.rows('Windows', 'us-west-2')
+    assert sorted(replay_server.tasks()) == [('Linux', 'us-east-1'), ('Windows', 'us-west-2')]
+
+
+def test_synthesize_payloads(tmp_path):
+    synthesize_payloads(tmp_path, ['Linux', 'Windows'], ['us-east-1'], 25)
+    server = ReplayServer(('127.0.0.1', 0), tmp_path)
+    server.server_close()
+
+    assert sorted(server.tasks()) == [('Linux', 'us-east-1'), ('Windows', 'us-east-1')]
+    rows = server.rows('Linux', 'us-east-1')
+    assert len(rows) == 25
+    assert len({row[0] for row in rows}) == 25
+    assert rows[3] == ['r0.8xlarge', 0.1, 8, 32.0, 'EBS Only', 'Up to 10 Gigabit']
+
+
+class FakeDriver:
+    def __init__(self):
+        self.sent = []
+
+    def execute(self, driver_command, params=None):
+        self.sent.append(driver_command)
+        return {'value': None}
+
+
+def test_phases_count_commands():
+    phases = Phases()
+    driver = FakeDriver()
+    phases.watch(driver)
+
+    driver.execute('getTitle')
+    with phases.phase('filter'):
+        driver.execute('clickElement')
+        with phases.phase('read_rows'):
+            driver.execute('executeScript')
+            driver.execute('executeScript')
+    phases.timed('read_rows', driver.execute)('executeScript')
+
+    assert driver.sent == ['getTitle', 'clickElement', 'executeScript', 'executeScript', 'executeScript']
+    assert phases.commands == {'other': 1, 'filter': 1, 'read_rows': 3}
+    assert phases.total_commands() == 5
+    assert {name: len(samples) for name, samples in phases.samples.items()} == {'filter': 1, 'read_rows': 2}
+
+
+def test_format_report():
+    report = {
+        'collector': 'EC2DataCollector', 'row_extraction': 'js', 'tasks': 2, 'rows': 100, 'mismatched_tasks': [['Linux', 'us-east-1']],
+        'startup_seconds': 3.0, 'scrape_seconds': 4.0, 'rows_per_second': 25.0, 'commands': 250, 'commands_per_row': 2.5,
+        'phases': {'read_rows': {'runs': 2, 'seconds': 0.5, 'mean_ms': 250.0, 'max_ms': 300.0, 'commands': 20}},
+        'other_commands': 30,
+    }
+    lines = format_report(report)
+    assert lines[0] == "EC2DataCollector (js rows): 100 rows of 2 tables in 4.00s (+3.00s startup)"
+    assert lines[1] == "25.0 rows/s, 250 WebDriver commands, 2.50 per row"
+    assert lines[2].split() == ['read_rows', '2', 'runs', '0.50s', 'total', '250.0ms', 'mean', '300.0ms', 'max', '20', 'commands']
+    assert lines[-1] == "tables which didn't match their payload: [['Linux', 'us-east-1']]"
+
+
+@pytest.mark.selenium
+@pytest.mark.parametrize('row_extraction', ['cells', 'js'])
+def test_bench_scrapes_replayed_tables(replay_server, row_extraction):
+    config = scrpr.EC2DataCollectorConfig('1999-12-31', url=replay_server.page_url, row_extraction=row_extraction, dropdown_cache=None)
+
+    report = run_bench(replay_server, config)
+
+    assert report['rows'] == 4
+    assert report['mismatched_tasks'] == []
+    # Linux/us-east-1 has 3 rows, on 2 pages
+    assert report['phases']['next_page']['runs'] == 1
+    assert report['commands_per_row'] > 0
+
+
+def test_store_bench_baseline_inserts_a_row_at_a_time():
+    conn = MagicMock()
+    curr = conn.cursor.return_value
+    curr.execute.side_effect = [None, UniqueViolation()]
+    page = [
+        PGInstance('1999-12-31', 'us-east-1', 'Linux', 't3.micro', '$0.0104', '2', '1 GiB', 'EBS Only', 'Up to 5 Gigabit'),
+        PGInstance('1999-12-31', 'us-east-1', 'Linux', 't3.micro', '$0.0104', '2', '1 GiB', 'EBS Only', 'Up to 5 Gigabit'),
+    ]
+
+    assert store_rows(conn, page, 'ec2_instance_pricing_bench') == (1, 1)
+    # a plain INSERT each, the second one already there
+    assert curr.execute.call_count == 2
+    assert "ON CONFLICT" not in repr(curr.execute.call_args.args[0])
+    conn.commit.assert_called_once()
+    conn.rollback.assert_called_once()
@@ -0,0 +1,50 @@
+from scrpr import scrpr
+
+
+def test_ledger_round_trip(tmp_path):
+    ledger = scrpr.RunLedger('1999-12-31', ledger_dir=tmp_path)
+    assert not ledger.load()
+    assert ledger.record('Linux', 'us-east-1', rows=586, expected_rows=586)
+
+    ledger = scrpr.RunLedger('1999-12-31', ledger_dir=tmp_path)
+    assert ledger.load()
+    assert ledger.is_complete('Linux', 'us-east-1')
+    assert not scrpr.RunLedger('2000-01-01', ledger_dir=tmp_path).load()
+
+
+def test_ledger_remaining_skips_only_complete_tasks(tmp_path):
+    ledger = scrpr.RunLedger('1999-12-31', ledger_dir=tmp_path)
+    ledger.record('Linux', 'us-east-1', rows=586, expected_rows=586)
+    ledger.record('Linux', 'us-west-2', rows=100, expected_rows=None)
+    ledger.record('Windows', 'us-east-1', rows=300, expected_rows=412)
+    ledger.record('Windows', 'us-west-2', rows=0, expected_rows=None)
+    tasks = [(o, r) for o in ('Linux', 'Windows') for r in ('us-east-1', 'us-west-2', 'eu-west-1')]
+
+    assert ledger.remaining(tasks) == [
+        ('Linux', 'eu-west-1'),
+        ('Windows', 'us-east-1'),
+        ('Windows', 'us-west-2'),
+        ('Windows', 'eu-west-1'),
+    ]
+
+
+def test_ledger_round_trip_in_the_database(pg_dbconfig):
+    date = '1999-12-30'
+    # a database that has never seen a --resume
+    with scrpr.DBPool.shared(pg_dbconfig).connection() as conn:
+        curr = conn.cursor()
+        curr.execute("DROP TABLE IF EXISTS run_ledger")
+        conn.commit()
+    try:
+        ledger = scrpr.RunLedger(date, db_config=pg_dbconfig)
+        assert ledger.record('Linux', 'us-east-1', rows=586, expected_rows=586)
+        assert ledger.record('Linux', 'us-east-1', rows=590, expected_rows=590)
+
+        ledger = scrpr.RunLedger(date, db_config=pg_dbconfig)
+        assert ledger.load()
+        assert ledger.entries == {scrpr.TaskStats.key('Linux', 'us-east-1'): {'rows': 590, 'expected_rows': 590}}
+    finally:
+        with scrpr.DBPool.shared(pg_dbconfig).connection() as conn:
+            curr = conn.cursor()
+            curr.execute("DROP TABLE IF EXISTS run_ledger")
+            conn.commit()
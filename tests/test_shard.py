@@ -0,0 +1,87 @@
+import argparse
+from unittest.mock import MagicMock, patch
+
+import pytest
+from psycopg2.errors import UndefinedTable
+
+from scrpr import scrpr
+
+
+OSES = ['Linux', 'Windows', 'RHEL', 'SUSE']
+REGIONS = ['us-east-1', 'us-east-2', 'us-west-1', 'us-west-2', 'eu-west-1', 'eu-central-1', 'ap-south-1']
+MATRIX = [(o, r) for o in OSES for r in REGIONS]
+
+
+def _reports(shard_count, matrix=MATRIX):
+    fingerprint = scrpr.matrix_fingerprint(matrix)
+    return [
+        scrpr.ShardReport('1999-12-31', k, shard_count, fingerprint, scrpr.shard_tasks(matrix, k, shard_count), [])
+        for k in range(1, shard_count + 1)
+    ]
+
+
+def test_shard_arg():
+    assert scrpr.shard_arg('2/3') == (2, 3)
+    for bad in ('0/3', '4/3', '3', 'a/b'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            scrpr.shard_arg(bad)
+
+
+def test_shards_split_the_matrix_evenly_and_stably():
+    shards = [scrpr.shard_tasks(MATRIX, k, 3) for k in (1, 2, 3)]
+
+    assert sorted(t for shard in shards for t in shard) == sorted(MATRIX)
+    assert {len(shard) for shard in shards} == {9, 10}
+    # another host may have found the tasks in another order
+    assert scrpr.shard_tasks(list(reversed(MATRIX)), 2, 3) == shards[1]
+
+
+def test_verify_shards_accepts_complete_coverage():
+    assert scrpr.verify_shards(_reports(3)) == []
+
+
+def test_verify_shards_problems():
+    reports = _reports(3)
+    assert scrpr.verify_shards(reports[:2]) == ["missing shards: 3/3"]
+
+    reports[0].failed = [reports[0].tasks[0]]
+    assert scrpr.verify_shards(reports) == ["{} failed in shard 1/3".format(reports[0].tasks[0])]
+
+    mixed = _reports(3)[:2] + _reports(2)[1:]
+    assert "different shard counts" in scrpr.verify_shards(mixed)[0]
+
+    # one host saw a region the others didn't
+    other = _reports(3, MATRIX + [('Linux', 'sa-east-1')])
+    assert "different task matrices" in scrpr.verify_shards(_reports(3)[:2] + other[2:])[0]
+
+    doubled = _reports(3)
+    doubled[1].tasks.append(doubled[0].tasks[0])
+    problems = scrpr.verify_shards(doubled)
+    assert "{} was collected by 2 shards".format(doubled[0].tasks[0]) in problems
+    assert "shards' tasks don't add up to the task matrix" not in problems
+
+    short = _reports(3)
+    short[2].tasks.pop()
+    assert scrpr.verify_shards(short) == ["shards' tasks don't add up to the task matrix"]
+
+
+def test_shard_reports_round_trip(tmp_path):
+    for r in _reports(2):
+        r.save(tmp_path)
+    scrpr.ShardReport('1999-12-30', 1, 1, 'x', [], []).save(tmp_path)
+
+    loaded = scrpr.ShardReport.load_all('1999-12-31', tmp_path)
+
+    assert loaded == _reports(2)
+
+
+def test_no_shard_reports_in_a_database_without_any():
+    curr = MagicMock()
+    curr.execute.side_effect = UndefinedTable('relation "shard_runs" does not exist')
+    pool = MagicMock()
+    pool.connection.return_value.__enter__.return_value.cursor.return_value = curr
+    with patch.object(scrpr.DBPool, 'shared', return_value=pool):
+        reports = scrpr.ShardReport.load_all_from_db('1999-12-31', scrpr.DatabaseConfig())
+
+    assert reports == []
+    assert scrpr.verify_shards(reports) == ["no shard reports"]
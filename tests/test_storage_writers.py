@@ -0,0 +1,147 @@
+import argparse
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from scrpr import scrpr
+
+
+@pytest.fixture
+def conn():
+    conn = MagicMock()
+    pool = MagicMock()
+    pool.size = 64
+    pool.connection.return_value.__enter__.return_value = conn
+    with patch.object(scrpr.DBPool, 'shared', return_value=pool):
+        yield conn
+
+
+@pytest.fixture
+def waits():
+    with patch.object(scrpr, 'WAITS', scrpr.WaitMetrics()) as waits:
+        yield waits
+
+
+def test_storage_writers_store_on_their_own_threads(conn, waits):
+    writers = scrpr.StorageWriters(scrpr.DatabaseConfig(), count=2)
+    stored_on = []
+
+    def store(conn, page):
+        stored_on.append(threading.current_thread().name)
+        return len(page)
+
+    futures = [writers.submit(store, ['row'] * n) for n in range(1, 4)]
+
+    assert [f.result(2) for f in futures] == [1, 2, 3]
+    assert set(stored_on) <= {'writer-0', 'writer-1'}
+    assert conn.commit.call_count == 3
+    writers.close()
+    assert len(waits.samples['storage_write']) == 3
+
+
+def test_storage_writers_hand_back_errors(conn, waits):
+    writers = scrpr.StorageWriters(scrpr.DatabaseConfig(), count=1)
+
+    def store(conn):
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError, match="disk full"):
+        writers.submit(store).result(2)
+    # and carry on
+    assert writers.submit(lambda conn: 'ok').result(2) == 'ok'
+    writers.close()
+
+
+def test_storage_writers_push_back_when_behind(conn, waits):
+    writers = scrpr.StorageWriters(scrpr.DatabaseConfig(), count=1, depth=1)
+    release = threading.Event()
+    writers.submit(lambda conn: release.wait(2))
+    # one page being stored, and one waiting
+    time.sleep(0.1)
+    writers.submit(lambda conn: None)
+
+    submitted = threading.Event()
+    t = threading.Thread(target=lambda: (writers.submit(lambda conn: None), submitted.set()))
+    t.start()
+    assert not submitted.wait(0.2)
+    release.set()
+    assert submitted.wait(2)
+    t.join()
+    writers.close()
+
+    assert max(waits.samples['storage_queue']) >= 0.2
+    assert writers.summary()[0].startswith("1 storage writers: queue of 1 pages")
+    assert max(writers.depths) == 1
+
+
+def test_scrape_and_store_submits_pages_to_writers(conn, waits):
+    config = scrpr.EC2DataCollectorConfig('1999-12-31', storage_writers=2)
+    dc = scrpr.EC2DataCollector('test', config, _test_driver=MagicMock())
+    dc.get_db = MagicMock()
+    pages = [
+        [['t3.micro', '$0.0104', '2', '1 GiB', 'EBS Only', 'Up to 5 Gigabit']],
+        [['t3.small', '$0.0208', '2', '2 GiB', 'EBS Only', 'Up to 5 Gigabit']],
+    ]
+
+    try:
+        with patch.object(dc, 'collect_ec2_data', return_value=iter(pages)), \
+                patch.object(dc, 'store_page', return_value=(1, 0)) as store_page:
+            assert dc.scrape_and_store('Linux', 'us-east-1')
+        assert [c.args for c in store_page.call_args_list] == [(conn, 'Linux', 'us-east-1', page) for page in pages]
+        # the worker didn't need a connection of its own
+        dc.get_db.assert_not_called()
+
+        # a page that can't be stored fails the task
+        with patch.object(dc, 'collect_ec2_data', return_value=iter(pages)), \
+                patch.object(dc, 'store_page', side_effect=[(1, 0), RuntimeError("connection reset")]):
+            with pytest.raises(scrpr.ScrprException, match="connection reset"):
+                dc.scrape_and_store('Linux', 'us-east-1')
+    finally:
+        scrpr.StorageWriters.close_shared()
+
+
+def test_storage_writers_stage_a_task_in_one_transaction(conn, waits):
+    config = scrpr.EC2DataCollectorConfig('1999-12-31', storage_writers=2, staging_table=scrpr.staging_table_name('1999-12-31'))
+    dc = scrpr.EC2DataCollector('test', config, _test_driver=MagicMock())
+    pages = [
+        [['t3.micro', '$0.0104', '2', '1 GiB', 'EBS Only', 'Up to 5 Gigabit']],
+        [['t3.small', '$0.0208', '2', '2 GiB', 'EBS Only', 'Up to 5 Gigabit']],
+    ]
+    rows_collected = scrpr.ROWS_COLLECTED
+
+    try:
+        with patch.object(dc, 'collect_ec2_data', return_value=iter(pages)), \
+                patch.object(scrpr.PGInstance, 'copy_many', return_value=1) as copy_many:
+            assert dc.scrape_and_store('Linux', 'us-east-1')
+    finally:
+        scrpr.StorageWriters.close_shared()
+
+    assert copy_many.call_count == 2
+    # both pages, then one commit
+    conn.commit.assert_called_once()
+    assert len(waits.samples['storage_write']) == 1
+    assert scrpr.ROWS_COLLECTED == rows_collected + 2
+
+
+def test_storage_writers_make_room_in_the_db_pool():
+    pool = scrpr.DBPool('dbname=test')
+    with patch.object(scrpr.DBPool, 'shared', return_value=pool):
+        writers = scrpr.StorageWriters(scrpr.DatabaseConfig(), count=3)
+        writers.close()
+        assert pool.size == 4
+
+        scrpr.size_db_pool(scrpr.DatabaseConfig(), 8, storage_writers=2)
+        assert pool.size == 11
+        # a smaller pool of writers doesn't shrink it
+        scrpr.StorageWriters(scrpr.DatabaseConfig(), count=1).close()
+        assert pool.size == 11
+
+
+def test_storage_writers_arg():
+    assert scrpr.storage_writers_arg('0') == 0
+    assert scrpr.storage_writers_arg('4') == 4
+    for bad in ('-1', 'many'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            scrpr.storage_writers_arg(bad)
@@ -0,0 +1,49 @@
+import random
+
+from scrpr import scrpr
+
+
+def test_task_stats_round_trip(tmp_path):
+    stats_file = tmp_path / "task-stats.json"
+    ts = scrpr.TaskStats(stats_file)
+    assert not ts.load()
+    ts.record('Linux', 'us-east-1', rows=586, t_run=90)
+    assert ts.save()
+
+    ts2 = scrpr.TaskStats(stats_file)
+    assert ts2.load()
+    assert ts2.expected_cost('Linux', 'us-east-1') == 90
+    # smoothed, not replaced
+    ts2.record('Linux', 'us-east-1', rows=590, t_run=110)
+    assert ts2.expected_cost('Linux', 'us-east-1') == 100
+
+
+def test_task_stats_falls_back_to_region_rows_then_probed_rows(tmp_path):
+    ts = scrpr.TaskStats(tmp_path / "task-stats.json")
+    ts.record('Linux', 'us-east-1', rows=500, t_run=50)
+    # same region, other os: rows * seconds per row
+    assert ts.expected_cost('Windows', 'us-east-1') == 50
+    assert ts.expected_cost('Windows', 'af-south-1') is None
+    assert ts.expected_cost('Windows', 'af-south-1', row_counts={'af-south-1': 100}) == 10
+    assert ts.unknown_regions(['us-east-1', 'af-south-1']) == ['af-south-1']
+
+
+def test_task_stats_orders_longest_first_and_unknown_before_known(tmp_path):
+    ts = scrpr.TaskStats(tmp_path / "task-stats.json")
+    ts.record('Linux', 'small', rows=10, t_run=1)
+    ts.record('Linux', 'big', rows=600, t_run=60)
+    ts.record('Linux', 'medium', rows=100, t_run=10)
+    tasks = [('Linux', 'small'), ('Linux', 'medium'), ('Linux', 'never-seen'), ('Linux', 'big')]
+    assert ts.order(tasks) == [('Linux', 'never-seen'), ('Linux', 'big'), ('Linux', 'medium'), ('Linux', 'small')]
+
+
+def test_longest_first_makespan_is_close_to_ideal():
+    rng = random.Random(1)
+    # a few huge tables among many small ones, like us-east-1 among the rest
+    costs = [rng.uniform(5, 30) for _ in range(600)] + [300, 280, 250]
+    workers = 24
+    ideal = sum(costs) / workers
+    longest_first = scrpr.lpt_makespan(sorted(costs, reverse=True), workers)
+    largest_last = scrpr.lpt_makespan(sorted(costs), workers)
+    assert longest_first < ideal * 1.05
+    assert longest_first < largest_last
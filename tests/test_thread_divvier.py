@@ -42,3 +42,342 @@ def test_patience(data_collector_config: scrpr.DataCollectorConfig):
     # mock_thread_divvier.init_scraper.assert_called()
     # mock_thread_divvier.init_scrapers.assert_not_called()
     # mock_thread_divvier.init_scrapers.assert_called()
+
+
+def _mock_collector(_id, side_effect=None):
+    d = MagicMock(spec=scrpr.EC2DataCollector)
+    d._id = _id
+    d.lock = scrpr.threading.Lock()
+    d.driver = MagicMock(spec=webdriver.Chrome)
+    d.scrape_and_store.side_effect = side_effect
+    d.scrape_and_store.return_value = True
+    d.task_rows = 0
+    d.task_expected_rows = None
+    d.after_task.return_value = d
+    d.recycle.return_value = d
+    return d
+
+
+def test_run_threads_drains_queue_and_quits_drivers():
+    tasks = [(o, r) for o in ('Linux', 'Windows') for r in ('us-east-1', 'us-west-2', 'eu-west-1')]
+    td = scrpr.ThreadDivvier(thread_count=2)
+    td.drivers = [_mock_collector(0), _mock_collector(1)]
+
+    results = td.run_threads(tasks)
+
+    assert sorted(r.task for r in results) == sorted(tasks)
+    assert all(r.ok for r in results)
+    for d in td.drivers:
+        assert not d.lock.locked()
+        d.driver.quit.assert_called_once()
+    assert sum(d.scrape_and_store.call_count for d in td.drivers) == len(tasks)
+
+
+def test_run_threads_releases_lock_when_worker_raises():
+    td = scrpr.ThreadDivvier(thread_count=1, max_attempts=1)
+    td.drivers = [_mock_collector(0, side_effect=RuntimeError("boom"))]
+
+    results = td.run_threads([('Linux', 'us-east-1'), ('Linux', 'us-west-2')])
+
+    assert len(results) == 2
+    assert not any(r.ok for r in results)
+    assert results[0].error == "boom"
+    assert not td.drivers[0].lock.locked()
+
+
+def test_adopted_collector_works_alongside_background_init():
+    td = scrpr.ThreadDivvier(thread_count=3)
+    started = [_mock_collector(1), _mock_collector(2)]
+    bootstrap = _mock_collector(0)
+    with patch('scrpr.scrpr.EC2DataCollector', side_effect=started) as ec2:
+        td.init_scrapers_of(scrpr.DataCollectorConfig('1999-12-31'), count=2, first_id=1, wait=False)
+        td.add_scraper(bootstrap)
+        td.wait_for_scrapers()
+    assert sorted(c.kwargs['_id'] for c in ec2.call_args_list) == [1, 2]
+    assert td.thread_count == 3
+
+    results = td.run_threads([('Linux', r) for r in ('us-east-1', 'us-west-2', 'eu-west-1', 'eu-west-2')])
+
+    assert all(r.ok for r in results)
+    for d in [bootstrap] + started:
+        d.driver.quit.assert_called_once()
+
+
+def test_shutdown_quits_scrapers_without_running_tasks():
+    td = scrpr.ThreadDivvier(thread_count=2)
+    td.add_scraper(_mock_collector(0))
+    td.add_scraper(_mock_collector(1))
+
+    td.shutdown()
+
+    for d in td.drivers:
+        d.scrape_and_store.assert_not_called()
+        d.driver.quit.assert_called_once()
+
+
+def test_auto_thread_count():
+    mb = 1024 * 1024
+    # 300 MB per browser * 1.5 headroom, 4 GB available, 512 MB floor
+    assert scrpr.auto_thread_count(300 * mb, 4096 * mb, 512 * mb) == 7
+    assert scrpr.auto_thread_count(300 * mb, 4096 * mb, 512 * mb, max_threads=4) == 4
+    assert scrpr.auto_thread_count(300 * mb, 256 * mb, 512 * mb) == 1
+    assert scrpr.auto_thread_count(0, 4096 * mb, 512 * mb) == 1
+
+
+def test_thread_count_arg():
+    assert scrpr.do_args(['-t', 'auto']).thread_count == 'auto'
+    assert scrpr.do_args(['-t', '3']).thread_count == 3
+    with pytest.raises(SystemExit):
+        scrpr.do_args(['-t', 'lots'])
+
+
+def test_get_thread_count():
+    assert scrpr.get_thread_count(scrpr.do_args(['-t', 'auto'])) is None
+    assert scrpr.get_thread_count(scrpr.do_args(['-t', '1'])) == 1
+    assert scrpr.get_thread_count(scrpr.do_args(['-t', '0'])) == 1
+
+
+def test_workers_shed_under_memory_floor_until_one_is_left():
+    tasks = [('Linux', r) for r in ('us-east-1', 'us-west-2', 'eu-west-1', 'sa-east-1')]
+    td = scrpr.ThreadDivvier(thread_count=3, memory_floor=1)
+    td.drivers = [_mock_collector(0), _mock_collector(1), _mock_collector(2)]
+    low_memory = MagicMock(available=0)
+
+    with patch('scrpr.scrpr.psutil.virtual_memory', return_value=low_memory):
+        results = td.run_threads(tasks)
+
+    assert sorted(r.task for r in results) == sorted(tasks)
+    # everything ran on the one worker that was left
+    assert sorted(d.scrape_and_store.call_count for d in td.drivers) == [0, 0, len(tasks)]
+    for d in td.drivers:
+        d.driver.quit.assert_called_once()
+
+
+def test_recycled_drivers_replace_their_predecessor():
+    td = scrpr.ThreadDivvier(thread_count=1)
+    old = _mock_collector(0)
+    new = _mock_collector(0)
+    old.after_task.return_value = new
+    td.drivers = [old]
+
+    results = td.run_threads([('Linux', 'us-east-1'), ('Linux', 'us-west-2')])
+
+    assert len(results) == 2
+    assert td.drivers == [new]
+    assert old.scrape_and_store.call_count == 1
+    assert new.scrape_and_store.call_count == 1
+    new.driver.quit.assert_called_once()
+
+
+class WarmingCollector(scrpr.DataCollector):
+    started = []
+
+    def get_driver(self, **kwargs):
+        self.driver = MagicMock()
+        self.started.append(self)
+
+    def scrape_and_store(self, _os, region, vcpu=None):
+        return True
+
+
+def test_warmed_replacement_is_quit_when_the_run_ends():
+    config = scrpr.DataCollectorConfig('1999-12-31', recycle_after_tasks=2)
+    WarmingCollector.started = []
+    d = WarmingCollector(0, config)
+    td = scrpr.ThreadDivvier(thread_count=1)
+    td.drivers = [d]
+
+    # one task short of recycling, so a replacement is warming when the queue runs out
+    results = td.run_threads([('Linux', 'us-east-1')])
+
+    assert [r.ok for r in results] == [True]
+    assert td.drivers == [d]
+    assert d._replacement_thread is None
+    d.driver.quit.assert_called_once()
+    replacement = WarmingCollector.started[1]
+    replacement.driver.quit.assert_called_once()
+    assert not [t for t in scrpr.threading.enumerate() if t.name == '0-replacement']
+
+
+def test_failed_tasks_are_retried_on_a_restarted_driver():
+    td = scrpr.ThreadDivvier(thread_count=1, max_attempts=3, retry_backoff=0.01)
+    d = _mock_collector(0, side_effect=[scrpr.ScrprCritical("flaky"), True])
+    td.drivers = [d]
+
+    results = td.run_threads([('Linux', 'us-east-1')])
+
+    assert len(results) == 1
+    assert results[0].ok
+    assert results[0].attempt == 2
+    d.recycle.assert_called_once()
+    assert td.failed() == []
+
+
+def test_tasks_failing_every_attempt_are_reported():
+    td = scrpr.ThreadDivvier(thread_count=2, max_attempts=2, retry_backoff=0)
+    td.drivers = [_mock_collector(0, side_effect=RuntimeError("nope")), _mock_collector(1, side_effect=RuntimeError("nope"))]
+
+    results = td.run_threads([('Linux', 'us-east-1'), ('Windows', 'us-east-1')])
+
+    assert len(results) == 2
+    assert sorted(r.task for r in td.failed()) == [('Linux', 'us-east-1'), ('Windows', 'us-east-1')]
+    assert all(r.attempt == 2 for r in td.failed())
+    assert sum(d.scrape_and_store.call_count for d in td.drivers) == 4
+
+
+def test_successful_tasks_are_written_to_the_ledger(tmp_path):
+    def fail_in_eu(_os, region):
+        if region.startswith('eu-'):
+            raise RuntimeError("boom")
+        return True
+    d = _mock_collector(0, side_effect=fail_in_eu)
+    d.task_rows = 12
+    ledger = scrpr.RunLedger('1999-12-31', ledger_dir=tmp_path)
+    td = scrpr.ThreadDivvier(thread_count=1, max_attempts=1, ledger=ledger)
+    td.drivers = [d]
+
+    td.run_threads([('Linux', 'us-east-1'), ('Linux', 'eu-west-1')])
+
+    ledger = scrpr.RunLedger('1999-12-31', ledger_dir=tmp_path)
+    ledger.load()
+    assert ledger.entries == {'Linux|us-east-1': {'rows': 12, 'expected_rows': None}}
+
+
+def test_affinity_queue_prefers_the_same_operating_system_then_region():
+    q = scrpr.AffinityQueue(window=3)
+    for task in [('Windows', 'eu-west-1'), ('RHEL', 'us-east-1'), ('Linux', 'eu-west-1'), ('Linux', 'us-east-1')]:
+        q.put(task)
+
+    # ('Linux', 'us-east-1') is past the window
+    assert q.get_like(('Linux', 'us-west-2')) == ('Linux', 'eu-west-1')
+    assert q.get_like(('SUSE', 'us-east-1')) == ('RHEL', 'us-east-1')
+    assert q.get_like(None) == ('Windows', 'eu-west-1')
+    assert q.get_like(('SUSE', 'sa-east-1')) == ('Linux', 'us-east-1')
+
+
+def test_workers_keep_to_their_operating_system():
+    tasks = [(o, r) for r in ('us-east-1', 'us-west-2', 'eu-west-1') for o in ('Linux', 'Windows')]
+    td = scrpr.ThreadDivvier(thread_count=1, affinity_window=len(tasks))
+    d = _mock_collector(0)
+    td.drivers = [d]
+
+    td.run_threads(tasks)
+
+    oses = [c.args[0] for c in d.scrape_and_store.call_args_list]
+    assert oses == ['Linux'] * 3 + ['Windows'] * 3
+
+
+def test_split_tasks():
+    rows = {('Linux', 'us-east-1'): 700, ('Windows', 'us-east-1'): 300}
+    tasks = [('Linux', 'us-east-1'), ('Windows', 'us-east-1'), ('Linux', 'sa-east-1')]
+
+    split = scrpr.split_tasks(tasks, ['1', '2'], 500, lambda o, r: rows.get((o, r)))
+
+    assert split == [('Linux', 'us-east-1', '1'), ('Linux', 'us-east-1', '2'), ('Windows', 'us-east-1'), ('Linux', 'sa-east-1')]
+
+
+def _piece_collector(_id, table):
+    """Scrapes table[vcpu] rows of a table of sum(table.values()) rows"""
+    d = _mock_collector(_id)
+
+    def scrape(_os, region, vcpu=None):
+        d.task_rows = sum(table.values()) if vcpu is None else table[vcpu]
+        d.task_expected_rows = sum(table.values())
+        return True
+    d.scrape_and_store.side_effect = scrape
+    return d
+
+
+def test_split_task_pieces_are_reported_as_one_task(tmp_path):
+    table = {'1': 10, '2': 25, '4': 5}
+    ledger = scrpr.RunLedger('1999-12-31', ledger_dir=tmp_path)
+    td = scrpr.ThreadDivvier(thread_count=2, ledger=ledger)
+    td.drivers = [_piece_collector(0, table), _piece_collector(1, table)]
+
+    results = td.run_threads([('Linux', 'us-east-1', v) for v in table] + [('Linux', 'us-west-2')])
+
+    assert sorted(r.task for r in results) == [('Linux', 'us-east-1'), ('Linux', 'us-west-2')]
+    assert all(r.ok for r in results)
+    assert next(r for r in results if r.task == ('Linux', 'us-east-1')).rows == 40
+    assert ledger.is_complete('Linux', 'us-east-1')
+
+
+def test_split_task_is_collected_whole_when_pieces_dont_add_up():
+    # the vCPU filter missed some rows
+    table = {'1': 10, '2': 25}
+    d = _piece_collector(0, table)
+    d.scrape_and_store.side_effect = None
+    td = scrpr.ThreadDivvier(thread_count=1, max_attempts=2)
+    td.drivers = [d]
+
+    def scrape(_os, region, vcpu=None):
+        d.task_rows = 40 if vcpu is None else table[vcpu]
+        d.task_expected_rows = 40
+        return True
+    d.scrape_and_store.side_effect = scrape
+
+    results = td.run_threads([('Linux', 'us-east-1', '1'), ('Linux', 'us-east-1', '2')])
+
+    assert [(r.task, r.ok, r.rows) for r in results] == [(('Linux', 'us-east-1'), True, 40)]
+    d.scrape_and_store.assert_called_with('Linux', 'us-east-1')
+
+
+def test_rerun_hint():
+    assert scrpr.rerun_hint([('Linux', 'us-east-1'), ('Windows', 'sa-east-1'), ('Linux', 'us-west-2')]) == [
+        "--operating-systems 'Linux' --regions us-east-1,us-west-2",
+        "--operating-systems 'Windows' --regions sa-east-1",
+    ]
+
+
+class FakeProcessCollector(scrpr.DataCollector):
+    """Scrapes nothing, in a worker process"""
+    def __init__(self, _id, config, _test_driver=None):
+        super().__init__(_id, config, _test_driver=MagicMock())
+
+    def scrape_and_store(self, _os, region):
+        if region == 'crash-region':
+            # like the OOM killer
+            scrpr.os._exit(9)
+        if region == 'bad-region':
+            raise scrpr.ScrprException("no such region")
+        scrpr.ROWS_COLLECTED += 3
+        scrpr.ROWS_STORED += 2
+        scrpr.ROWS_ALREADY_EXISTED += 1
+        self.task_rows = 3
+        return True
+
+
+def test_process_divvier_reports_counters_and_errors_to_parent():
+    tasks = [('Linux', 'us-east-1'), ('Linux', 'us-west-2'), ('Windows', 'us-east-1'), ('Linux', 'bad-region')]
+    rows_stored = scrpr.ROWS_STORED
+    errors = len(scrpr.ERRORS)
+    with patch('scrpr.scrpr.EC2DataCollector', FakeProcessCollector):
+        td = scrpr.ProcessDivvier(thread_count=2, max_attempts=1)
+        td.init_scrapers_of(scrpr.DataCollectorConfig('1999-12-31'))
+        results = td.run_threads(tasks)
+
+    assert sorted(r.task for r in results) == sorted(tasks)
+    assert [r.task for r in td.failed()] == [('Linux', 'bad-region')]
+    assert all(r.rows == 3 for r in results if r.ok)
+    assert scrpr.ROWS_STORED == rows_stored + 6
+    assert "no such region" in scrpr.ERRORS[errors:]
+    scrpr.ERRORS[errors:] = []
+    assert not any(p.is_alive() for p in td.processes.values())
+
+
+def test_process_divvier_fails_task_of_a_killed_worker():
+    td = scrpr.ProcessDivvier(thread_count=2, max_attempts=1)
+    with patch('scrpr.scrpr.EC2DataCollector', FakeProcessCollector):
+        td.init_scrapers_of(scrpr.DataCollectorConfig('1999-12-31'))
+        results = td.run_threads([('Linux', 'crash-region'), ('Linux', 'us-east-1'), ('Linux', 'us-west-2')])
+
+    assert len(results) == 3
+    failed = td.failed()
+    assert [r.task for r in failed] == [('Linux', 'crash-region')]
+    assert "exit code 9" in failed[0].error
+
+
+def test_process_divvier_cant_adopt_a_collector():
+    td = scrpr.ProcessDivvier(thread_count=1)
+    with pytest.raises(scrpr.ScrprException):
+        td.add_scraper(_mock_collector(0))